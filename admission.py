@@ -0,0 +1,160 @@
+"""
+Admission control per kelompok route.
+
+Setiap request masuk ke salah satu kelas (``public``, ``submit``, ``admin``)
+yang punya anggaran sendiri:
+
+- jumlah request bersamaan per worker; sisanya antre paling lama
+  ``queue_timeout`` detik dan paling banyak ``max_queue`` request, selebihnya
+  ditolak 503 dengan ``Retry-After`` (load shedding);
+- batas waktu per query (``statement_timeout``). Ditegakkan oleh asyncpg
+  (parameter ``timeout``, yang mengirim cancel request ke server) lewat
+  ``db.PooledConnection``, karena ``SET statement_timeout`` per sesi tidak
+  bertahan di pooler mode transaction dan di-reset asyncpg saat koneksi
+  dikembalikan ke pool. Query yang melewatinya menghasilkan 503.
+
+Dengan begitu ekspor atau analitik admin yang berat tidak bisa memakai semua
+koneksi, dan request publik yang murah tetap cepat saat server kelebihan beban.
+Health check, ``/metrics`` dan ``/debug`` tidak pernah dibatasi.
+
+Konfigurasi per kelas lewat environment, misal untuk ``admin``:
+``ADMISSION_ADMIN_CONCURRENCY``, ``ADMISSION_ADMIN_QUEUE_TIMEOUT``,
+``ADMISSION_ADMIN_MAX_QUEUE`` dan ``ADMISSION_ADMIN_STATEMENT_TIMEOUT``
+(detik, ``0`` untuk tanpa batas). ``ADMISSION_ENABLED=0`` mematikan semuanya.
+"""
+import asyncio
+import math
+from typing import Callable, Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+import db
+import fastjson
+from settings import ADMISSION_DEFAULTS, AdmissionSettings
+
+PUBLIC = "public"
+SUBMIT = "submit"
+ADMIN = "admin"
+
+# (concurrency, queue_timeout, max_queue, statement_timeout) per worker
+DEFAULTS = ADMISSION_DEFAULTS
+
+
+class Shed(Exception):
+    pass
+
+
+class Limiter:
+    def __init__(self, name: str, concurrency: int, queue_timeout: float, max_queue: int,
+                 statement_timeout: Optional[float]):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        # Dibaca oleh db.PooledConnection selama request berjalan
+        self.statement_timeout = statement_timeout or None
+        self.retry_after = str(max(1, math.ceil(queue_timeout)))
+        self._slots = asyncio.Semaphore(concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> None:
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.shed += 1
+            raise Shed()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise Shed()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._slots.release()
+
+_limiters: Dict[str, Limiter] = {}
+
+
+def configure(options: Optional[AdmissionSettings] = None) -> Dict[str, Limiter]:
+    """Membuat limiter setiap kelas (dipanggil dari create_app); tanpa argumen dibaca dari environment."""
+    global _limiters
+    options = options or AdmissionSettings.from_env()
+    if not options.enabled:
+        _limiters = {}
+    else:
+        _limiters = {name: Limiter(name, *limits) for name, limits in options.limits.items()}
+    return _limiters
+
+
+def limiters() -> List[Limiter]:
+    return list(_limiters.values())
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI: ``classify(method, path)`` mengembalikan nama kelas, atau
+    ``None`` untuk route yang tidak dibatasi. Slot dipegang sampai respons
+    selesai dikirim, termasuk respons streaming.
+    """
+
+    def __init__(self, app: ASGIApp, classify: Callable[[str, str], Optional[str]]):
+        self.app = app
+        self.classify = classify
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = None
+        if scope["type"] == "http":
+            limiter = _limiters.get(self.classify(scope["method"], scope["path"]))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Shed:
+            await _send_overloaded(send, limiter)
+            return
+
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                limiter.release()
+
+        async def send_wrapper(message) -> None:
+            await send(message)
+            # Slot dilepas begitu body terakhir terkirim; background task
+            # (misal pembersihan storage) tidak ikut memakan anggaran
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                release()
+
+        token = db.current_budget.set(limiter)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            db.current_budget.reset(token)
+            release()
+
+
+async def _send_overloaded(send: Send, limiter: Limiter) -> None:
+    body = fastjson.dumps({"detail": "Server sedang sibuk, silakan coba lagi."})
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", limiter.retry_after.encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,150 @@
+"""
+Impor alumni secara massal dari file CSV atau JSON-lines.
+
+Baris divalidasi dengan model ``AlumniCreate``, baris yang valid disalin ke tabel
+staging sementara dengan ``copy_records_to_table``, lalu dimasukkan ke ``alumni``
+dan ``tracer`` dalam satu statement berbasis himpunan. Seluruh impor berjalan
+dalam satu transaksi.
+"""
+import csv
+import io
+import json
+from typing import BinaryIO, List, Tuple
+
+from pydantic import ValidationError
+
+from models import AlumniCreate
+
+IMPORT_COLUMNS = ["row_no", "nisn", "nis", "nik", "nama_siswa", "tanggal_lahir", "tahun_lulus"]
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE alumni_import (
+        row_no        int PRIMARY KEY,
+        nisn          text NOT NULL,
+        nis           text NOT NULL,
+        nik           text NOT NULL,
+        nama_siswa    text NOT NULL,
+        tanggal_lahir date NOT NULL,
+        tahun_lulus   int  NOT NULL
+    ) ON COMMIT DROP
+"""
+
+# Alumni baru dan baris tracer kosongnya dibuat dalam satu statement
+INSERT_FROM_STAGING_SQL = """
+    WITH inserted AS (
+        INSERT INTO alumni(nisn, nis, nik, nama_siswa, tanggal_lahir, tahun_lulus)
+        SELECT nisn, nis, nik, nama_siswa, tanggal_lahir, tahun_lulus
+        FROM alumni_import
+        ORDER BY row_no
+        ON CONFLICT (nisn) DO NOTHING
+        RETURNING id_alumni, nisn, tahun_lulus
+    ), tracer_rows AS (
+        INSERT INTO tracer(id_alumni, is_filled)
+        SELECT id_alumni, FALSE FROM inserted
+    )
+    SELECT id_alumni, nisn, tahun_lulus FROM inserted
+"""
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def _error_messages(error: ValidationError) -> List[str]:
+    messages = []
+    for e in error.errors():
+        loc = ".".join(str(p) for p in e["loc"])
+        messages.append(f"{loc}: {e['msg']}" if loc else e["msg"])
+    return messages
+
+
+def _iter_csv(text: io.TextIOBase):
+    header = text.readline()
+    # Excel dengan locale Indonesia menyimpan CSV dengan pemisah ';'
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    fields = [name.strip() for name in next(csv.reader([header], delimiter=delimiter), [])]
+    for row_no, values in enumerate(csv.reader(text, delimiter=delimiter), start=1):
+        if not any(value.strip() for value in values):
+            continue
+        yield row_no, {name: value.strip() for name, value in zip(fields, values)}
+
+
+def _iter_jsonl(text: io.TextIOBase):
+    for row_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield row_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_no, e
+
+
+def parse_upload(file: BinaryIO, fmt: str, max_rows: int) -> Tuple[list, list]:
+    """
+    Membaca dan memvalidasi file upload.
+
+    Mengembalikan ``(records, report)``: ``records`` adalah tuple siap COPY untuk
+    baris valid yang NISN-nya pertama kali muncul di file, ``report`` berisi satu
+    entry per baris (baris valid masih berstatus ``pending``).
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+    rows = _iter_csv(text) if fmt == "csv" else _iter_jsonl(text)
+
+    records = []
+    report = []
+    seen_nisn = set()
+    for row_no, raw in rows:
+        if len(report) >= max_rows:
+            raise BulkImportError(f"File melebihi batas {max_rows} baris.")
+
+        if isinstance(raw, Exception):
+            report.append({"row": row_no, "nisn": None, "status": "invalid", "errors": [str(raw)]})
+            continue
+        try:
+            alumni = AlumniCreate.model_validate(raw)
+        except ValidationError as e:
+            nisn = raw.get("nisn") if isinstance(raw, dict) else None
+            report.append({"row": row_no, "nisn": nisn, "status": "invalid", "errors": _error_messages(e)})
+            continue
+
+        if alumni.nisn in seen_nisn:
+            report.append({"row": row_no, "nisn": alumni.nisn, "status": "duplicate",
+                           "errors": ["NISN muncul lebih dari sekali di file."]})
+            continue
+
+        seen_nisn.add(alumni.nisn)
+        records.append((row_no, alumni.nisn, alumni.nis, alumni.nik, alumni.nama_siswa,
+                        alumni.tanggal_lahir, alumni.tahun_lulus))
+        report.append({"row": row_no, "nisn": alumni.nisn, "status": "pending"})
+
+    text.detach()
+    return records, report
+
+
+async def import_records(conn, records: list) -> list:
+    """
+    Menyalin baris valid ke staging dan memasukkannya ke ``alumni``/``tracer``.
+    Harus dipanggil di dalam transaksi. Mengembalikan baris alumni yang benar-benar
+    dimasukkan (``id_alumni``, ``nisn``, ``tahun_lulus``).
+    """
+    if not records:
+        return []
+    await conn.execute(CREATE_STAGING_SQL)
+    await conn.copy_records_to_table("alumni_import", records=records, columns=IMPORT_COLUMNS)
+    return await conn.fetch(INSERT_FROM_STAGING_SQL)
+
+
+def finalize_report(report: list, inserted_rows) -> dict:
+    inserted = {row["nisn"]: row["id_alumni"] for row in inserted_rows}
+    summary = {"total": len(report), "inserted": 0, "duplicate": 0, "invalid": 0}
+    for entry in report:
+        if entry["status"] == "pending":
+            if entry["nisn"] in inserted:
+                entry["status"] = "inserted"
+                entry["id_alumni"] = str(inserted[entry["nisn"]])
+            else:
+                entry["status"] = "duplicate"
+                entry["errors"] = ["NISN sudah terdaftar."]
+        summary[entry["status"]] += 1
+    return summary
@@ -0,0 +1,109 @@
+"""
+Pencarian alumni untuk panel admin (``/alumni/search``).
+
+Filter disusun menjadi klausa WHERE berparameter di atas query yang sama dengan
+``/tracer/all``, dengan urutan keyset yang sama (``tahun_lulus DESC,
+nama_siswa, id_alumni``), sehingga satu halaman hanya membaca baris halaman itu.
+
+- Nama dicari lewat indeks trigram (``pg_trgm``): substring (``ILIKE``) atau
+  mirip (operator ``%``, tahan salah ketik). Tanpa ekstensi itu hanya awalan
+  nama yang dicari, memakai indeks ``lower(nama_siswa) text_pattern_ops``.
+- Total dihitung persis sampai ``EXACT_COUNT_LIMIT`` baris; di atasnya dipakai
+  estimasi planner dari ``EXPLAIN`` alih-alih ``COUNT(*)`` atas seluruh hasil.
+"""
+from typing import List, NamedTuple, Optional, Tuple
+
+EXACT_COUNT_LIMIT = 1000
+
+_FILTER_FROM = """
+    FROM alumni a
+             LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
+             LEFT JOIN detail_pendidikan_tinggi dpt ON t.id_tracer = dpt.id_tracer
+"""
+
+_trigram: Optional[bool] = None
+
+
+class SearchFilters(NamedTuple):
+    q: Optional[str] = None
+    nisn: Optional[str] = None
+    nis: Optional[str] = None
+    tahun_lulus: Optional[int] = None
+    is_filled: Optional[bool] = None
+    kode_status: Optional[str] = None
+    id_perguruan_tinggi: Optional[int] = None
+
+
+async def trigram_enabled(conn) -> bool:
+    """Apakah ``pg_trgm`` terpasang (diperiksa sekali per proses)."""
+    global _trigram
+    if _trigram is None:
+        _trigram = await conn.fetchval("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+    return _trigram
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _where(filters: SearchFilters, trigram: bool, after: Optional[tuple] = None) -> Tuple[str, List]:
+    clauses, args = [], []
+
+    def param(value) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    if filters.nisn:
+        clauses.append(f"a.nisn = {param(filters.nisn)}")
+    if filters.nis:
+        clauses.append(f"a.nis = {param(filters.nis)}")
+    if filters.tahun_lulus is not None:
+        clauses.append(f"a.tahun_lulus = {param(filters.tahun_lulus)}")
+    if filters.is_filled is not None:
+        clauses.append(f"COALESCE(t.is_filled, false) = {param(filters.is_filled)}")
+    if filters.kode_status:
+        clauses.append(f"t.kode_status = {param(filters.kode_status)}")
+    if filters.id_perguruan_tinggi is not None:
+        clauses.append(f"dpt.id_perguruan_tinggi = {param(filters.id_perguruan_tinggi)}")
+    if filters.q:
+        q = filters.q.strip()
+        if trigram:
+            clauses.append(
+                f"(a.nama_siswa ILIKE {param('%' + _escape_like(q) + '%')} OR a.nama_siswa % {param(q)})"
+            )
+        else:
+            clauses.append(f"lower(a.nama_siswa) LIKE {param(_escape_like(q.lower()) + '%')}")
+    if after is not None:
+        tahun_lulus, nama_siswa, id_alumni = after
+        p_tahun = param(tahun_lulus)
+        clauses.append(
+            f"(a.tahun_lulus < {p_tahun} OR (a.tahun_lulus = {p_tahun} AND "
+            f"(a.nama_siswa, a.id_alumni) > ({param(nama_siswa)}, {param(id_alumni)}::uuid)))"
+        )
+
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, args
+
+
+def build_page_query(select_sql: str, order_sql: str, filters: SearchFilters, trigram: bool,
+                     after: Optional[tuple], limit: int) -> Tuple[str, List]:
+    """
+    Query satu halaman di atas ``select_sql`` (harus memakai alias ``a``, ``t``
+    dan ``dpt``). Mengambil ``limit + 1`` baris untuk mengetahui ada halaman berikutnya.
+    """
+    where, args = _where(filters, trigram, after)
+    args.append(limit + 1)
+    return f"{select_sql}{where}{order_sql} LIMIT ${len(args)}", args
+
+
+async def count_matches(conn, filters: SearchFilters, trigram: bool) -> Tuple[int, bool]:
+    """Mengembalikan ``(total, persis)``; ``persis=False`` berarti estimasi planner."""
+    where, args = _where(filters, trigram)
+    capped = await conn.fetchval(
+        f"SELECT count(*) FROM (SELECT 1 {_FILTER_FROM}{where} LIMIT {EXACT_COUNT_LIMIT + 1}) m", *args
+    )
+    if capped <= EXACT_COUNT_LIMIT:
+        return capped, True
+    # Kolom EXPLAIN (FORMAT JSON) sudah di-decode oleh codec json koneksi
+    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) SELECT 1 {_FILTER_FROM}{where}", *args)
+    return max(int(plan[0]["Plan"]["Plan Rows"]), EXACT_COUNT_LIMIT + 1), False
@@ -0,0 +1,228 @@
+"""
+Mode penyimpanan jawaban kuesioner.
+
+- ``rows`` (awal): satu baris ``detail_kuesioner`` per (tracer, pertanyaan),
+  ditambah indeks unik ``(id_tracer, id_kuesioner)``.
+- ``compact``: seluruh jawaban satu tracer disimpan di ``tracer.jawaban``
+  (``int[]``). Elemen ke-n berisi ``id_jawaban`` untuk pertanyaan dengan
+  ``kuesioner.posisi_jawaban = n``, ``NULL`` bila belum dijawab. Posisi itu
+  nomor urut rapat (migrasi 0007), jadi panjang array mengikuti jumlah
+  pertanyaan, bukan nilai ``id_kuesioner``. Tidak ada tabel dan indeks per
+  jawaban lagi, dan pembacaan cukup men-decode array tanpa join atau ``jsonb_agg``.
+
+Di mode ``compact`` tabel lama berganti nama menjadi ``detail_kuesioner_rows``
+(dikosongkan; strukturnya disimpan untuk ``revert``) dan ``detail_kuesioner``
+menjadi view kompatibilitas dengan kolom lama ``(id_tracer, id_kuesioner,
+id_jawaban)``, tanpa ``id_detail_kuesioner``. View itu juga bisa ditulis
+(INSERT/UPDATE/DELETE lewat trigger ``INSTEAD OF``, tanpa ``ON CONFLICT``) untuk
+query dan skrip lama; kode aplikasi memakai kolom array langsung.
+
+Mode dibaca dari katalog dan di-cache ``MODE_TTL`` detik per worker; jalur
+tulis selalu memeriksa ulang sehingga worker yang sedang berjalan ikut pindah
+tanpa restart. Perpindahan mode::
+
+    python answer_storage.py status
+    python answer_storage.py migrate   # rows -> compact
+    python answer_storage.py revert    # compact -> rows
+
+``migrate`` mengisi ``tracer.jawaban`` bertahap per ``BACKFILL_BATCH`` tracer
+(masing-masing transaksi pendek) sambil aplikasi tetap melayani submit;
+perubahan selama backfill dicatat trigger dan disusulkan di transaksi terakhir
+yang sekaligus mengganti tabel dengan view. Hanya transaksi terakhir itu yang
+menahan submit, sebentar. ``revert`` menyalin array kembali ke baris dalam satu
+transaksi yang menahan submit sampai selesai.
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import Iterable, List, Optional, Sequence
+
+ROWS = "rows"
+COMPACT = "compact"
+
+MODE_TTL = 5.0
+BACKFILL_BATCH = 5000
+
+# Nama tabel baris lama selama mode compact
+ROWS_TABLE = "detail_kuesioner_rows"
+
+_MODE_SQL = "SELECT relkind = 'v' FROM pg_class WHERE oid = to_regclass('detail_kuesioner')"
+
+_compact: Optional[bool] = None
+_checked_at = 0.0
+
+# Array jawaban tracer dari baris detail_kuesioner-nya; {where} memilih tracer
+_BACKFILL_SQL = """
+    UPDATE tracer t
+    SET jawaban = p.jawaban
+    FROM (
+        SELECT t.id_tracer,
+               (SELECT tracer_jawaban_merge(NULL, array_agg(k.posisi_jawaban), array_agg(dk.id_jawaban))
+                FROM detail_kuesioner dk
+                JOIN kuesioner k ON k.id_kuesioner = dk.id_kuesioner
+                WHERE dk.id_tracer = t.id_tracer) AS jawaban
+        FROM tracer t
+        WHERE {where}
+    ) p
+    WHERE t.id_tracer = p.id_tracer
+      AND t.jawaban IS DISTINCT FROM p.jawaban
+"""
+
+_CAPTURE_SQL = """
+    CREATE TABLE IF NOT EXISTS detail_kuesioner_dirty (id_tracer int PRIMARY KEY);
+    DROP TRIGGER IF EXISTS detail_kuesioner_capture ON detail_kuesioner;
+    CREATE TRIGGER detail_kuesioner_capture
+        AFTER INSERT OR UPDATE OR DELETE ON detail_kuesioner
+        FOR EACH ROW EXECUTE FUNCTION detail_kuesioner_capture();
+"""
+
+_TO_COMPACT_SQL = f"""
+    DROP TRIGGER detail_kuesioner_capture ON detail_kuesioner;
+    DROP TABLE detail_kuesioner_dirty;
+    ALTER TABLE detail_kuesioner RENAME TO {ROWS_TABLE};
+    TRUNCATE {ROWS_TABLE};
+
+    CREATE VIEW detail_kuesioner AS
+    SELECT t.id_tracer, k.id_kuesioner, u.id_jawaban
+    FROM tracer t
+    CROSS JOIN LATERAL unnest(t.jawaban) WITH ORDINALITY AS u(id_jawaban, posisi)
+    JOIN kuesioner k ON k.posisi_jawaban = u.posisi
+    WHERE u.id_jawaban IS NOT NULL;
+
+    CREATE TRIGGER detail_kuesioner_write
+        INSTEAD OF INSERT OR UPDATE OR DELETE ON detail_kuesioner
+        FOR EACH ROW EXECUTE FUNCTION detail_kuesioner_write();
+"""
+
+_TO_ROWS_SQL = f"""
+    TRUNCATE {ROWS_TABLE};
+    INSERT INTO {ROWS_TABLE} (id_tracer, id_kuesioner, id_jawaban)
+    SELECT id_tracer, id_kuesioner, id_jawaban FROM detail_kuesioner ORDER BY id_tracer, id_kuesioner;
+
+    DROP VIEW detail_kuesioner;
+    ALTER TABLE {ROWS_TABLE} RENAME TO detail_kuesioner;
+    UPDATE tracer SET jawaban = NULL WHERE jawaban IS NOT NULL;
+"""
+
+_SIZES_SQL = """
+    SELECT c.relname AS name,
+           GREATEST(c.reltuples, 0)::bigint AS estimated_rows,
+           pg_table_size(c.oid) AS table_bytes,
+           pg_indexes_size(c.oid) AS index_bytes
+    FROM pg_class c
+    WHERE c.oid IN (to_regclass('tracer'), to_regclass('detail_kuesioner'), to_regclass($1))
+      AND c.relkind = 'r'
+    ORDER BY c.relname
+"""
+
+
+async def is_compact(conn, fresh: bool = False) -> bool:
+    """``True`` bila jawaban disimpan di ``tracer.jawaban``. Jalur tulis memakai ``fresh=True``."""
+    global _compact, _checked_at
+    now = time.monotonic()
+    if fresh or _compact is None or now - _checked_at > MODE_TTL:
+        _compact = bool(await conn.fetchval(_MODE_SQL))
+        _checked_at = now
+    return _compact
+
+
+def encode(answers: Iterable[tuple]) -> Optional[List[Optional[int]]]:
+    """Pasangan ``(posisi_jawaban, id_jawaban)`` menjadi nilai ``tracer.jawaban``."""
+    answers = [(int(posisi), int(a_id)) for posisi, a_id in answers]
+    if not answers:
+        return None
+    for posisi, _ in answers:
+        if posisi < 1:
+            raise ValueError(f"posisi_jawaban tidak valid: {posisi}")
+    jawaban: List[Optional[int]] = [None] * max(posisi for posisi, _ in answers)
+    for posisi, a_id in answers:
+        jawaban[posisi - 1] = a_id
+    return jawaban
+
+
+def decode(jawaban: Optional[Sequence[Optional[int]]], posisi: int) -> Optional[int]:
+    """``id_jawaban`` di posisi ``posisi`` dari nilai ``tracer.jawaban``, ``None`` bila kosong."""
+    if jawaban is None or not 1 <= posisi <= len(jawaban):
+        return None
+    return jawaban[posisi - 1]
+
+
+async def migrate(conn, batch_size: int = BACKFILL_BATCH, progress=None) -> bool:
+    """
+    Memindahkan jawaban ke mode compact. Mengembalikan ``False`` bila sudah
+    compact. ``progress(selesai, total)`` dipanggil setiap batch.
+    """
+    if await is_compact(conn, fresh=True):
+        return False
+    await conn.execute(_CAPTURE_SQL)
+
+    low, high = await conn.fetchrow("SELECT min(id_tracer), max(id_tracer) FROM tracer")
+    if low is not None:
+        query = _BACKFILL_SQL.format(where="t.id_tracer >= $1 AND t.id_tracer < $2")
+        for start in range(low, high + 1, batch_size):
+            await conn.execute(query, start, start + batch_size)
+            if progress is not None:
+                progress(min(start + batch_size, high + 1) - low, high + 1 - low)
+
+    async with conn.transaction():
+        # Urutan lock sama dengan submit (tracer dulu); bacaan tetap jalan
+        await conn.execute("LOCK TABLE tracer, detail_kuesioner IN EXCLUSIVE MODE")
+        await conn.execute(_BACKFILL_SQL.format(where="t.id_tracer IN (SELECT id_tracer FROM detail_kuesioner_dirty)"))
+        await conn.execute(_TO_COMPACT_SQL)
+    await conn.execute("ANALYZE tracer")
+    return True
+
+
+async def revert(conn) -> bool:
+    """Mengembalikan jawaban ke baris ``detail_kuesioner``. ``False`` bila sudah mode rows."""
+    if not await is_compact(conn, fresh=True):
+        return False
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE tracer IN EXCLUSIVE MODE")
+        await conn.execute(_TO_ROWS_SQL)
+    await conn.execute("ANALYZE tracer, detail_kuesioner")
+    return True
+
+
+async def sizes(conn) -> List[dict]:
+    """Ukuran tabel dan indeks penyimpan jawaban, untuk membandingkan kedua mode."""
+    return [dict(row) for row in await conn.fetch(_SIZES_SQL, ROWS_TABLE)]
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+async def _main(argv) -> int:
+    import asyncpg
+    from dotenv import load_dotenv
+
+    if argv[1:] not in (["status"], ["migrate"], ["revert"]):
+        print("Penggunaan: python answer_storage.py status|migrate|revert", file=sys.stderr)
+        return 2
+
+    load_dotenv()
+    conn = await asyncpg.connect(os.environ["SUPABASE_DB_URL"], statement_cache_size=0)
+    try:
+        if argv[1] == "migrate":
+            def progress(done, total):
+                print(f"\rBackfill {done}/{total} id tracer", end="", flush=True)
+
+            changed = await migrate(conn, progress=progress)
+            print("\nJawaban dipindahkan ke mode compact." if changed else "Sudah mode compact.")
+        elif argv[1] == "revert":
+            changed = await revert(conn)
+            print("Jawaban dikembalikan ke mode rows." if changed else "Sudah mode rows.")
+
+        print(f"Mode: {COMPACT if await is_compact(conn, fresh=True) else ROWS}")
+        for entry in await sizes(conn):
+            print(f"  {entry['name']}: ~{entry['estimated_rows']} baris, tabel {_mb(entry['table_bytes'])}, "
+                  f"indeks {_mb(entry['index_bytes'])}")
+    finally:
+        await conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv)))
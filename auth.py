@@ -0,0 +1,159 @@
+"""
+Autentikasi admin berbasis token bertanda tangan (JWT).
+
+``/login`` memverifikasi password sekali lalu menerbitkan access token berumur
+pendek dan refresh token. Endpoint admin cukup memakai dependency
+``require_admin`` yang memvalidasi tanda tangan dan masa berlaku token di
+memori, tanpa query ke database.
+
+- Hash password memakai bcrypt (passlib) dan dijalankan di thread pool agar
+  tidak memblokir event loop. Password lama yang masih tersimpan plaintext
+  tetap diterima sekali, lalu langsung di-hash ulang oleh pemanggil.
+- Konfigurasi (``settings.AuthSettings``) diterapkan oleh ``configure`` dari
+  ``create_app``, atau dibaca dari environment saat pertama dipakai:
+
+  - ``JWT_SECRET_KEY``: kunci HMAC, wajib. Semua worker dan restart harus
+    memakai kunci yang sama agar token tetap berlaku; worker tidak mau start
+    bila kosong (``Settings.require``).
+  - ``JWT_ALGORITHM``: default ``HS256``.
+  - ``ACCESS_TOKEN_EXPIRE_MINUTES`` / ``REFRESH_TOKEN_EXPIRE_DAYS``: default 15 / 7.
+  - ``PASSWORD_BCRYPT_ROUNDS``: cost factor bcrypt, default 12.
+"""
+import hmac
+import logging
+import time
+from typing import NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+import settings as app_settings
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
+class AuthSettings(NamedTuple):
+    secret_key: str
+    algorithm: str
+    access_ttl: int
+    refresh_ttl: int
+    password_context: CryptContext
+
+
+_settings: Optional[AuthSettings] = None
+
+
+def configure(options: Optional[app_settings.AuthSettings] = None) -> None:
+    """Menerapkan konfigurasi (dipanggil dari create_app); tanpa argumen dibaca dari environment."""
+    global _settings
+    options = options or app_settings.AuthSettings.from_env()
+    _settings = AuthSettings(
+        secret_key=options.secret_key or "",
+        algorithm=options.algorithm,
+        access_ttl=options.access_token_expire_minutes * 60,
+        refresh_ttl=options.refresh_token_expire_days * 86400,
+        password_context=CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=options.bcrypt_rounds,
+        ),
+    )
+
+
+def get_settings() -> AuthSettings:
+    if _settings is None:
+        configure()
+    if not _settings.secret_key:
+        # Tidak ada kunci acak sebagai cadangan: token dari worker lain akan ditolak
+        raise RuntimeError("JWT_SECRET_KEY belum diisi")
+    return _settings
+
+
+# ---------------------------------------------------------------------------
+# Password
+# ---------------------------------------------------------------------------
+
+def _verify_password(password: str, stored: str) -> Tuple[bool, Optional[str]]:
+    context = get_settings().password_context
+    if context.identify(stored, required=False) is None:
+        # Password lama (plaintext): bandingkan constant-time lalu hash ulang
+        if hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8")):
+            return True, context.hash(password)
+        return False, None
+    return context.verify_and_update(password, stored)
+
+
+async def verify_password(password: str, stored: str) -> Tuple[bool, Optional[str]]:
+    """
+    Mengembalikan ``(cocok, hash_baru)``. ``hash_baru`` terisi bila password
+    tersimpan perlu diganti (plaintext lama atau parameter hash usang) dan
+    harus disimpan oleh pemanggil.
+    """
+    return await run_in_threadpool(_verify_password, password, stored)
+
+
+async def hash_password(password: str) -> str:
+    return await run_in_threadpool(get_settings().password_context.hash, password)
+
+
+# ---------------------------------------------------------------------------
+# Token
+# ---------------------------------------------------------------------------
+
+def _create_token(claims: dict, token_type: str, ttl: int) -> str:
+    settings = get_settings()
+    now = int(time.time())
+    payload = {**claims, "typ": token_type, "iat": now, "exp": now + ttl}
+    return jwt.encode(payload, settings.secret_key, algorithm=settings.algorithm)
+
+
+def issue_tokens(username: str, nama: str) -> dict:
+    """Menerbitkan pasangan access dan refresh token untuk satu user."""
+    settings = get_settings()
+    return {
+        "access_token": _create_token({"sub": username, "nama": nama}, ACCESS_TOKEN, settings.access_ttl),
+        "refresh_token": _create_token({"sub": username}, REFRESH_TOKEN, settings.refresh_ttl),
+        "token_type": "bearer",
+        "expires_in": settings.access_ttl,
+    }
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+def decode_token(token: str, token_type: str) -> dict:
+    """Memvalidasi tanda tangan, ``exp`` dan jenis token; 401 jika tidak valid."""
+    settings = get_settings()
+    try:
+        claims = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        raise _unauthorized("Token tidak valid atau sudah kedaluwarsa.")
+    if claims.get("typ") != token_type or not claims.get("sub"):
+        raise _unauthorized("Jenis token tidak sesuai.")
+    return claims
+
+
+def is_admin_token(token: str) -> bool:
+    """Versi boolean ``decode_token`` untuk access token, misal untuk middleware."""
+    try:
+        decode_token(token, ACCESS_TOKEN)
+    except HTTPException:
+        return False
+    return True
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def require_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> dict:
+    """Dependency endpoint admin; mengembalikan klaim access token."""
+    if credentials is None:
+        raise _unauthorized("Token akses diperlukan.")
+    return decode_token(credentials.credentials, ACCESS_TOKEN)
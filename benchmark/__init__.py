@@ -0,0 +1,5 @@
+"""
+Benchmark dan load test API tracer study terhadap Postgres lokal.
+
+Lihat ``python -m benchmark --help`` dan bagian "Benchmarking" di README.
+"""
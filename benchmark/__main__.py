@@ -0,0 +1,177 @@
+"""
+CLI benchmark::
+
+    python -m benchmark seed --scale 50k
+    python -m benchmark seed --scale 50k --answer-storage compact
+    python -m benchmark run --scenario season --duration 60 --output hasil/season.json
+    python -m benchmark run --target http://127.0.0.1:8000 --scenario admin
+    python -m benchmark compare hasil/baseline.json hasil/season.json
+    python -m benchmark explain --migrate
+    python -m benchmark startup --workers 2
+
+DSN diambil dari ``--dsn`` atau ``BENCHMARK_DB_URL``. Perintah ``seed``
+menghapus dan membuat ulang tabel, jadi jangan arahkan ke database produksi.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import asyncpg
+
+from benchmark import compare as compare_mod
+from benchmark.scenarios import SCENARIOS
+from benchmark.seed import resolve_scale, seed
+
+
+def _dsn(args) -> str:
+    dsn = args.dsn or os.getenv("BENCHMARK_DB_URL")
+    if not dsn:
+        sys.exit("DSN belum diisi: gunakan --dsn atau BENCHMARK_DB_URL")
+    return dsn
+
+
+async def _seed(args) -> int:
+    count = resolve_scale(args.scale)
+    conn = await asyncpg.connect(_dsn(args), statement_cache_size=0)
+    try:
+        await seed(conn, count, questions=args.questions, compact=args.answer_storage == "compact")
+    finally:
+        await conn.close()
+    print(f"Database benchmark diisi dengan {count} alumni.")
+    return 0
+
+
+def _print_summary(result: dict) -> None:
+    meta = result["meta"]
+    print(f"Skenario {meta['scenario']} | {meta['alumni']} alumni | concurrency {meta['concurrency']} "
+          f"| {meta['duration_s']} s")
+    print(f"{'endpoint':<28} {'req':>7} {'err':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'q/req':>7}")
+    rows = list(result["endpoints"].items()) + [("(overall)", result["overall"])]
+    for name, s in rows:
+        lat = s["latency_ms"]
+        q = s["queries_per_request"]
+        print(f"{name:<28} {s['requests']:>7} {s['errors']:>5} {s['throughput_rps']:>9} "
+              f"{lat['p50'] if lat['p50'] is not None else '-':>9} {lat['p95'] if lat['p95'] is not None else '-':>9} "
+              f"{lat['p99'] if lat['p99'] is not None else '-':>9} {q if q is not None else '-':>7}")
+
+
+async def _run(args) -> int:
+    from benchmark.runner import run
+
+    result = await run(
+        args.target, args.scenario, _dsn(args),
+        concurrency=args.concurrency, duration=args.duration, warmup=args.warmup,
+        storage_latency=args.storage_latency, request_timeout=args.timeout, seed=args.seed,
+    )
+    _print_summary(result)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Hasil disimpan di {args.output}")
+    return 0
+
+
+async def _explain(args) -> int:
+    from benchmark import explain
+    from benchmark.runner import load_app
+
+    dsn = _dsn(args)
+    main_module = load_app(dsn)
+    conn = await asyncpg.connect(dsn, statement_cache_size=0)
+    try:
+        if args.migrate:
+            import migrate
+            await migrate.migrate(conn)
+            await conn.execute("ANALYZE")
+        results = await explain.check(conn, main_module, min_rows=args.min_rows)
+    finally:
+        await conn.close()
+
+    for entry in results:
+        verdict = "ok" if entry["ok"] else "SEQ SCAN: " + ", ".join(entry["seq_scans"])
+        print(f"{entry['name']:<32} {verdict}")
+    return 0 if all(entry["ok"] for entry in results) else 1
+
+
+def _startup(args) -> int:
+    from benchmark.startup import measure
+
+    results = measure(_dsn(args), workers=args.workers, runs=args.runs)
+    print(f"{'run':>4} {'ready s':>9} {'lifespan s':>11} {'first req ms':>13}")
+    for i, entry in enumerate(results, 1):
+        print(f"{i:>4} {entry['ready_s']:>9} {entry['worker_startup_s']:>11} {entry['first_request_ms']:>13}")
+    return 0 if all(entry["first_request_status"] == 200 for entry in results) else 1
+
+
+def _compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    rows, problems = compare_mod.compare(baseline, candidate, threshold=args.threshold)
+    print(compare_mod.format_rows(rows))
+    if problems:
+        print("\nRegresi:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print("\nTidak ada regresi.")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="membuat ulang skema dan data benchmark")
+    p_seed.add_argument("--dsn")
+    p_seed.add_argument("--scale", default="1k", help="1k, 50k, 500k atau jumlah alumni")
+    p_seed.add_argument("--questions", type=int, default=12)
+    p_seed.add_argument("--answer-storage", choices=("rows", "compact"), default="rows",
+                        help="mode penyimpanan jawaban kuesioner (lihat answer_storage.py)")
+
+    p_run = sub.add_parser("run", help="menjalankan load test")
+    p_run.add_argument("--dsn")
+    p_run.add_argument("--target", default="asgi", help="'asgi' (in-process) atau URL server")
+    p_run.add_argument("--scenario", choices=sorted(SCENARIOS), default="season")
+    p_run.add_argument("--concurrency", type=int, default=16)
+    p_run.add_argument("--duration", type=float, default=30.0)
+    p_run.add_argument("--warmup", type=float, default=5.0)
+    p_run.add_argument("--storage-latency", type=float, default=0.05,
+                       help="latensi buatan FakeStorage dalam detik (mode asgi)")
+    p_run.add_argument("--timeout", type=float, default=120.0, help="batas waktu per request HTTP dalam detik (mode URL)")
+    p_run.add_argument("--seed", type=int)
+    p_run.add_argument("--output", help="file JSON hasil")
+
+    p_explain = sub.add_parser("explain", help="memeriksa rencana query setiap endpoint (gagal bila ada seq scan)")
+    p_explain.add_argument("--dsn")
+    p_explain.add_argument("--min-rows", type=int, default=10_000, help="ambang baris tabel yang dianggap besar")
+    p_explain.add_argument("--migrate", action="store_true", help="jalankan migrasi sebelum memeriksa")
+
+    p_startup = sub.add_parser("startup", help="mengukur waktu dari start hypercorn sampai siap melayani")
+    p_startup.add_argument("--dsn")
+    p_startup.add_argument("--workers", type=int, default=1)
+    p_startup.add_argument("--runs", type=int, default=3)
+
+    p_cmp = sub.add_parser("compare", help="membandingkan dua hasil run")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("candidate")
+    p_cmp.add_argument("--threshold", type=float, default=10.0, help="ambang regresi dalam persen")
+
+    args = parser.parse_args(argv)
+    if args.command == "seed":
+        return asyncio.run(_seed(args))
+    if args.command == "run":
+        return asyncio.run(_run(args))
+    if args.command == "explain":
+        return asyncio.run(_explain(args))
+    if args.command == "startup":
+        return _startup(args)
+    return _compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
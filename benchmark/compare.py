@@ -0,0 +1,78 @@
+"""
+Membandingkan dua hasil benchmark (baseline vs kandidat).
+
+Sebuah endpoint dianggap regresi bila p95 atau p99 naik, atau throughput turun,
+lebih dari ambang persentase, atau bila jumlah query per request bertambah.
+"""
+from typing import List, Optional, Tuple
+
+
+def _delta_pct(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old is None or new is None or old == 0:
+        return None
+    return round((new - old) / old * 100, 1)
+
+
+def _compare_entry(name: str, old: dict, new: dict, threshold: float) -> Tuple[dict, List[str]]:
+    row = {"endpoint": name}
+    problems = []
+    for pct in ("p50", "p95", "p99"):
+        a, b = old["latency_ms"][pct], new["latency_ms"][pct]
+        row[pct] = (a, b, _delta_pct(a, b))
+        change = row[pct][2]
+        if pct != "p50" and change is not None and change > threshold:
+            problems.append(f"{name}: {pct} naik {change}% ({a} -> {b} ms)")
+
+    a, b = old["throughput_rps"], new["throughput_rps"]
+    row["throughput"] = (a, b, _delta_pct(a, b))
+    if row["throughput"][2] is not None and row["throughput"][2] < -threshold:
+        problems.append(f"{name}: throughput turun {-row['throughput'][2]}% ({a} -> {b} rps)")
+
+    a, b = old.get("queries_per_request"), new.get("queries_per_request")
+    row["queries"] = (a, b)
+    if a is not None and b is not None and b > a:
+        problems.append(f"{name}: query per request bertambah ({a} -> {b})")
+
+    if new["errors"] > old["errors"]:
+        problems.append(f"{name}: error 5xx bertambah ({old['errors']} -> {new['errors']})")
+    return row, problems
+
+
+def compare(baseline: dict, candidate: dict, threshold: float = 10.0) -> Tuple[List[dict], List[str]]:
+    """Mengembalikan ``(rows, problems)``; ``problems`` kosong berarti tidak ada regresi."""
+    rows = []
+    problems = []
+    if baseline["meta"].get("scenario") != candidate["meta"].get("scenario"):
+        problems.append("Skenario berbeda: {} vs {}".format(
+            baseline["meta"].get("scenario"), candidate["meta"].get("scenario")))
+
+    row, found = _compare_entry("(overall)", baseline["overall"], candidate["overall"], threshold)
+    rows.append(row)
+    problems.extend(found)
+    for name in sorted(set(baseline["endpoints"]) & set(candidate["endpoints"])):
+        row, found = _compare_entry(name, baseline["endpoints"][name], candidate["endpoints"][name], threshold)
+        rows.append(row)
+        problems.extend(found)
+    return rows, problems
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value:g}"
+
+
+def _fmt_change(change) -> str:
+    return "" if change is None else f" ({change:+g}%)"
+
+
+def format_rows(rows: List[dict]) -> str:
+    header = f"{'endpoint':<28} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22} {'rps':>22} {'queries':>12}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        cells = []
+        for key in ("p50", "p95", "p99", "throughput"):
+            a, b, change = row[key]
+            cells.append(f"{_fmt(a)} -> {_fmt(b)}{_fmt_change(change)}")
+        qa, qb = row["queries"]
+        lines.append(f"{row['endpoint']:<28} " + " ".join(f"{c:>22}" for c in cells)
+                     + f" {_fmt(qa) + ' -> ' + _fmt(qb):>12}")
+    return "\n".join(lines)
@@ -0,0 +1,88 @@
+"""
+Pemeriksa rencana query: menjalankan ``EXPLAIN`` pada SQL setiap endpoint
+dengan parameter sampel dan gagal bila muncul sequential scan pada tabel besar.
+
+Jalankan setelah ``python -m benchmark seed --scale 50k`` (atau lebih besar),
+karena pada tabel kecil planner memang lebih memilih seq scan::
+
+    python -m benchmark explain
+"""
+import json
+from typing import Callable, List, NamedTuple, Optional
+
+# Tabel dengan estimasi baris di bawah ini boleh di-seq-scan
+DEFAULT_MIN_ROWS = 10_000
+
+
+class Case(NamedTuple):
+    name: str
+    sql: str
+    params: Callable[[dict], tuple]
+    # Tabel yang memang wajar di-seq-scan oleh query ini
+    allow: tuple = ()
+
+
+def _cases(main, export, statistik, master_questions, compact: bool = False) -> List[Case]:
+    select = main.ALUMNI_TRACER_SELECT_COMPACT if compact else main.ALUMNI_TRACER_SELECT
+    page = select + main.ALUMNI_TRACER_ORDER + " LIMIT 100"
+    after = select + " WHERE " + main.ALUMNI_TRACER_AFTER + main.ALUMNI_TRACER_ORDER + " LIMIT 100"
+    export_query, _ = export.build_export_query(master_questions, compact)
+    remove_answers = statistik._REMOVE_ANSWERS_COMPACT_SQL if compact else statistik._REMOVE_ANSWERS_SQL
+    return [
+        Case("alumni_check", main.CHECK_ALUMNI_SQL,
+             lambda s: (s["nisn"], s["nis"], s["nik"], s["tanggal_lahir"])),
+        Case("tracer_status", main.TRACER_STATUS_SQL, lambda s: (s["id_alumni"],)),
+        Case("questionnaire_detail", main.ALUMNI_DETAIL_SQL, lambda s: (s["id_alumni"],)),
+        Case("questionnaire_submit_update", main.SUBMIT_TRACER_UPDATE_SQL, lambda s: ("KERJA", s["id_alumni"])),
+        Case("tracer_all_first_page", page, lambda s: ()),
+        Case("tracer_all_next_page", after, lambda s: (s["tahun_lulus"], s["nama_siswa"], s["id_alumni"])),
+        # Satu angkatan ~1/10 alumni: hash join dengan seq scan tracer lebih murah daripada nested loop
+        Case("tracer_export_year", export_query, lambda s: (s["tahun_lulus"],), allow=("tracer",)),
+        Case("alumni_delete_statistik", statistik._REMOVE_ALUMNI_SQL, lambda s: ([s["id_alumni"]],)),
+        Case("alumni_delete_answers", remove_answers, lambda s: ([s["id_alumni"]],)),
+    ]
+
+
+def _seq_scans(plan: dict, found: Optional[list] = None) -> list:
+    if found is None:
+        found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", ()):
+        _seq_scans(child, found)
+    return found
+
+
+async def check(conn, main, min_rows: int = DEFAULT_MIN_ROWS) -> List[dict]:
+    """
+    Mengembalikan satu entry per case: ``{"name", "seq_scans", "ok"}``. ``main``
+    adalah modul aplikasi (sumber konstanta SQL).
+    """
+    import answer_storage
+    import export
+    import statistik
+
+    sample = await conn.fetchrow("""
+        SELECT a.id_alumni, a.nisn, a.nis, a.nik, a.tanggal_lahir, a.tahun_lulus, a.nama_siswa
+        FROM alumni a
+        ORDER BY a.id_alumni
+        LIMIT 1
+    """)
+    if sample is None:
+        raise RuntimeError("Tabel alumni kosong; jalankan `python -m benchmark seed` dulu")
+    large = {
+        row["relname"] for row in await conn.fetch(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples >= $1", min_rows)
+    }
+    master_questions = await conn.fetch(
+        "SELECT id_kuesioner, pertanyaan, posisi_jawaban FROM kuesioner ORDER BY id_kuesioner")
+
+    results = []
+    compact = await answer_storage.is_compact(conn, fresh=True)
+    for case in _cases(main, export, statistik, master_questions, compact):
+        # EXPLAIN tanpa ANALYZE tidak mengeksekusi statement, termasuk UPDATE
+        raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {case.sql}", *case.params(sample))
+        plan = json.loads(raw)[0]["Plan"] if isinstance(raw, str) else raw[0]["Plan"]
+        scans = sorted({name for name in _seq_scans(plan) if name in large and name not in case.allow})
+        results.append({"name": case.name, "seq_scans": scans, "ok": not scans})
+    return results
@@ -0,0 +1,40 @@
+"""
+Backend storage palsu pengganti Supabase selama benchmark.
+
+File disimpan di memori (hanya ukurannya) dan setiap operasi bisa diberi
+latensi buatan untuk meniru transfer jaringan, tanpa memblokir event loop.
+"""
+import asyncio
+from typing import AsyncIterator, List
+
+from storage import StorageBackend
+
+
+class FakeStorage(StorageBackend):
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.objects = {}
+        self.uploads = 0
+        self.removals = 0
+
+    async def _upload(self, path: str, chunks: AsyncIterator[bytes], content_type: str) -> bool:
+        size = 0
+        async for chunk in chunks:
+            size += len(chunk)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        created = path not in self.objects
+        self.objects[path] = size
+        self.uploads += 1
+        return created
+
+    async def _remove(self, paths: List[str]) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for path in paths:
+            self.objects.pop(path, None)
+        self.removals += len(paths)
+
+    def public_url(self, path: str) -> str:
+        return f"https://storage.benchmark.local/{path}"
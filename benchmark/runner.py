@@ -0,0 +1,243 @@
+"""
+Load driver async.
+
+Dua mode target:
+
+- ``asgi`` (default): aplikasi dijalankan in-process lewat ``httpx.ASGITransport``
+  dengan ``FakeStorage``. Jumlah query per request dihitung tepat per endpoint
+  lewat query logger asyncpg yang dipasang di setiap koneksi pool.
+- URL (misal ``http://127.0.0.1:8000``): server yang sudah berjalan. Jumlah query
+  hanya tersedia sebagai rata-rata keseluruhan, dari selisih
+  ``pg_stat_statements`` bila extension itu terpasang.
+"""
+import asyncio
+import contextvars
+import math
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+import asyncpg
+import httpx
+
+from benchmark.scenarios import Context, Picker
+from benchmark.seed import ADMIN_PASSWORD, ADMIN_USERNAME
+
+_current_counter: contextvars.ContextVar = contextvars.ContextVar("benchmark_query_counter", default=None)
+
+
+class QueryCounter:
+    __slots__ = ("queries",)
+
+    def __init__(self):
+        self.queries = 0
+
+
+def _on_query(record) -> None:
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.queries += 1
+
+
+async def _attach_query_logger(conn) -> None:
+    conn.add_query_logger(_on_query)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.queries: List[int] = []
+        self.errors = 0
+        self.client_errors = 0
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, status: Optional[int], latency: float, queries: Optional[int]) -> None:
+        key = str(status) if status is not None else "exception"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status is None or status >= 500:
+            self.errors += 1
+            return
+        if status >= 400:
+            self.client_errors += 1
+        self.latencies.append(latency)
+        if queries is not None:
+            self.queries.append(queries)
+
+    def summary(self, duration: float) -> dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies) + self.errors
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "client_errors": self.client_errors,
+            "statuses": self.statuses,
+            "throughput_rps": round(count / duration, 2) if duration else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+                "p50": _percentile_ms(latencies, 50),
+                "p95": _percentile_ms(latencies, 95),
+                "p99": _percentile_ms(latencies, 99),
+                "max": round(latencies[-1] * 1000, 3) if latencies else None,
+            },
+            "queries_per_request": round(sum(self.queries) / len(self.queries), 2) if self.queries else None,
+        }
+
+
+def _percentile_ms(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Percentile nearest-rank dalam milidetik."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return round(sorted_values[rank - 1] * 1000, 3)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _statement_calls(conn) -> Optional[int]:
+    try:
+        return await conn.fetchval("SELECT SUM(calls)::bigint FROM pg_stat_statements")
+    except asyncpg.PostgresError:
+        return None
+
+
+async def _worker(client: httpx.AsyncClient, picker: Picker, ctx: Context, stats: Dict[str, EndpointStats],
+                  progress: dict, measure_from: float, deadline: float, count_queries: bool) -> None:
+    while time.perf_counter() < deadline:
+        call = picker.next(ctx)
+        progress["sent"] += 1
+        counter = QueryCounter() if count_queries else None
+        token = _current_counter.set(counter)
+        status = None
+        start = time.perf_counter()
+        try:
+            response = await client.request(call.method, call.url, **call.kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            pass
+        finally:
+            _current_counter.reset(token)
+        latency = time.perf_counter() - start
+        # Callback query logger dijadwalkan dengan call_soon; beri kesempatan jalan dulu
+        await asyncio.sleep(0)
+        if start >= measure_from:
+            stats.setdefault(call.name, EndpointStats()).record(
+                status, latency, counter.queries if counter is not None else None
+            )
+
+
+async def _authenticate(client: httpx.AsyncClient, ctx: Context) -> None:
+    """Login sebagai admin benchmark dan memakai access token-nya untuk endpoint admin."""
+    response = await client.post("/login", json={"email": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+    if response.status_code != 200:
+        raise RuntimeError(f"Login admin benchmark gagal: {response.status_code} {response.text}")
+    ctx.headers["Authorization"] = "Bearer " + response.json()["access_token"]
+
+
+async def run(target: str, scenario: str, dsn: str, concurrency: int = 16, duration: float = 30.0,
+              warmup: float = 5.0, storage_latency: float = 0.05, request_timeout: float = 120.0,
+              seed: Optional[int] = None) -> dict:
+    """Menjalankan satu benchmark dan mengembalikan hasilnya dalam bentuk dict siap JSON."""
+    conn = await asyncpg.connect(dsn, statement_cache_size=0)
+    try:
+        ctx = await Context.load(conn)
+        calls_before = await _statement_calls(conn)
+    finally:
+        await conn.close()
+
+    in_process = target == "asgi"
+    stats: Dict[str, EndpointStats] = {}
+
+    progress = {"sent": 0}
+
+    async def _drive(client: httpx.AsyncClient) -> float:
+        await _authenticate(client, ctx)
+        measure_from = time.perf_counter() + warmup
+        deadline = measure_from + duration
+        workers = [
+            asyncio.create_task(_worker(client, Picker(scenario, None if seed is None else seed + i), ctx, stats,
+                                        progress, measure_from, deadline, in_process))
+            for i in range(concurrency)
+        ]
+        # Request yang masih berjalan saat waktu habis ditunggu, bukan dibatalkan:
+        # membatalkan request ASGI di tengah query ikut memutus koneksi pool
+        await asyncio.wait(workers)
+        return time.perf_counter() - measure_from
+
+    timeout = httpx.Timeout(request_timeout)
+    if in_process:
+        elapsed = await _run_in_process(dsn, storage_latency, concurrency, timeout, _drive)
+    else:
+        async with httpx.AsyncClient(base_url=target, timeout=timeout,
+                                     limits=httpx.Limits(max_connections=concurrency)) as client:
+            elapsed = await _drive(client)
+
+    endpoints = {name: s.summary(elapsed) for name, s in sorted(stats.items())}
+    overall = EndpointStats()
+    for s in stats.values():
+        overall.latencies.extend(s.latencies)
+        overall.queries.extend(s.queries)
+        overall.errors += s.errors
+        overall.client_errors += s.client_errors
+        for key, value in s.statuses.items():
+            overall.statuses[key] = overall.statuses.get(key, 0) + value
+    total = overall.summary(elapsed)
+
+    if not in_process and calls_before is not None:
+        conn = await asyncpg.connect(dsn, statement_cache_size=0)
+        try:
+            calls_after = await _statement_calls(conn)
+        finally:
+            await conn.close()
+        # Selisih counter mencakup request warm-up, jadi dibagi seluruh request yang dikirim
+        if calls_after is not None and progress["sent"]:
+            total["queries_per_request"] = round((calls_after - calls_before) / progress["sent"], 2)
+
+    return {
+        "meta": {
+            "scenario": scenario,
+            "target": target,
+            "concurrency": concurrency,
+            "duration_s": round(elapsed, 3),
+            "warmup_s": warmup,
+            "alumni": ctx.alumni_count,
+            "storage_latency_s": storage_latency if in_process else None,
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "overall": total,
+        "endpoints": endpoints,
+    }
+
+
+def load_app(dsn: str):
+    """Mengimpor modul aplikasi (main.py) yang diarahkan ke database benchmark."""
+    os.environ["SUPABASE_DB_URL"] = dsn
+    # Semua request benchmark dilayani satu proses; kuncinya cukup tetap
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+    # Storage diganti FakeStorage sebelum lifespan, jadi client Supabase tidak pernah dibuat
+    import main
+    return main
+
+
+async def _run_in_process(dsn: str, storage_latency: float, concurrency: int, timeout, drive) -> float:
+    import db
+    from benchmark.fake_storage import FakeStorage
+
+    main = load_app(dsn)
+
+    db.add_connection_hook(_attach_query_logger)
+    main.storage = FakeStorage(latency=storage_latency, max_concurrency=concurrency)
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=timeout) as client:
+            return await drive(client)
@@ -0,0 +1,187 @@
+"""
+Campuran request yang direplay oleh load driver.
+
+- ``season``: musim pengisian; didominasi /alumni/check dan /quesioner-metadata.
+- ``admin``: dashboard admin; /tracer/all, /statistik/*, ekspor dan detail.
+- ``mixed``: keduanya sekaligus, seperti hari terakhir pengisian.
+
+Setiap skenario adalah daftar ``(bobot, builder)``; builder menerima
+``Context`` dan ``random.Random`` lalu mengembalikan satu ``Call``.
+"""
+import json
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmark.seed import (
+    ADMIN_PASSWORD, ADMIN_USERNAME, JUMLAH_ANGKATAN, TAHUN_LULUS_AWAL, alumni_identity,
+)
+
+SAMPLE_SIZE = 2000
+BUKTI_KULIAH_BYTES = b"%PDF-1.4\n" + b"0" * (200 * 1024)
+
+
+@dataclass
+class Call:
+    name: str
+    method: str
+    url: str
+    kwargs: dict = field(default_factory=dict)
+
+
+@dataclass
+class Context:
+    """Data sampel dari database benchmark yang dipakai untuk menyusun request."""
+
+    alumni_count: int
+    alumni_ids: List[str]
+    unfilled_ids: List[str]
+    perguruan_tinggi_ids: List[int]
+    prodi_pairs: List[Tuple[int, int]]
+    kuesioner_ids: List[int]
+    jawaban_ids: List[int]
+    sumber_biaya_ids: List[int]
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    async def load(cls, conn) -> "Context":
+        alumni_count = await conn.fetchval("SELECT COUNT(*) FROM alumni")
+        alumni_ids = await conn.fetch("SELECT id_alumni FROM alumni ORDER BY random() LIMIT $1", SAMPLE_SIZE)
+        unfilled = await conn.fetch("""
+            SELECT t.id_alumni FROM tracer t WHERE NOT t.is_filled ORDER BY random() LIMIT $1
+        """, SAMPLE_SIZE * 5)
+        pairs = await conn.fetch("SELECT id_perguruan_tinggi, id_program_studi FROM perguruan_tinggi_prodi")
+        return cls(
+            alumni_count=alumni_count,
+            alumni_ids=[str(r["id_alumni"]) for r in alumni_ids],
+            unfilled_ids=[str(r["id_alumni"]) for r in unfilled],
+            perguruan_tinggi_ids=[r["id_perguruan_tinggi"] for r in
+                                  await conn.fetch("SELECT id_perguruan_tinggi FROM perguruan_tinggi")],
+            prodi_pairs=[(r["id_perguruan_tinggi"], r["id_program_studi"]) for r in pairs],
+            kuesioner_ids=[r["id_kuesioner"] for r in await conn.fetch("SELECT id_kuesioner FROM kuesioner")],
+            jawaban_ids=[r["id_jawaban"] for r in await conn.fetch("SELECT id_jawaban FROM jawaban")],
+            sumber_biaya_ids=[r["id_sumber_biaya"] for r in await conn.fetch("SELECT id_sumber_biaya FROM sumber_biaya")],
+        )
+
+
+def alumni_check(ctx: Context, rng: random.Random) -> Call:
+    return Call("alumni_check", "POST", "/alumni/check",
+                {"json": alumni_identity(rng.randint(1, ctx.alumni_count))})
+
+
+def questionnaire_metadata(ctx: Context, rng: random.Random) -> Call:
+    return Call("quesioner_metadata", "GET", "/quesioner-metadata")
+
+
+def referensi_perguruan_tinggi(ctx: Context, rng: random.Random) -> Call:
+    return Call("referensi_perguruan_tinggi", "GET", "/referensi/perguruan-tinggi")
+
+
+def program_studi(ctx: Context, rng: random.Random) -> Call:
+    return Call("program_studi", "GET", f"/programStudi/{rng.choice(ctx.perguruan_tinggi_ids)}")
+
+
+def tracer_status(ctx: Context, rng: random.Random) -> Call:
+    return Call("tracer_status", "GET", f"/tracer/status/{rng.choice(ctx.alumni_ids)}")
+
+
+def questionnaire_submit(ctx: Context, rng: random.Random) -> Call:
+    # Setiap alumni hanya mengisi sekali; jika sampel habis, ganti dengan cek status
+    if not ctx.unfilled_ids:
+        return tracer_status(ctx, rng)
+    id_alumni = ctx.unfilled_ids.pop()
+    status = rng.choice(["PEND", "KERJA", "BELUM"])
+    payload = {
+        "id_alumni": id_alumni,
+        "personal_data": {"alamat_email": f"{id_alumni[:8]}@contoh.id", "no_telepon": "081234567890"},
+        "status": status,
+        "kuesioner": {str(q): rng.choice(ctx.jawaban_ids) for q in ctx.kuesioner_ids},
+    }
+    kwargs = {"data": {}}
+    if status == "PEND":
+        pt_id, ps_id = rng.choice(ctx.prodi_pairs)
+        payload["detail_pendidikan"] = {
+            "id_perguruan_tinggi": pt_id,
+            "id_program_studi": ps_id,
+            "tahun_masuk": 2024,
+            "id_sumber_biaya": rng.choice(ctx.sumber_biaya_ids),
+        }
+        kwargs["files"] = {"bukti_kuliah": ("bukti.pdf", BUKTI_KULIAH_BYTES, "application/pdf")}
+    kwargs["data"]["payload"] = json.dumps(payload)
+    return Call("questionnaire_submit", "POST", "/questionnaire/submit", kwargs)
+
+
+def tracer_all_page(ctx: Context, rng: random.Random) -> Call:
+    return Call("tracer_all_page", "GET", "/tracer/all", {"params": {"limit": 100}, "headers": ctx.headers})
+
+
+def tracer_all_stream(ctx: Context, rng: random.Random) -> Call:
+    return Call("tracer_all_stream", "GET", "/tracer/all", {"params": {"format": "ndjson"}, "headers": ctx.headers})
+
+
+def statistik_alumni(ctx: Context, rng: random.Random) -> Call:
+    return Call("statistik_alumni", "GET", "/statistik/alumni", {"headers": ctx.headers})
+
+
+def statistik_kuesioner(ctx: Context, rng: random.Random) -> Call:
+    return Call("statistik_kuesioner", "GET", "/statistik/kuesioner", {"headers": ctx.headers})
+
+
+def statistik_cube(ctx: Context, rng: random.Random) -> Call:
+    dims = rng.choice(["tahun_lulus,status", "tahun_lulus,perguruan_tinggi", "status,sumber_biaya,tahun_lulus"])
+    return Call("statistik_cube", "GET", "/statistik/cube",
+                {"params": {"dims": dims, "measures": "count,responden"}, "headers": ctx.headers})
+
+
+def questionnaire_detail(ctx: Context, rng: random.Random) -> Call:
+    return Call("questionnaire_detail", "GET", f"/questionnaire/detail/{rng.choice(ctx.alumni_ids)}",
+                {"headers": ctx.headers})
+
+
+def tracer_export_csv(ctx: Context, rng: random.Random) -> Call:
+    tahun = TAHUN_LULUS_AWAL + rng.randrange(JUMLAH_ANGKATAN)
+    return Call("tracer_export_csv", "GET", "/tracer/export",
+                {"params": {"format": "csv", "tahun_lulus": tahun}, "headers": ctx.headers})
+
+
+def login(ctx: Context, rng: random.Random) -> Call:
+    return Call("login", "POST", "/login", {"json": {"email": ADMIN_USERNAME, "password": ADMIN_PASSWORD}})
+
+
+Builder = Callable[[Context, random.Random], Call]
+
+SCENARIOS: Dict[str, List[Tuple[int, Builder]]] = {
+    "season": [
+        (45, alumni_check),
+        (20, questionnaire_metadata),
+        (8, referensi_perguruan_tinggi),
+        (7, program_studi),
+        (10, tracer_status),
+        (10, questionnaire_submit),
+    ],
+    "admin": [
+        (25, tracer_all_page),
+        (20, statistik_alumni),
+        (20, statistik_kuesioner),
+        (5, statistik_cube),
+        (20, questionnaire_detail),
+        (5, login),
+        (8, tracer_export_csv),
+        (2, tracer_all_stream),
+    ],
+}
+SCENARIOS["mixed"] = [(w * 4, b) for w, b in SCENARIOS["season"]] + SCENARIOS["admin"]
+
+
+class Picker:
+    """Memilih builder sesuai bobot skenario."""
+
+    def __init__(self, scenario: str, seed: Optional[int] = None):
+        entries = SCENARIOS[scenario]
+        self.builders = [b for _, b in entries]
+        self.weights = [w for w, _ in entries]
+        self.rng = random.Random(seed)
+
+    def next(self, ctx: Context) -> Call:
+        builder = self.rng.choices(self.builders, weights=self.weights)[0]
+        return builder(ctx, self.rng)
@@ -0,0 +1,71 @@
+-- Skema minimal tabel yang dipakai main.py, untuk database benchmark lokal.
+-- Dibuat ulang oleh `python -m benchmark seed`; jangan jalankan di database produksi.
+
+CREATE TABLE IF NOT EXISTS status (
+    kode_status text PRIMARY KEY,
+    status      text NOT NULL
+);
+CREATE TABLE IF NOT EXISTS perguruan_tinggi (
+    id_perguruan_tinggi serial PRIMARY KEY,
+    perguruan_tinggi    text NOT NULL
+);
+CREATE TABLE IF NOT EXISTS program_studi (
+    id_program_studi   serial PRIMARY KEY,
+    nama_program_studi text NOT NULL
+);
+CREATE TABLE IF NOT EXISTS perguruan_tinggi_prodi (
+    id_perguruan_tinggi int NOT NULL REFERENCES perguruan_tinggi ON DELETE CASCADE,
+    id_program_studi    int NOT NULL REFERENCES program_studi ON DELETE CASCADE,
+    PRIMARY KEY (id_perguruan_tinggi, id_program_studi)
+);
+CREATE TABLE IF NOT EXISTS sumber_biaya (
+    id_sumber_biaya serial PRIMARY KEY,
+    sumber_biaya    text NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kuesioner (
+    id_kuesioner serial PRIMARY KEY,
+    pertanyaan   text NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jawaban (
+    id_jawaban serial PRIMARY KEY,
+    jawaban    text NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alumni (
+    id_alumni     uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    nisn          text NOT NULL UNIQUE,
+    nis           text NOT NULL,
+    nik           text NOT NULL,
+    nama_siswa    text NOT NULL,
+    tanggal_lahir date NOT NULL,
+    tahun_lulus   int  NOT NULL,
+    alamat_email  text,
+    no_telepon    text
+);
+CREATE TABLE IF NOT EXISTS tracer (
+    id_tracer   serial PRIMARY KEY,
+    id_alumni   uuid NOT NULL REFERENCES alumni ON DELETE CASCADE,
+    kode_status text REFERENCES status,
+    is_filled   boolean NOT NULL DEFAULT false,
+    fill_date   date
+);
+CREATE TABLE IF NOT EXISTS detail_pendidikan_tinggi (
+    id_detail_pendidikan serial PRIMARY KEY,
+    id_tracer            int NOT NULL REFERENCES tracer ON DELETE CASCADE,
+    id_perguruan_tinggi  int REFERENCES perguruan_tinggi,
+    id_program_studi     int REFERENCES program_studi,
+    tahun_masuk          int,
+    id_sumber_biaya      int REFERENCES sumber_biaya,
+    bukti_kuliah         text
+);
+CREATE TABLE IF NOT EXISTS detail_kuesioner (
+    id_detail_kuesioner serial PRIMARY KEY,
+    id_tracer           int NOT NULL REFERENCES tracer ON DELETE CASCADE,
+    id_kuesioner        int NOT NULL REFERENCES kuesioner,
+    id_jawaban          int NOT NULL REFERENCES jawaban
+);
+CREATE TABLE IF NOT EXISTS "user" (
+    id_user  serial PRIMARY KEY,
+    username text NOT NULL UNIQUE,
+    password text NOT NULL,
+    nama     text NOT NULL
+);
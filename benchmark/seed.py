@@ -0,0 +1,146 @@
+"""
+Pembuat data benchmark yang deterministik.
+
+Semua data dibuat di sisi server dengan ``generate_series`` sehingga skala
+500k alumni tetap terisi dalam hitungan detik. Identitas alumni ke-``n``
+(NISN, NIS, NIK, tanggal lahir) bisa dihitung ulang dengan
+``alumni_identity(n)`` tanpa query, dipakai load driver untuk /alumni/check.
+"""
+import os
+from datetime import date, timedelta
+
+SCALES = {"1k": 1_000, "50k": 50_000, "500k": 500_000}
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.sql")
+
+# schema_migrations ikut dihapus agar migrasi diterapkan ulang di atas skema baru
+TABLES = [
+    "schema_migrations", "statistik_jawaban", "statistik_tahun",
+    "detail_kuesioner", "detail_kuesioner_rows", "detail_pendidikan_tinggi", "tracer", "alumni",
+    "perguruan_tinggi_prodi", "program_studi", "perguruan_tinggi",
+    "sumber_biaya", "kuesioner", "jawaban", "status", '"user"',
+]
+
+TAHUN_LULUS_AWAL = 2015
+JUMLAH_ANGKATAN = 10
+TANGGAL_LAHIR_AWAL = date(1995, 1, 1)
+
+ADMIN_USERNAME = "admin@benchmark.local"
+ADMIN_PASSWORD = "benchmark"
+
+_REFERENCE_SQL = """
+    INSERT INTO status VALUES
+        ('PEND', 'Melanjutkan Pendidikan'), ('KERJA', 'Bekerja'), ('BELUM', 'Belum Bekerja');
+    INSERT INTO sumber_biaya(sumber_biaya) VALUES ('Orang Tua'), ('Beasiswa'), ('Mandiri');
+    INSERT INTO jawaban(jawaban) VALUES
+        ('Sangat Bagus'), ('Bagus'), ('Cukup'), ('Kurang'), ('Sangat Kurang');
+    INSERT INTO kuesioner(pertanyaan)
+    SELECT 'Pertanyaan kuesioner nomor ' || g FROM generate_series(1, {questions}) g;
+    INSERT INTO perguruan_tinggi(perguruan_tinggi)
+    SELECT 'Universitas ' || g FROM generate_series(1, {universities}) g;
+    INSERT INTO program_studi(nama_program_studi)
+    SELECT 'Program Studi ' || g FROM generate_series(1, {programs}) g;
+"""
+
+_ALUMNI_SQL = """
+    INSERT INTO alumni(nisn, nis, nik, nama_siswa, tanggal_lahir, tahun_lulus, alamat_email, no_telepon)
+    SELECT lpad(g::text, 10, '0'),
+           g::text,
+           lpad(g::text, 16, '0'),
+           'Siswa ' || g,
+           $2::date + (g % 3650),
+           $3::int + (g % $4::int),
+           CASE WHEN g % 5 < 3 THEN 'siswa' || g || '@contoh.id' END,
+           CASE WHEN g % 5 < 3 THEN '08' || lpad(g::text, 10, '0') END
+    FROM generate_series(1, $1::int) g;
+"""
+
+# Pengisian ~60% alumni; status dan jawaban diturunkan dari nomor baris agar hasil tetap sama tiap seed
+_TRACER_SQL = """
+    INSERT INTO tracer(id_alumni, kode_status, is_filled, fill_date)
+    SELECT a.id_alumni,
+           CASE WHEN n % 5 < 3 THEN (ARRAY['PEND', 'KERJA', 'BELUM'])[1 + n % 3] END,
+           n % 5 < 3,
+           CASE WHEN n % 5 < 3 THEN DATE '2024-01-01' + (n % 300) END
+    FROM (SELECT id_alumni, nis::int AS n FROM alumni) a;
+
+    INSERT INTO detail_pendidikan_tinggi(id_tracer, id_perguruan_tinggi, id_program_studi,
+                                         tahun_masuk, id_sumber_biaya, bukti_kuliah)
+    SELECT t.id_tracer, ptp.id_perguruan_tinggi, ptp.id_program_studi,
+           a.tahun_lulus, 1 + t.id_tracer % 3,
+           'https://storage.benchmark.local/bukti-kuliah-' || a.id_alumni || '.pdf'
+    FROM tracer t
+    JOIN alumni a ON a.id_alumni = t.id_alumni
+    JOIN LATERAL (
+        SELECT id_perguruan_tinggi, id_program_studi
+        FROM perguruan_tinggi_prodi
+        ORDER BY id_perguruan_tinggi, id_program_studi
+        OFFSET t.id_tracer % {pairs} LIMIT 1
+    ) ptp ON true
+    WHERE t.kode_status = 'PEND';
+
+    INSERT INTO detail_kuesioner(id_tracer, id_kuesioner, id_jawaban)
+    SELECT t.id_tracer, k.id_kuesioner, 1 + (t.id_tracer * 7 + k.id_kuesioner * 3) % 5
+    FROM tracer t
+    CROSS JOIN kuesioner k
+    WHERE t.is_filled;
+"""
+
+
+def resolve_scale(scale: str) -> int:
+    """``1k``/``50k``/``500k`` atau angka langsung."""
+    if scale in SCALES:
+        return SCALES[scale]
+    return int(scale.replace("_", ""))
+
+
+def alumni_identity(n: int) -> dict:
+    """Payload /alumni/check untuk alumni ke-``n`` (mulai dari 1)."""
+    return {
+        "nisn": str(n).zfill(10),
+        "nis": str(n),
+        "nik": str(n).zfill(16),
+        "tanggal_lahir": (TANGGAL_LAHIR_AWAL + timedelta(days=n % 3650)).isoformat(),
+    }
+
+
+async def seed(conn, alumni_count: int, questions: int = 12, universities: int = 40, programs: int = 60,
+               compact: bool = False) -> None:
+    """
+    Membuat ulang skema benchmark dan mengisinya dengan ``alumni_count`` alumni.
+    ``compact`` menerapkan migrasi lalu memindahkan jawaban ke mode compact
+    (lihat answer_storage.py).
+    """
+    import answer_storage
+    import migrate
+    import statistik
+
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        schema_sql = f.read()
+
+    async with conn.transaction():
+        # Di mode compact detail_kuesioner adalah view kompatibilitas (DROP VIEW gagal untuk tabel)
+        if await conn.fetchval("SELECT relkind = 'v' FROM pg_class WHERE oid = to_regclass('detail_kuesioner')"):
+            await conn.execute("DROP VIEW detail_kuesioner")
+        await conn.execute(f"DROP TABLE IF EXISTS {', '.join(TABLES)} CASCADE")
+        await conn.execute(schema_sql)
+        # Script multi-statement tidak bisa memakai parameter, jadi angka disisipkan langsung
+        await conn.execute(_REFERENCE_SQL.format(questions=int(questions), universities=int(universities),
+                                                 programs=int(programs)))
+        # Setiap universitas membuka 6 program studi yang bergeser
+        await conn.execute("""
+            INSERT INTO perguruan_tinggi_prodi(id_perguruan_tinggi, id_program_studi)
+            SELECT DISTINCT pt.id_perguruan_tinggi, 1 + (pt.id_perguruan_tinggi * 7 + o) % $1::int
+            FROM perguruan_tinggi pt CROSS JOIN generate_series(0, 5) o
+        """, programs)
+        await conn.execute('INSERT INTO "user"(username, password, nama) VALUES ($1, $2, $3)',
+                           ADMIN_USERNAME, ADMIN_PASSWORD, "Admin Benchmark")
+        await conn.execute(_ALUMNI_SQL, alumni_count, TANGGAL_LAHIR_AWAL, TAHUN_LULUS_AWAL, JUMLAH_ANGKATAN)
+        pair_count = await conn.fetchval("SELECT COUNT(*) FROM perguruan_tinggi_prodi")
+        await conn.execute(_TRACER_SQL.format(pairs=int(pair_count)))
+
+    await conn.execute("ANALYZE")
+    if compact:
+        await migrate.migrate(conn)
+        await answer_storage.migrate(conn)
+    await statistik.ensure_schema(conn)
@@ -0,0 +1,74 @@
+"""
+Mengukur cold start: waktu dari menjalankan proses hypercorn sampai request
+pertama dilayani.
+
+Server dijalankan sebagai subprocess dengan ``--workers`` yang diminta, lalu
+``/health/ready`` di-poll sampai 200. Setelah itu satu request ke endpoint
+referensi diukur untuk melihat apakah cache sudah hangat::
+
+    python -m benchmark startup --workers 2 --runs 3
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import List
+
+import httpx
+
+READY_PATH = "/health/ready"
+FIRST_REQUEST_PATH = "/quesioner-metadata"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_once(dsn: str, workers: int, timeout: float = 60.0) -> dict:
+    port = _free_port()
+    env = dict(os.environ, SUPABASE_DB_URL=dsn)
+    env.setdefault("JWT_SECRET_KEY", "benchmark")
+    command = [sys.executable, "-m", "hypercorn", "main:app",
+               "--bind", f"127.0.0.1:{port}", "--workers", str(workers)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    # Client dibuat sebelum proses dijalankan agar biaya inisialisasinya tidak ikut terukur
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5.0) as client:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=root, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"hypercorn berhenti dengan kode {process.returncode}")
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"Server belum siap setelah {timeout} s")
+                try:
+                    ready = client.get(READY_PATH)
+                    if ready.status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.005)
+            ready_s = time.perf_counter() - start
+
+            first_start = time.perf_counter()
+            first = client.get(FIRST_REQUEST_PATH)
+            first_ms = (time.perf_counter() - first_start) * 1000
+        finally:
+            process.terminate()
+            process.wait()
+
+    return {
+        "ready_s": round(ready_s, 3),
+        "worker_startup_s": ready.json().get("startup_seconds"),
+        "first_request_ms": round(first_ms, 1),
+        "first_request_status": first.status_code,
+    }
+
+
+def measure(dsn: str, workers: int = 1, runs: int = 3) -> List[dict]:
+    return [measure_once(dsn, workers) for _ in range(runs)]
@@ -0,0 +1,281 @@
+"""
+Cache in-process untuk data referensi (/referensi/*, /programStudi, /quesioner-metadata).
+
+Data referensi hampir tidak pernah berubah, jadi body JSON-nya disimpan dalam
+bentuk bytes yang sudah jadi beserta ETag kuat. Hit tidak menyentuh database
+maupun encoder JSON, dan klien yang mengirim ``If-None-Match`` yang cocok
+mendapat 304 tanpa body.
+
+Entry kedaluwarsa setelah TTL dan bisa diinvalidasi secara eksplisit, baik
+lewat endpoint admin maupun lewat notifikasi Postgres (LISTEN/NOTIFY).
+
+``LRUCache`` dipakai untuk hasil query dengan banyak kemungkinan key
+(``/statistik/cube``) yang harus dikosongkan setiap kali data sumber berubah.
+``IdempotencyCache`` menyimpan respons submit kuesioner yang sudah selesai.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import asyncpg
+from fastapi import HTTPException, Request, Response
+
+import fastjson
+
+logger = logging.getLogger(__name__)
+
+
+class JsonBody:
+    """Body JSON yang sudah diserialisasi beserta ETag-nya."""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    @classmethod
+    def from_data(cls, data: Any) -> "JsonBody":
+        return cls(fastjson.dumps(data))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match memakai perbandingan lemah (RFC 9110 13.1.2)
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ReferenceCache:
+    """
+    Cache per-key dengan TTL dan single-flight loading: ketika banyak request
+    datang bersamaan saat entry kosong, hanya satu yang menjalankan query.
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_age: int = 300):
+        self.ttl = ttl
+        self.max_age = max_age
+        self._entries: Dict[str, tuple] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = self._fresh(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+
+        async with lock:
+            value = self._fresh(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            generation = self._generation
+            value = await loader()
+            # Jangan simpan hasil yang dimuat sebelum invalidasi terjadi
+            if self.ttl > 0 and generation == self._generation:
+                self._entries[key] = (value, time.monotonic() + self.ttl)
+            return value
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        self._generation += 1
+        if key:
+            self._entries.pop(key, None)
+        else:
+            self._entries.clear()
+
+    def keys(self):
+        return list(self._entries)
+
+    def response(self, request: Request, entry: JsonBody) -> Response:
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": f"public, max-age={self.max_age}",
+        }
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+class LRUCache:
+    """
+    Cache LRU berukuran tetap dengan TTL, untuk hasil query yang key-nya
+    bervariasi (misal kombinasi dimensi ``/statistik/cube``).
+
+    Pemanggil mengambil ``generation()`` sebelum memuat data lalu menyerahkannya
+    ke ``put()``; hasil yang dimuat sebelum ``invalidate()`` tidak disimpan.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def generation(self) -> int:
+        return self._generation
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        if self.maxsize <= 0 or generation != self._generation:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class IdempotencyCache:
+    """
+    Hasil request tulis yang sudah selesai, per key idempotensi, untuk menjawab
+    retry/double-click tanpa menyentuh database.
+
+    Request dengan key yang sama yang datang selagi yang pertama masih berjalan
+    menunggu hasilnya alih-alih menjalankan transaksi kedua. Hanya respons 2xx
+    yang disimpan; error boleh dicoba lagi. Setiap entry membawa sidik jari isi
+    request: dengan ``strict=True`` key yang sama dengan isi berbeda ditolak
+    (422), tanpa itu request dijalankan dan menggantikan entry lama.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 86400.0):
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.replays = 0
+
+    async def run(self, key: Hashable, fingerprint: str, handler: Callable[[], Awaitable[Response]],
+                  strict: bool = True) -> Response:
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == fingerprint:
+                    self.replays += 1
+                    return Response(content=entry[2], status_code=entry[1], media_type="application/json",
+                                    headers={"Idempotent-Replayed": "true"})
+                if strict:
+                    raise HTTPException(
+                        status_code=422,
+                        detail="Idempotency-Key sudah dipakai untuk isi request yang berbeda."
+                    )
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            # Tunggu request yang sedang berjalan lalu periksa ulang hasilnya
+            await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await handler()
+            if 200 <= response.status_code < 300:
+                self._entries.put(key, (fingerprint, response.status_code, response.body),
+                                  self._entries.generation())
+            return response
+        finally:
+            del self._inflight[key]
+            future.set_result(None)
+
+    def forget(self, key: Hashable) -> None:
+        self._entries.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class NotifyListener:
+    """
+    Mendengarkan channel Postgres dan menginvalidasi cache ketika ada NOTIFY.
+    Payload notifikasi berisi nama key, atau kosong untuk menghapus semuanya.
+
+    LISTEN butuh koneksi sesi, jadi listener memakai koneksi tersendiri di luar
+    pool (tidak bisa lewat pgbouncer mode transaction).
+    """
+
+    def __init__(self, dsn: str, channel: str, cache: ReferenceCache):
+        self.dsn = dsn
+        self.channel = channel
+        self.cache = cache
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.cache.invalidate(payload or None)
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn, statement_cache_size=0)
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda c: closed.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                # Notifikasi bisa terlewat selama terputus, jadi mulai dari cache kosong
+                self.cache.invalidate()
+                delay = 1.0
+                await closed.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Listener cache referensi terputus, mencoba lagi dalam %.0fs", delay, exc_info=True)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
@@ -0,0 +1,546 @@
+"""
+Pool koneksi asyncpg bersama untuk seluruh endpoint.
+
+Pool dibuat sekali saat startup (lihat ``lifespan`` di main.py) dan ditutup
+saat shutdown, sehingga request tidak lagi membayar handshake TCP/TLS/auth
+ke Supabase setiap kali. Konfigurasi (``settings.PoolSettings``) dibaca dari
+environment:
+
+- ``DB_POOL_MIN_SIZE`` / ``DB_POOL_MAX_SIZE``: ukuran pool (default 2 / 10).
+- ``DB_POOL_ACQUIRE_TIMEOUT``: batas tunggu koneksi dalam detik (default 10).
+- ``DB_POOL_MAX_INACTIVE_LIFETIME``: koneksi idle lebih lama dari ini ditutup
+  oleh pool (default 300).
+- ``DB_POOL_HEALTHCHECK_IDLE``: koneksi yang idle lebih lama dari ini di-ping
+  dengan ``SELECT 1`` sebelum dipakai (default 30, ``0`` untuk mematikan).
+- ``DB_PREPARED_STATEMENTS``: ``1`` untuk mengaktifkan statement cache asyncpg.
+  Biarkan mati bila di belakang pgbouncer mode transaction (pooler Supabase).
+- ``DB_STATEMENT_CACHE_SIZE``: ukuran cache bila prepared statement aktif.
+
+Replika baca (opsional, ``SUPABASE_DB_READ_URLS``) punya pool sendiri dengan
+ukuran yang sama. Endpoint yang hanya membaca meminjam koneksi lewat
+``get_db(readonly=True)``; bacaan dibagi round-robin ke replika yang sehat dan
+jatuh ke primary bila tidak ada yang sehat:
+
+- ``DB_REPLICA_RETRY_INTERVAL``: replika yang gagal dihubungi atau tertinggal
+  dilewati selama sekian detik sebelum dicoba lagi (default 30).
+- ``DB_REPLICA_MAX_LAG``: batas ketertinggalan replay dalam detik (default 30).
+- ``DB_REPLICA_CHECK_INTERVAL``: seberapa sering lag diperiksa (default 10).
+- ``DB_READ_YOUR_WRITES_WINDOW``: setelah ``pin_primary(key)``, bacaan dengan
+  ``sticky=key`` tetap ke primary selama sekian detik (default 10).
+"""
+import asyncio
+import functools
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+import asyncpg
+from fastapi import HTTPException
+
+import fastjson
+import profiling
+from settings import PoolSettings
+
+logger = logging.getLogger(__name__)
+
+# Dipanggil dengan durasi (detik) setiap query selesai, misal untuk metrik per request
+_query_observer: Optional[Callable[[float], None]] = None
+
+# Dipanggil dengan (sql, argumen, durasi) untuk query yang lebih lama dari ambangnya
+# (lihat slow_queries.py). ``argumen`` ``None`` berarti query tidak bisa diulang.
+_slow_query_hook: Optional[Callable[[str, Optional[tuple], float], None]] = None
+_slow_query_threshold: float = 0.0
+
+# Limiter admission control milik request yang sedang berjalan (lihat admission.py).
+# Atribut ``statement_timeout`` menjadi batas waktu setiap query, dan query yang
+# melewatinya dihitung di ``timed_out``.
+current_budget: ContextVar = ContextVar("query_budget", default=None)
+
+# True selama query internal berjalan: reset koneksi saat dikembalikan ke pool,
+# health check dan cek lag replika. Query itu tidak dihitung di metrik, profil
+# maupun slow query log, dan tidak dikenai batas waktu admission control.
+_internal: ContextVar[bool] = ContextVar("internal_query", default=False)
+
+
+@contextmanager
+def _unobserved():
+    token = _internal.set(True)
+    try:
+        yield
+    finally:
+        _internal.reset(token)
+
+
+def set_query_observer(observer: Optional[Callable[[float], None]]) -> None:
+    global _query_observer
+    _query_observer = observer
+
+
+def set_slow_query_hook(threshold: float, hook: Optional[Callable[[str, Optional[tuple], float], None]]) -> None:
+    global _slow_query_hook, _slow_query_threshold
+    _slow_query_hook = hook
+    _slow_query_threshold = threshold
+
+
+def _statement(name: str, args: tuple):
+    """``(sql, argumen)`` dari argumen posisi method koneksi untuk profil dan slow query log."""
+    if name == "copy_records_to_table":
+        return f"COPY {args[0]} FROM STDIN", None
+    if name == "executemany" or (name == "execute" and len(args) == 1):
+        # Tanpa argumen, execute memakai simple query protocol (bisa multi-statement)
+        return args[0], None
+    return args[0], args[1:]
+
+
+def _observed(method):
+    name = method.__name__
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if _internal.get():
+            return await method(self, *args, **kwargs)
+        budget = current_budget.get()
+        if budget is not None and budget.statement_timeout and kwargs.get("timeout") is None:
+            kwargs["timeout"] = budget.statement_timeout
+        observer = _query_observer
+        start = time.perf_counter()
+        try:
+            return await method(self, *args, **kwargs)
+        except asyncio.TimeoutError:
+            if budget is None:
+                raise
+            # asyncpg sudah mengirim cancel request; koneksi tetap bisa dipakai
+            budget.timed_out += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Query melebihi batas waktu, silakan coba lagi.",
+                headers={"Retry-After": budget.retry_after},
+            )
+        finally:
+            elapsed = time.perf_counter() - start
+            if observer is not None:
+                observer(elapsed)
+            profile = profiling.current.get()
+            if profile is not None or (_slow_query_hook is not None and elapsed >= _slow_query_threshold):
+                sql, params = _statement(name, args)
+                if profile is not None:
+                    profile.add_query(sql, elapsed)
+                if _slow_query_hook is not None and elapsed >= _slow_query_threshold:
+                    _slow_query_hook(sql, params, elapsed)
+    return wrapper
+
+
+class PooledConnection(asyncpg.Connection):
+    """Koneksi yang mencatat kapan terakhir dikembalikan ke pool dan durasi setiap query."""
+
+    _idle_since: Optional[float] = None
+
+    execute = _observed(asyncpg.Connection.execute)
+    executemany = _observed(asyncpg.Connection.executemany)
+    fetch = _observed(asyncpg.Connection.fetch)
+    fetchrow = _observed(asyncpg.Connection.fetchrow)
+    fetchval = _observed(asyncpg.Connection.fetchval)
+    copy_from_query = _observed(asyncpg.Connection.copy_from_query)
+    copy_records_to_table = _observed(asyncpg.Connection.copy_records_to_table)
+
+    async def reset(self, *, timeout=None):
+        # Dipanggil pool saat koneksi dikembalikan (ROLLBACK / reset query)
+        with _unobserved():
+            await super().reset(timeout=timeout)
+
+    def mark_idle(self) -> None:
+        self._idle_since = time.monotonic()
+
+    def idle_seconds(self) -> float:
+        if self._idle_since is None:
+            return 0.0
+        return time.monotonic() - self._idle_since
+
+
+class PoolStats:
+    """Counter sederhana untuk wait time dan kegagalan acquire."""
+
+    def __init__(self):
+        self.acquired = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self.unhealthy = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.replica_fallbacks = 0
+
+    def record_wait(self, seconds: float) -> None:
+        self.acquired += 1
+        self.wait_total += seconds
+        if seconds > self.wait_max:
+            self.wait_max = seconds
+
+
+# Lag replika dalam detik; 0 bila semua WAL yang diterima sudah di-replay (replika
+# yang idle tidak dianggap tertinggal) atau bila server bukan standby
+_REPLICA_LAG_SQL = """
+    SELECT CASE
+               WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+               ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END::float8
+"""
+
+# Error yang berarti server tidak bisa dihubungi, bukan kesalahan query
+_CONNECTION_ERRORS = (ConnectionError, asyncpg.PostgresConnectionError,
+                      asyncpg.ConnectionDoesNotExistError, asyncpg.CannotConnectNowError)
+
+
+class Replica:
+    """Satu replika baca beserta pool dan status kesehatannya."""
+
+    def __init__(self, index: int, dsn: str):
+        self.dsn = dsn
+        parts = urlsplit(dsn)
+        # Tanpa kredensial, untuk /health/db dan label metrik
+        self.name = f"{index}:{parts.hostname or 'localhost'}:{parts.port or 5432}"
+        self.pool: Optional[asyncpg.Pool] = None
+        self.down_until = 0.0
+        self.checked_at = 0.0
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reads = 0
+        self.failures = 0
+        self._lock = asyncio.Lock()
+
+    def available(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def mark_down(self, reason: str) -> None:
+        self.failures += 1
+        self.last_error = reason
+        self.down_until = time.monotonic() + _replica_retry
+        # Pool lama dibuang; koneksi baru dibuat saat replika dicoba lagi
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.terminate()
+
+    async def open(self) -> Optional[asyncpg.Pool]:
+        if self.pool is not None:
+            return self.pool
+        async with self._lock:
+            if self.pool is None and self.available(time.monotonic()):
+                try:
+                    self.pool = await asyncio.wait_for(_create_pool(self.dsn), timeout=_acquire_timeout)
+                    self.checked_at = 0.0
+                except Exception as e:
+                    logger.warning("Replika %s tidak bisa dihubungi: %s", self.name, e)
+                    self.mark_down(str(e) or type(e).__name__)
+        return self.pool
+
+    async def check_lag(self, conn) -> bool:
+        """Memeriksa lag paling sering sekali per ``DB_REPLICA_CHECK_INTERVAL``."""
+        now = time.monotonic()
+        if now - self.checked_at < _replica_check_interval:
+            return True
+        self.checked_at = now
+        with _unobserved():
+            self.lag = await conn.fetchval(_REPLICA_LAG_SQL)
+        if self.lag > _replica_max_lag:
+            logger.warning("Replika %s tertinggal %.1f s, dialihkan ke primary", self.name, self.lag)
+            self.failures += 1
+            self.last_error = f"lag {self.lag:.1f}s"
+            self.down_until = now + _replica_retry
+            return False
+        return True
+
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_options: dict = {}
+_acquire_timeout: float = 10.0
+_healthcheck_idle: float = 30.0
+stats = PoolStats()
+
+_replicas: List[Replica] = []
+_replica_next = 0
+_replica_retry: float = 30.0
+_replica_max_lag: float = 30.0
+_replica_check_interval: float = 10.0
+_read_your_writes_window: float = 10.0
+# key -> batas waktu (monotonic) bacaan sticky diarahkan ke primary
+_pinned: Dict[Hashable, float] = {}
+
+# Hook yang dijalankan untuk setiap koneksi baru di pool (misal query logger)
+_connection_hooks: List[Callable[[asyncpg.Connection], Awaitable[None]]] = []
+
+
+def add_connection_hook(hook: Callable[[asyncpg.Connection], Awaitable[None]]) -> None:
+    """
+    Mendaftarkan coroutine ``hook(conn)`` yang dipanggil untuk setiap koneksi
+    baru. Harus didaftarkan sebelum ``init_pool()``.
+    """
+    _connection_hooks.append(hook)
+
+
+async def _register_codecs(conn: asyncpg.Connection) -> None:
+    # Kolom json/jsonb langsung di-decode menjadi objek Python oleh orjson,
+    # sehingga handler tidak perlu json.loads per baris
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename, schema="pg_catalog",
+            encoder=fastjson.dumps_str, decoder=fastjson.loads, format="text",
+        )
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    await _register_codecs(conn)
+    for hook in _connection_hooks:
+        await hook(conn)
+
+
+async def connect(dsn: str) -> asyncpg.Connection:
+    """
+    Koneksi tersendiri di luar pool (misal untuk EXPLAIN slow query), dengan
+    codec json yang sama dengan koneksi pool. Query-nya tidak diobservasi.
+    """
+    conn = await asyncpg.connect(dsn, statement_cache_size=0)
+    await _register_codecs(conn)
+    return conn
+
+
+def _create_pool(dsn: str):
+    return asyncpg.create_pool(dsn, **_pool_options)
+
+
+async def init_pool(dsn: str, read_dsns: Sequence[str] = (), options: Optional[PoolSettings] = None) -> asyncpg.Pool:
+    """
+    Membuat pool global (dan pool replika baca bila ada). Dipanggil sekali dari
+    lifespan aplikasi dengan ``settings.pool``; tanpa ``options`` konfigurasi
+    dibaca dari environment. Replika yang belum bisa dihubungi tidak menggagalkan startup.
+    """
+    global _pool, _pool_options, _acquire_timeout, _healthcheck_idle, _replicas
+    global _replica_retry, _replica_max_lag, _replica_check_interval, _read_your_writes_window
+
+    if _pool is not None:
+        return _pool
+
+    options = options or PoolSettings.from_env()
+    _acquire_timeout = options.acquire_timeout
+    _healthcheck_idle = options.healthcheck_idle
+    _replica_retry = options.replica_retry_interval
+    _replica_max_lag = options.replica_max_lag
+    _replica_check_interval = options.replica_check_interval
+    _read_your_writes_window = options.read_your_writes_window
+
+    statement_cache_size = options.statement_cache_size if options.prepared_statements else 0
+
+    _pool_options = dict(
+        min_size=options.min_size,
+        max_size=options.max_size,
+        max_inactive_connection_lifetime=options.max_inactive_lifetime,
+        statement_cache_size=statement_cache_size,
+        connection_class=PooledConnection,
+        init=_init_connection,
+    )
+    _pool = await _create_pool(dsn)
+
+    _replicas = [Replica(i, read_dsn) for i, read_dsn in enumerate(read_dsns)]
+    await asyncio.gather(*(replica.open() for replica in _replicas))
+    return _pool
+
+
+async def _close(pool: asyncpg.Pool) -> None:
+    try:
+        await asyncio.wait_for(pool.close(), timeout=_acquire_timeout)
+    except asyncio.TimeoutError:
+        pool.terminate()
+
+
+async def close_pool() -> None:
+    global _pool, _replicas
+
+    if _pool is None:
+        return
+    pool, _pool = _pool, None
+    replicas, _replicas = _replicas, []
+    await asyncio.gather(_close(pool), *(_close(r.pool) for r in replicas if r.pool is not None))
+
+
+def get_pool() -> asyncpg.Pool:
+    if _pool is None:
+        raise RuntimeError("Database pool belum diinisialisasi; panggil init_pool() terlebih dahulu.")
+    return _pool
+
+
+async def _acquire(pool: asyncpg.Pool):
+    start = time.perf_counter()
+    stats.waiting += 1
+    try:
+        conn = await pool.acquire(timeout=_acquire_timeout)
+    except asyncio.TimeoutError:
+        stats.timeouts += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Database sedang sibuk, silakan coba lagi.",
+            headers={"Retry-After": "1"},
+        )
+    finally:
+        stats.waiting -= 1
+        profile = profiling.current.get()
+        if profile is not None:
+            profile.pool_wait += time.perf_counter() - start
+    stats.record_wait(time.perf_counter() - start)
+    return conn
+
+
+async def _is_alive(conn) -> bool:
+    try:
+        with _unobserved():
+            await conn.execute("SELECT 1")
+        return True
+    except (OSError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError):
+        return False
+
+
+async def _borrow(pool: asyncpg.Pool):
+    conn = await _acquire(pool)
+
+    if _healthcheck_idle and conn.idle_seconds() > _healthcheck_idle and not await _is_alive(conn):
+        # Koneksi basi (misal diputus oleh pooler), buang dan pinjam yang baru
+        stats.unhealthy += 1
+        conn.terminate()
+        await pool.release(conn)
+        conn = await _acquire(pool)
+    return conn
+
+
+async def _borrow_replica():
+    """``(replika, pool, koneksi)`` dari replika sehat berikutnya, atau ``None``."""
+    global _replica_next
+
+    now = time.monotonic()
+    start = _replica_next
+    _replica_next = (_replica_next + 1) % len(_replicas)
+    for offset in range(len(_replicas)):
+        replica = _replicas[(start + offset) % len(_replicas)]
+        if not replica.available(now):
+            continue
+        pool = await replica.open()
+        if pool is None:
+            continue
+        conn = None
+        try:
+            conn = await _borrow(pool)
+            if await replica.check_lag(conn):
+                replica.reads += 1
+                borrowed, conn = conn, None
+                return replica, pool, borrowed
+        except (OSError, *_CONNECTION_ERRORS) as e:
+            # mark_down menutup pool replika beserta koneksinya
+            replica.mark_down(str(e) or type(e).__name__)
+            conn = None
+        finally:
+            # Koneksi yang tidak diserahkan ke pemanggil selalu kembali ke pool, juga
+            # saat check_lag gagal dengan error lain (misal HTTPException dari admission)
+            if conn is not None:
+                conn.mark_idle()
+                await pool.release(conn)
+    stats.replica_fallbacks += 1
+    return None
+
+
+def pin_primary(key: Hashable) -> None:
+    """
+    Read-your-writes: selama ``DB_READ_YOUR_WRITES_WINDOW`` detik, bacaan dengan
+    ``sticky=key`` dilayani primary. Dipanggil setelah transaksi tulis commit.
+    """
+    if not _replicas:
+        return
+    now = time.monotonic()
+    if len(_pinned) > 10000:
+        for stale in [k for k, until in _pinned.items() if until <= now]:
+            del _pinned[stale]
+    _pinned[key] = now + _read_your_writes_window
+
+
+def is_pinned(key: Hashable) -> bool:
+    until = _pinned.get(key)
+    return until is not None and until > time.monotonic()
+
+
+@asynccontextmanager
+async def get_db(readonly: bool = False, sticky: Optional[Hashable] = None):
+    """
+    Meminjam satu koneksi dari pool dan selalu mengembalikannya, termasuk
+    ketika handler melempar exception::
+
+        async with get_db() as conn:
+            ...
+
+    ``readonly=True`` menandai pemanggil hanya membaca sehingga boleh dilayani
+    replika; ``sticky`` adalah key (misal id alumni) yang baru ditulis dan harus
+    dibaca dari primary (lihat ``pin_primary``).
+    """
+    borrowed = None
+    if readonly and _replicas and not (sticky is not None and is_pinned(sticky)):
+        borrowed = await _borrow_replica()
+    if borrowed is None:
+        replica, pool = None, get_pool()
+        conn = await _borrow(pool)
+    else:
+        replica, pool, conn = borrowed
+
+    try:
+        yield conn
+    except _CONNECTION_ERRORS as e:
+        # Replika putus di tengah request: request ini gagal, berikutnya ke replika lain/primary
+        if replica is not None:
+            replica.mark_down(str(e) or type(e).__name__)
+        raise
+    finally:
+        conn.mark_idle()
+        if replica is None or replica.pool is pool:
+            await pool.release(conn)
+
+
+def pool_stats() -> dict:
+    """Ringkasan saturasi pool dan waktu tunggu acquire."""
+    if _pool is None:
+        return {"initialized": False}
+
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    max_size = _pool.get_max_size()
+    in_use = size - idle
+    return {
+        "initialized": True,
+        "size": size,
+        "idle": idle,
+        "in_use": in_use,
+        "min_size": _pool.get_min_size(),
+        "max_size": max_size,
+        "saturation": round(in_use / max_size, 3) if max_size else 0.0,
+        "waiting": stats.waiting,
+        "acquired_total": stats.acquired,
+        "acquire_timeouts": stats.timeouts,
+        "unhealthy_replaced": stats.unhealthy,
+        "acquire_wait_avg_ms": round(stats.wait_total / stats.acquired * 1000, 3) if stats.acquired else 0.0,
+        "acquire_wait_max_ms": round(stats.wait_max * 1000, 3),
+        "replicas": [replica_stats(replica) for replica in _replicas],
+        "replica_fallbacks": stats.replica_fallbacks,
+    }
+
+
+def replica_stats(replica: Replica) -> dict:
+    pool = replica.pool
+    return {
+        "name": replica.name,
+        "healthy": pool is not None and replica.available(time.monotonic()),
+        "size": pool.get_size() if pool is not None else 0,
+        "in_use": pool.get_size() - pool.get_idle_size() if pool is not None else 0,
+        "reads": replica.reads,
+        "failures": replica.failures,
+        "lag_seconds": replica.lag,
+        "last_error": replica.last_error,
+    }
+
+
+def replicas() -> List[Replica]:
+    return list(_replicas)
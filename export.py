@@ -0,0 +1,199 @@
+"""
+Ekspor data tracer dalam bentuk tabel datar: satu baris per alumni dan satu
+kolom per pertanyaan kuesioner.
+
+CSV dialirkan langsung dari ``COPY ... TO STDOUT`` tanpa membentuk Record di
+Python. XLSX ditulis bertahap dengan mode ``constant_memory`` XlsxWriter ke file
+sementara, jadi memori tetap terbatas berapa pun besar angkatannya.
+"""
+import asyncio
+import codecs
+import csv
+import io
+import os
+import tempfile
+from typing import Optional
+from uuid import UUID
+
+from starlette.concurrency import run_in_threadpool
+
+from db import get_db
+
+# Kolom tetap sebelum kolom-kolom pertanyaan: (judul kolom, ekspresi SQL)
+BASE_COLUMNS = [
+    ("id_alumni", "a.id_alumni"),
+    ("nis", "a.nis"),
+    ("nisn", "a.nisn"),
+    ("nik", "a.nik"),
+    ("nama_siswa", "a.nama_siswa"),
+    ("tanggal_lahir", "a.tanggal_lahir"),
+    ("tahun_lulus", "a.tahun_lulus"),
+    ("alamat_email", "a.alamat_email"),
+    ("no_telepon", "a.no_telepon"),
+    ("is_filled", "COALESCE(t.is_filled, false)"),
+    ("fill_date", "t.fill_date"),
+    ("status", "s.status"),
+    ("perguruan_tinggi", "pt.perguruan_tinggi"),
+    ("program_studi", "ps.nama_program_studi"),
+    ("sumber_biaya", "sb.sumber_biaya"),
+    ("tahun_masuk", "dpt.tahun_masuk"),
+    ("bukti_kuliah", "dpt.bukti_kuliah"),
+]
+
+XLSX_BATCH_SIZE = 1000
+COPY_QUEUE_SIZE = 16
+
+
+def build_export_query(master_questions, compact: bool = False):
+    """
+    Menyusun query pivot dan daftar judul kolomnya dari daftar master pertanyaan
+    (sama dengan yang dipakai /tracer/all). Alias kolom pertanyaan dibuat
+    sintetis (``q_<id>``) karena teks pertanyaan bisa melebihi batas 63 byte
+    identifier Postgres; judul aslinya ditulis sendiri di baris header.
+    ``compact`` memilih sumber jawaban ``tracer.jawaban`` (lihat answer_storage.py);
+    master pertanyaannya lalu harus memuat ``posisi_jawaban``.
+    """
+    headers = [name for name, _ in BASE_COLUMNS]
+    select = [f"{expr} AS {name}" for name, expr in BASE_COLUMNS]
+    pivot = []
+    for question in master_questions:
+        q_id = int(question["id_kuesioner"])
+        headers.append(question["pertanyaan"])
+        select.append(f"ans.q_{q_id}")
+        if compact:
+            match = f"dk.posisi = {int(question['posisi_jawaban'])}"
+        else:
+            match = f"dk.id_kuesioner = {q_id}"
+        pivot.append(f"MAX(j.jawaban) FILTER (WHERE {match}) AS q_{q_id}")
+
+    answers_join = ""
+    if pivot and compact:
+        # Array di-unnest di tempat: tanpa lookup indeks per tracer
+        answers_join = f"""
+            LEFT JOIN LATERAL (
+                SELECT {", ".join(pivot)}
+                FROM unnest(t.jawaban) WITH ORDINALITY AS dk(id_jawaban, posisi)
+                JOIN jawaban j ON dk.id_jawaban = j.id_jawaban
+            ) ans ON true"""
+    elif pivot:
+        answers_join = f"""
+            LEFT JOIN LATERAL (
+                SELECT {", ".join(pivot)}
+                FROM detail_kuesioner dk
+                JOIN jawaban j ON dk.id_jawaban = j.id_jawaban
+                WHERE dk.id_tracer = t.id_tracer
+            ) ans ON true"""
+
+    query = f"""
+        SELECT {", ".join(select)}
+        FROM alumni a
+                 LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
+                 LEFT JOIN status s ON t.kode_status = s.kode_status
+                 LEFT JOIN detail_pendidikan_tinggi dpt ON t.id_tracer = dpt.id_tracer
+                 LEFT JOIN perguruan_tinggi pt ON dpt.id_perguruan_tinggi = pt.id_perguruan_tinggi
+                 LEFT JOIN program_studi ps ON dpt.id_program_studi = ps.id_program_studi
+                 LEFT JOIN sumber_biaya sb ON dpt.id_sumber_biaya = sb.id_sumber_biaya
+                 {answers_join}
+        WHERE ($1::int IS NULL OR a.tahun_lulus = $1::int)
+        ORDER BY a.tahun_lulus DESC, a.nama_siswa ASC, a.id_alumni ASC
+    """
+    return query, headers
+
+
+def _csv_header(headers) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(headers)
+    # BOM agar Excel membaca file sebagai UTF-8
+    return codecs.BOM_UTF8 + buffer.getvalue().encode("utf-8")
+
+
+async def stream_csv(master_questions, tahun_lulus: Optional[int], compact: bool = False):
+    """Generator bytes CSV yang diisi langsung dari COPY ... TO STDOUT."""
+    query, headers = build_export_query(master_questions, compact)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=COPY_QUEUE_SIZE)
+    done = object()
+
+    async def _sink(chunk: bytes):
+        # Queue terbatas memberi backpressure ke COPY ketika klien lambat
+        await queue.put(bytes(chunk))
+
+    async def _copy():
+        try:
+            async with get_db(readonly=True) as conn:
+                await conn.copy_from_query(query, tahun_lulus, output=_sink, format="csv")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await queue.put(done)
+            raise
+        await queue.put(done)
+
+    yield _csv_header(headers)
+    task = asyncio.create_task(_copy())
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is done:
+                break
+            yield chunk
+        # Lempar ulang error COPY (jika ada) setelah antrean habis
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+def _xlsx_value(value):
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+async def write_xlsx(master_questions, tahun_lulus: Optional[int], compact: bool = False) -> str:
+    """
+    Menulis ekspor ke file XLSX sementara dan mengembalikan path-nya. Pemanggil
+    bertanggung jawab menghapus file setelah dikirim.
+    """
+    import xlsxwriter
+
+    query, headers = build_export_query(master_questions, compact)
+    fd, path = tempfile.mkstemp(prefix="tracer-export-", suffix=".xlsx")
+    os.close(fd)
+
+    workbook = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd",
+    })
+    try:
+        worksheet = workbook.add_worksheet("Tracer Study")
+        worksheet.write_row(0, 0, headers, workbook.add_format({"bold": True}))
+        worksheet.freeze_panes(1, 0)
+
+        def _write_batch(start_row, records):
+            for offset, record in enumerate(records):
+                worksheet.write_row(start_row + offset, 0, [_xlsx_value(v) for v in record])
+
+        row_index = 1
+        async with get_db(readonly=True) as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query, tahun_lulus)
+                while True:
+                    records = await cursor.fetch(XLSX_BATCH_SIZE)
+                    if not records:
+                        break
+                    # Penulisan sel dan kompresi zip dijalankan di thread agar event loop tetap bebas
+                    await run_in_threadpool(_write_batch, row_index, records)
+                    row_index += len(records)
+
+        await run_in_threadpool(workbook.close)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    return path
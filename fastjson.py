@@ -0,0 +1,69 @@
+"""
+Encoding/decoding JSON cepat berbasis ``orjson``.
+
+``orjson`` menulis langsung ke ``bytes`` dan menangani ``date``, ``datetime``
+dan ``UUID`` (selain subclass milik asyncpg) secara native, sehingga payload besar seperti ``/tracer/all``
+tidak perlu lagi melewati ``jsonable_encoder`` (yang menyalin seluruh struktur
+secara rekursif) lalu ``json.dumps``.
+
+- ``dumps``/``loads``: dipakai untuk body respons, cursor, dan codec
+  ``json``/``jsonb`` di setiap koneksi (lihat ``db._init_connection``).
+- ``FastJSONResponse``: kelas respons default aplikasi. Konten berupa
+  ``bytes`` dianggap sudah berupa JSON jadi dan dikirim apa adanya.
+"""
+import time
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+import asyncpg
+import orjson
+from starlette.responses import Response
+
+import profiling
+
+loads = orjson.loads
+
+
+def _default(value: Any):
+    if isinstance(value, UUID):
+        # asyncpg mengembalikan subclass UUID miliknya sendiri yang tidak dikenali orjson
+        return str(value)
+    if isinstance(value, Decimal):
+        # Sama dengan jsonable_encoder: bilangan bulat tetap int
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, asyncpg.Record):
+        return dict(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(data: Any) -> bytes:
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dumps(data: Any) -> bytes:
+    profile = profiling.current.get()
+    if profile is None:
+        return _dumps(data)
+    start = time.perf_counter()
+    try:
+        return _dumps(data)
+    finally:
+        profile.encode += time.perf_counter() - start
+
+
+def dumps_str(data: Any) -> str:
+    """Untuk tempat yang butuh ``str``, misal encoder codec ``jsonb`` asyncpg."""
+    # Tidak dihitung sebagai waktu encode profil: sudah termasuk durasi query
+    return _dumps(data).decode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
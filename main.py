@@ -1,101 +1,284 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Form, Header, Query, Request, Response, Depends
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, ValidationError
 
+import asyncio
 import asyncpg
+import logging
 import os
-from dotenv import load_dotenv
+import time
+import uuid
 from datetime import date
 from typing import Optional, Dict, Annotated
-import hypercorn
-from supabase import create_client, Client
 import json
+import base64
+from contextlib import asynccontextmanager
 
-load_dotenv()  # loads from .env file
+from db import init_pool, close_pool, connect, get_db, is_pinned, pin_primary, pool_stats
+from models import (
+    AlumniCheckRequest, TracerData, AlumniCreate, AlumniDeleteRequest, LoginRequest, RefreshTokenRequest,
+    PersonalData, DetailPendidikan, SubmissionPayload, UploadUrlRequest,
+)
+from cache import IdempotencyCache, JsonBody, LRUCache, NotifyListener, ReferenceCache
+import export
+import admission
+import alumni_import
+import alumni_search
+import answer_storage
+import statistik
+import submission
+import metrics
+import profiling
+import auth
+from auth import require_admin
+import fastjson
+from fastjson import FastJSONResponse
+import migrate
+from settings import Settings
+from slow_queries import SlowQueryLog
+from submission_queue import SubmissionQueue
+from storage import (
+    PDF_CONTENT_TYPE, LocalStorage, StorageBackend, StorageError, bukti_kuliah_path, create_storage, inspect_upload,
+    iter_upload,
+)
+from starlette.concurrency import run_in_threadpool
 
-# Connect Supabase via API
-url : str = os.environ.get('SUPABASE_API_URL')
-key : str = os.environ.get('SUPABASE_API_KEY')
+logger = logging.getLogger(__name__)
 
-DATABASE_URL = os.getenv("SUPABASE_DB_URL")
+router = APIRouter(default_response_class=FastJSONResponse)
+
+# Layanan level modul yang dipakai endpoint. Semuanya diisi ulang oleh
+# create_app(); nilai awal di sini hanya agar modul bisa diimpor tanpa environment.
+settings = Settings()
+storage: Optional[StorageBackend] = None
+reference_cache = ReferenceCache()
+cube_cache = LRUCache()
+idempotency_cache = IdempotencyCache()
+submission_queue: Optional[SubmissionQueue] = None
+slow_query_log: Optional[SlowQueryLog] = None
 
-supabase: Client = create_client(url, key)
-app = FastAPI(
-    title="Tracer Study SMA API",
-    version="1.0.0",
-    description="Dokumentasi API untuk tracer study alumni SMA"
-)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# Kelas admission control per route (lihat admission.py). Dicocokkan berurutan
+# dengan prefix path; health check, metrik dan dokumentasi tidak dibatasi.
+_UNLIMITED_PREFIXES = ("/health", "/metrics", "/debug", "/docs", "/redoc", "/openapi.json", "/storage")
+_ADMIN_PREFIXES = (
+    "/tracer/all", "/tracer/export", "/alumni/bulk", "/alumni/search", "/alumni/create",
+    "/statistik/", "/referensi/cache/invalidate",
 )
+_SUBMIT_ROUTES = {("POST", "/questionnaire/submit"), ("POST", "/questionnaire/upload-url"), ("POST", "/tracer/submit")}
+
+
+def _route_class(method: str, path: str) -> Optional[str]:
+    if path.startswith(_UNLIMITED_PREFIXES):
+        return None
+    if (method, path) in _SUBMIT_ROUTES:
+        return admission.SUBMIT
+    if path.startswith(_ADMIN_PREFIXES) or (method == "DELETE" and path.startswith("/alumni")):
+        return admission.ADMIN
+    return admission.PUBLIC
+
+
+def _alumni_key(id_alumni) -> str:
+    """Key read-your-writes per alumni (lihat ``db.pin_primary``), dalam bentuk UUID kanonik."""
+    try:
+        return str(uuid.UUID(str(id_alumni)))
+    except ValueError:
+        return str(id_alumni)
+
+
+def _supabase_client_factory(settings: Settings):
+    def factory():
+        # Import di sini: library supabase menambah ratusan milidetik ke cold start
+        from supabase import create_client
+        return create_client(settings.supabase_api_url, settings.supabase_api_key)
+    return factory
+
+
+async def _warm_up() -> None:
+    """
+    Mengisi cache data referensi sebelum worker dinyatakan siap, sehingga
+    request pertama tidak membayar cold cache.
+    """
+    tasks = {
+        "perguruan_tinggi": reference_cache.get("perguruan_tinggi", _load_pt_prodi),
+        "kuesioner": reference_cache.get("kuesioner", _load_kuesioner),
+        "status": reference_cache.get("status", _load_status),
+        "jawaban": reference_cache.get("jawaban", _load_jawaban),
+        "quesioner_metadata": reference_cache.get("quesioner_metadata", _load_questioner_metadata),
+        "program_studi": reference_cache.get("program_studi", _load_program_studi),
+    }
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for name, result in zip(tasks, results):
+        # Gagal warm-up tidak fatal: entry akan dimuat ulang saat pertama diminta
+        if isinstance(result, Exception):
+            logger.warning("Warm-up %s gagal: %s", name, result)
 
 
-async def get_db():
-    return await asyncpg.connect(DATABASE_URL, statement_cache_size=0)
-
-# Models
-class AlumniCheckRequest(BaseModel):
-    nisn: str
-    nis: str
-    nik: str
-    tanggal_lahir: date
-
-class TracerData(BaseModel):
-    id_alumni: str
-    alamat_email: str
-    no_telepon: str
-    status: str
-    perguruan_tinggi: str
-    program_studi: str
-    sumber_biaya: str
-    tahun_masuk: int
-    jawaban_kuesioner: dict
-
-class AlumniCreate(BaseModel):
-    nisn: str
-    nis: str
-    nik: str
-    nama_siswa: str
-    tanggal_lahir: date
-    tahun_lulus: int
-
-class LoginRequest(BaseModel):
-    email: str = Form(...)
-    password: str = Form(...)
-
-class PersonalData(BaseModel):
-    alamat_email: str
-    no_telepon: str
-
-class DetailPendidikan(BaseModel):
-    id_perguruan_tinggi: int
-    id_program_studi: int
-    tahun_masuk: int
-    id_sumber_biaya: int
-
-class SubmissionPayload(BaseModel):
-    id_alumni: str
-    personal_data: PersonalData
-    status: str
-    kuesioner: Dict[int, int]
-    detail_pendidikan: Optional[DetailPendidikan] = None
+async def _start_storage() -> None:
+    try:
+        await storage.start()
+    except Exception as e:
+        # Client dicoba lagi saat upload pertama; error-nya sampai ke klien sebagai 502
+        logger.warning("Client storage belum bisa dibuat: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    app.state.ready = False
+    settings.require()
+
+    # Pool dibuat sekali saat startup dan dipakai bersama oleh semua request
+    await init_pool(settings.database_url, settings.read_database_urls, settings.pool)
+    if settings.migrate_on_startup:
+        # Koneksi langsung di luar pool: lock migrasi adalah lock sesi (lihat migrate.py)
+        migrate_conn = await connect(settings.migrate_database_url or settings.database_url)
+        try:
+            await migrate.migrate(migrate_conn)
+        finally:
+            await migrate_conn.close()
+    async with get_db() as conn:
+        await statistik.ensure_schema(conn)
+    profiling.start()
+    if slow_query_log is not None:
+        slow_query_log.start()
+    if submission_queue is not None:
+        await submission_queue.start()
+
+    # Client storage (ratusan milidetik untuk Supabase) disiapkan di background:
+    # hanya dibutuhkan upload, jadi tidak perlu menunda readiness
+    storage_task = asyncio.create_task(_start_storage())
+    if settings.warm_on_startup:
+        await _warm_up()
+
+    # LISTEN butuh koneksi sesi; aktifkan hanya jika tersedia DSN langsung (bukan pooler transaction)
+    listener = None
+    if settings.referensi_cache_listen:
+        listen_dsn = settings.listen_database_url or settings.database_url
+        listener = NotifyListener(listen_dsn, settings.referensi_cache_channel, reference_cache)
+        listener.start()
+
+    app.state.startup_seconds = round(time.perf_counter() - started, 3)
+    app.state.ready = True
+    logger.info("Worker %d siap dalam %.3f s", os.getpid(), app.state.startup_seconds)
+    try:
+        yield
+    finally:
+        # Berhenti menerima traffic baru dari load balancer sebelum resource ditutup
+        app.state.ready = False
+        storage_task.cancel()
+        if listener is not None:
+            await listener.stop()
+        # Batch yang sedang berjalan diselesaikan dulu; sisanya tetap di jurnal
+        if submission_queue is not None:
+            await submission_queue.stop()
+        if slow_query_log is not None:
+            await slow_query_log.stop()
+        profiling.stop()
+        await close_pool()
+
+
+def create_app(app_settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Membuat aplikasi FastAPI. Tidak ada koneksi jaringan di sini: pool database
+    dibuka di lifespan dan client Supabase dibuat saat pertama dibutuhkan.
+    """
+    global settings, storage, reference_cache, cube_cache, idempotency_cache, submission_queue, slow_query_log
+
+    settings = app_settings or Settings.from_env()
+    # Penyimpanan bukti kuliah (Supabase Storage atau filesystem lokal)
+    storage = create_storage(_supabase_client_factory(settings), options=settings.storage)
+    # Kunci dan masa berlaku token admin; kunci kosong ditolak settings.require() di lifespan
+    auth.configure(settings.auth)
+    # Cache data referensi: TTL di sisi server, max-age untuk browser/CDN
+    reference_cache = ReferenceCache(ttl=settings.referensi_cache_ttl, max_age=settings.referensi_cache_max_age)
+    # Hasil /statistik/cube per (dimensi, ukuran, filter); dikosongkan setiap ada tulisan
+    # yang commit. TTL membatasi data basi dari tulisan di worker lain.
+    cube_cache = LRUCache(maxsize=settings.cube_cache_size, ttl=settings.cube_cache_ttl)
+    # Respons submit kuesioner yang sudah selesai, untuk retry dan double-click
+    idempotency_cache = IdempotencyCache(maxsize=settings.idempotency_cache_size, ttl=settings.idempotency_ttl)
+    # Antrean write-behind /questionnaire/submit (opsional)
+    submission_queue = None
+    if settings.submit_queue_enabled:
+        submission_queue = SubmissionQueue(
+            settings.submit_queue_path,
+            batch_size=settings.submit_queue_batch_size,
+            max_pending=settings.submit_queue_max_pending,
+            on_applied=lambda: cube_cache.invalidate(),
+            discard_files=lambda paths: storage.discard(paths),
+        )
+    # Query di atas SLOW_QUERY_MS dicatat beserta EXPLAIN-nya (0 untuk mematikan)
+    slow_query_log = None
+    if settings.slow_query_ms > 0:
+        slow_query_log = SlowQueryLog(
+            settings.slow_query_dsn or settings.database_url,
+            threshold=settings.slow_query_ms / 1000,
+            keep=settings.slow_query_keep,
+            explain_interval=settings.slow_query_explain_interval,
+            analyze_max=settings.slow_query_analyze_max,
+        )
+
+    app = FastAPI(
+        title="Tracer Study SMA API",
+        version="1.0.0",
+        description="Dokumentasi API untuk tracer study alumni SMA",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
+    app.state.settings = settings
+    app.state.ready = False
+
+    # Paling dalam: profil hanya mengukur kerja handler, bukan antrean admission
+    profiling.configure(settings.profiling)
+    app.add_middleware(profiling.ProfilingMiddleware, authorize=auth.is_admin_token)
+
+    # Ditambahkan sebelum CORS (jadi berada di dalamnya) agar respons 503 hasil
+    # load shedding tetap membawa header CORS
+    admission.configure(settings.admission)
+    app.add_middleware(admission.AdmissionMiddleware, classify=_route_class)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Paling luar agar latensi yang tercatat mencakup seluruh middleware
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    # Backend lokal menyajikan sendiri file yang diupload (untuk test dan self-hosting)
+    if isinstance(storage, LocalStorage) and storage.base_url.startswith("/"):
+        os.makedirs(storage.root, exist_ok=True)
+        app.mount(storage.base_url, StaticFiles(directory=storage.root), name="storage")
+
+    app.include_router(router)
+    return app
+
 
 # 1. Check alumni
-@app.post("/alumni/check")
+# Dilayani indeks alumni_check_idx dan tracer_id_alumni_key (migrations/0001, 0002)
+CHECK_ALUMNI_SQL = """
+    SELECT a.id_alumni, COALESCE(t.is_filled, false) AS is_filled
+    FROM alumni a
+    LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
+    WHERE a.nisn = $1 AND a.nis = $2 AND a.nik = $3 AND a.tanggal_lahir = $4
+"""
+
+
+@router.post("/alumni/check")
 async def check_alumni(data: AlumniCheckRequest):
-    conn = await get_db()
-    result = await conn.fetchrow("""
-        SELECT a.id_alumni, COALESCE(t.is_filled, false) AS is_filled
-        FROM alumni a
-        LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
-        WHERE a.nisn = $1 AND a.nis = $2 AND a.nik = $3 AND a.tanggal_lahir = $4
-    """, data.nisn, data.nis, data.nik, data.tanggal_lahir)
-    await conn.close()
+    args = (data.nisn, data.nis, data.nik, data.tanggal_lahir)
+    async with get_db(readonly=True) as conn:
+        result = await conn.fetchrow(CHECK_ALUMNI_SQL, *args)
+    if result and is_pinned(_alumni_key(result["id_alumni"])):
+        # Alumni ini baru saja submit: is_filled dibaca ulang dari primary
+        async with get_db() as conn:
+            result = await conn.fetchrow(CHECK_ALUMNI_SQL, *args)
 
     if result:
         return {
@@ -105,47 +288,123 @@ async def check_alumni(data: AlumniCheckRequest):
     raise HTTPException(status_code=404, detail="Alumni not found")
 
 # 2. Submit tracer study
-@app.post("/tracer/submit")
-async def submit_tracer(data: TracerData, bukti_kuliah: UploadFile = File(...)):
-    conn = await get_db()
-    status_id = await conn.fetchval("SELECT kode_status FROM status WHERE status=$1", data.status)
-    pt_id = await conn.fetchval("SELECT id_perguruan_tinggi FROM perguruan_tinggi WHERE perguruan_tinggi=$1", data.perguruan_tinggi)
-    ps_id = await conn.fetchval("SELECT id_program_studi FROM program_studi WHERE nama_program_studi=$1", data.program_studi)
-    sumber_id = await conn.fetchval("SELECT id_sumber_biaya FROM sumber_biaya WHERE sumber_biaya=$1", data.sumber_biaya)
-    tracer_id = await conn.fetchval("""
-        INSERT INTO tracer(id_alumni, kode_status, is_filled, fill_date)
-        VALUES($1, $2, true, CURRENT_DATE)
-        RETURNING id_tracer
-    """, data.id_alumni, status_id)
-
-    contents = await bukti_kuliah.read()
-    await conn.execute("""
-        INSERT INTO detail_pendidikan_tinggi(id_tracer, id_perguruan_tinggi, id_program_studi, tahun_masuk, id_sumber_biaya, bukti_kuliah)
-        VALUES($1, $2, $3, $4, $5, $6)
-    """, tracer_id, pt_id, ps_id, data.tahun_masuk, sumber_id, contents)
-
-    for q_name, a_text in data.jawaban_kuesioner.items():
-        q_id = await conn.fetchval("SELECT id_kuesioner FROM kuesioner WHERE pertanyaan=$1", q_name)
-        a_id = await conn.fetchval("SELECT id_jawaban FROM jawaban WHERE jawaban=$1", a_text)
-        await conn.execute("""
-            INSERT INTO detail_kuesioner(id_tracer, id_kuesioner, id_jawaban)
-            VALUES($1, $2, $3)
-        """, tracer_id, q_id, a_id)
+# Semua nama referensi diterjemahkan ke id dalam satu round trip; urutan array
+# hasil sama dengan urutan nama pada parameter ($6/$7).
+RESOLVE_TRACER_NAMES_SQL = """
+    SELECT (SELECT tahun_lulus FROM alumni WHERE id_alumni = $1)                                     AS tahun_lulus,
+           (SELECT kode_status FROM status WHERE status = $2 LIMIT 1)                                AS kode_status,
+           (SELECT id_perguruan_tinggi FROM perguruan_tinggi WHERE perguruan_tinggi = $3 LIMIT 1)    AS id_perguruan_tinggi,
+           (SELECT id_program_studi FROM program_studi WHERE nama_program_studi = $4 LIMIT 1)        AS id_program_studi,
+           (SELECT id_sumber_biaya FROM sumber_biaya WHERE sumber_biaya = $5 LIMIT 1)                AS id_sumber_biaya,
+           ARRAY(SELECT (SELECT k.id_kuesioner FROM kuesioner k WHERE k.pertanyaan = n.name LIMIT 1)
+                 FROM unnest($6::text[]) WITH ORDINALITY AS n(name, ord)
+                 ORDER BY n.ord)                                                                     AS id_kuesioner,
+           ARRAY(SELECT (SELECT j.id_jawaban FROM jawaban j WHERE j.jawaban = n.name LIMIT 1)
+                 FROM unnest($7::text[]) WITH ORDINALITY AS n(name, ord)
+                 ORDER BY n.ord)                                                                     AS id_jawaban
+"""
+
+
+@router.post("/tracer/submit")
+async def submit_tracer(data_str: Annotated[str, Form(alias="data")], bukti_kuliah: UploadFile = File(...)):
+    """
+    Jalur submit lama berbasis nama (status, perguruan tinggi, pertanyaan, jawaban).
+
+    - **data**: String JSON ``TracerData``.
+    - **bukti_kuliah**: File bukti kuliah; disimpan ke storage, URL-nya ke database.
+
+    Setiap alumni punya tepat satu baris tracer: submit (ulang) meng-update baris
+    itu, seperti ``/questionnaire/submit``.
+    """
+    try:
+        data = TracerData.model_validate_json(data_str)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    size, _ = await inspect_upload(bukti_kuliah, settings.bukti_kuliah_max_bytes)
+    metrics.observe_upload("bukti_kuliah", size)
+    question_names = [str(q_name) for q_name in data.jawaban_kuesioner.keys()]
+    answer_names = [str(a_text) for a_text in data.jawaban_kuesioner.values()]
+
+    # Sama seperti _save_submission: file diupload sebelum transaksi dan
+    # dihapus kembali bila transaksi gagal
+    file_name = bukti_kuliah_path(_alumni_key(data.id_alumni))
+    try:
+        file_created = await storage.upload(file_name, iter_upload(bukti_kuliah), PDF_CONTENT_TYPE)
+    except StorageError as e:
+        raise HTTPException(status_code=502, detail=f"Upload bukti kuliah gagal: {str(e)}")
 
-    await conn.close()
+    try:
+        async with get_db() as conn, conn.transaction():
+            ids = await conn.fetchrow(
+                RESOLVE_TRACER_NAMES_SQL, data.id_alumni, data.status, data.perguruan_tinggi,
+                data.program_studi, data.sumber_biaya, question_names, answer_names
+            )
+            if ids["tahun_lulus"] is None:
+                raise HTTPException(status_code=404, detail="Alumni not found")
+
+            # Tolak nama yang tidak dikenal alih-alih menyimpan id NULL
+            errors = []
+            for field, column in (("status", "kode_status"), ("perguruan_tinggi", "id_perguruan_tinggi"),
+                                  ("program_studi", "id_program_studi"), ("sumber_biaya", "id_sumber_biaya")):
+                if ids[column] is None:
+                    errors.append({"loc": ["body", field], "msg": "Nama tidak ditemukan", "input": getattr(data, field)})
+            for q_name, a_text, q_id, a_id in zip(question_names, answer_names, ids["id_kuesioner"], ids["id_jawaban"]):
+                if q_id is None:
+                    errors.append({"loc": ["body", "jawaban_kuesioner", q_name], "msg": "Pertanyaan tidak ditemukan", "input": q_name})
+                if a_id is None:
+                    errors.append({"loc": ["body", "jawaban_kuesioner", q_name], "msg": "Jawaban tidak ditemukan", "input": a_text})
+            if errors:
+                raise HTTPException(status_code=422, detail=errors)
+
+            # Baris tracer alumni dikunci dan di-update beserta status lamanya; alumni
+            # lama yang belum punya baris tracer dibuatkan dulu (kosong)
+            tracer_rows = await conn.fetch(SUBMIT_TRACER_UPDATE_SQL, ids["kode_status"], data.id_alumni)
+            if not tracer_rows:
+                await conn.execute("""
+                    INSERT INTO tracer(id_alumni, is_filled)
+                    VALUES($1, FALSE)
+                    ON CONFLICT (id_alumni) DO NOTHING
+                """, data.id_alumni)
+                tracer_rows = await conn.fetch(SUBMIT_TRACER_UPDATE_SQL, ids["kode_status"], data.id_alumni)
+            tracer = tracer_rows[0]
+            tracer_id = tracer["id_tracer"]
+
+            await submission.upsert_pendidikan(conn, [(
+                tracer_id, ids["id_perguruan_tinggi"], ids["id_program_studi"], data.tahun_masuk,
+                ids["id_sumber_biaya"], storage.public_url(file_name),
+            )])
+
+            # Nama pertanyaan berbeda bisa menunjuk id yang sama; yang terakhir berlaku
+            answers = dict(zip(ids["id_kuesioner"], ids["id_jawaban"]))
+            answer_deltas = await submission.upsert_answers(conn, [
+                (tracer_id, q_id, a_id) for q_id, a_id in answers.items()
+            ], {tracer_id: tracer["tahun_lulus"]})
+
+            await statistik.record_tracer_change(
+                conn, tracer["tahun_lulus"], tracer["old_is_filled"], tracer["old_kode_status"],
+                True, ids["kode_status"]
+            )
+            await statistik.record_answer_deltas(conn, answer_deltas)
+    except Exception:
+        if file_created:
+            await storage.discard([file_name])
+        raise
+    # Data alumni sudah berubah: submit ulang payload lama lewat /questionnaire/submit
+    # tidak boleh lagi dijawab dari cache
+    idempotency_cache.forget(("alumni", _alumni_key(data.id_alumni)))
+    pin_primary(_alumni_key(data.id_alumni))
+    cube_cache.invalidate()
     return {"message": "Tracer data submitted successfully"}
 
 # 3. Get Perguruan Tinggi dan Program Studi
-@app.get("/referensi/perguruan-tinggi")
-async def get_pt_prodi():
-    conn = await get_db()
-    rows = await conn.fetch("""
-        SELECT pt.id_perguruan_tinggi, pt.perguruan_tinggi, ps.id_program_studi, ps.nama_program_studi
-        FROM perguruan_tinggi_prodi pp
-        JOIN perguruan_tinggi pt ON pt.id_perguruan_tinggi = pp.id_perguruan_tinggi
-        JOIN program_studi ps ON ps.id_program_studi = pp.id_program_studi
-    """)
-    await conn.close()
+async def _load_pt_prodi():
+    async with get_db(readonly=True) as conn:
+        rows = await conn.fetch("""
+            SELECT pt.id_perguruan_tinggi, pt.perguruan_tinggi, ps.id_program_studi, ps.nama_program_studi
+            FROM perguruan_tinggi_prodi pp
+            JOIN perguruan_tinggi pt ON pt.id_perguruan_tinggi = pp.id_perguruan_tinggi
+            JOIN program_studi ps ON ps.id_program_studi = pp.id_program_studi
+        """)
 
     data = {}
     for row in rows:
@@ -161,40 +420,51 @@ async def get_pt_prodi():
             "program_studi": row["nama_program_studi"]
         })
 
-    return list(data.values())
+    return JsonBody.from_data(list(data.values()))
+
+
+@router.get("/referensi/perguruan-tinggi")
+async def get_pt_prodi(request: Request):
+    entry = await reference_cache.get("perguruan_tinggi", _load_pt_prodi)
+    return reference_cache.response(request, entry)
 
 # 4. Get Kuesioner & Jawaban
-@app.get("/referensi/kuesioner")
-async def get_kuesioner():
-    conn = await get_db()
-    q = await conn.fetch("SELECT * FROM kuesioner")
-    a = await conn.fetch("SELECT * FROM jawaban")
-    await conn.close()
-    return {"pertanyaan": [dict(row) for row in q], "jawaban": [dict(row) for row in a]}
+async def _load_kuesioner():
+    async with get_db(readonly=True) as conn:
+        q = await conn.fetch("SELECT id_kuesioner, pertanyaan FROM kuesioner")
+        a = await conn.fetch("SELECT * FROM jawaban")
+    return JsonBody.from_data({"pertanyaan": [dict(row) for row in q], "jawaban": [dict(row) for row in a]})
+
+
+@router.get("/referensi/kuesioner")
+async def get_kuesioner(request: Request):
+    entry = await reference_cache.get("kuesioner", _load_kuesioner)
+    return reference_cache.response(request, entry)
 
 # 5. Get Status
-@app.get("/referensi/status")
-async def get_status():
-    conn = await get_db()
-    rows = await conn.fetch("SELECT kode_status, status FROM status")
-    await conn.close()
-    return [dict(row) for row in rows]
+async def _load_status():
+    async with get_db(readonly=True) as conn:
+        rows = await conn.fetch("SELECT kode_status, status FROM status")
+    return JsonBody.from_data([dict(row) for row in rows])
+
+
+@router.get("/referensi/status")
+async def get_status(request: Request):
+    entry = await reference_cache.get("status", _load_status)
+    return reference_cache.response(request, entry)
 
 # 6. Statistik alumni per tahun
-@app.get("/statistik/alumni")
-async def statistik_alumni():
-    conn = await get_db()
-    result = await conn.fetch("""
-        SELECT
-            COUNT(a.id_alumni) AS jumlah_siswa,
-            COUNT(t.id_tracer) FILTER (WHERE t.is_filled) AS total_responden,
-            COUNT(t.id_tracer) FILTER (WHERE t.kode_status = 'PEND') AS jumlah_melanjutkan
-        FROM alumni a
-        LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
-    """)
-    await conn.close()
-
-    row = result[0]
+@router.get("/statistik/alumni")
+async def statistik_alumni(tahun_dari: Optional[int] = None, tahun_sampai: Optional[int] = None):
+    """
+    Ringkasan jumlah siswa, responden dan yang melanjutkan pendidikan, dibaca dari
+    snapshot `statistik_tahun`.
+
+    - **tahun_dari** / **tahun_sampai**: batasi ke rentang `tahun_lulus` (inklusif).
+    """
+    async with get_db(readonly=True) as conn:
+        row = await statistik.fetch_alumni_summary(conn, tahun_dari, tahun_sampai)
+
     jumlah_siswa = row["jumlah_siswa"]
     total_responden = row["total_responden"]
     jumlah_melanjutkan = row["jumlah_melanjutkan"]
@@ -214,23 +484,16 @@ async def statistik_alumni():
     }
 
 # 7. Statistik jawaban kuesioner per tahun
-@app.get("/statistik/kuesioner")
-async def statistik_kuesioner():
-    conn = await get_db()
-    result = await conn.fetch("""
-        SELECT a.tahun_lulus AS tahun,
-               k.pertanyaan,
-               j.jawaban,
-               COUNT(*) AS jumlah
-        FROM detail_kuesioner dk
-        JOIN tracer t ON dk.id_tracer = t.id_tracer
-        JOIN alumni a ON a.id_alumni = t.id_alumni
-        JOIN kuesioner k ON dk.id_kuesioner = k.id_kuesioner
-        JOIN jawaban j ON dk.id_jawaban = j.id_jawaban
-        GROUP BY a.tahun_lulus, k.pertanyaan, j.jawaban
-        ORDER BY a.tahun_lulus
-    """)
-    await conn.close()
+@router.get("/statistik/kuesioner")
+async def statistik_kuesioner(tahun_dari: Optional[int] = None, tahun_sampai: Optional[int] = None):
+    """
+    Distribusi jawaban setiap pertanyaan per tahun lulus, dibaca dari snapshot
+    `statistik_jawaban`.
+
+    - **tahun_dari** / **tahun_sampai**: batasi ke rentang `tahun_lulus` (inklusif).
+    """
+    async with get_db(readonly=True) as conn:
+        result = await statistik.fetch_answer_histogram(conn, tahun_dari, tahun_sampai)
 
     data_map = {}
     for row in result:
@@ -269,95 +532,119 @@ async def statistik_kuesioner():
 
 
 # 8. Tambah alumni
-@app.post("/alumni/create")
+@router.post("/alumni/create", dependencies=[Depends(require_admin)])
 async def create_alumni(data: AlumniCreate):
-    conn = await get_db()
-    id_alumni = await conn.fetchval("""
-        INSERT INTO alumni(nisn, nis, nik, nama_siswa, tanggal_lahir, tahun_lulus)
-        VALUES($1, $2, $3, $4, $5, $6) RETURNING id_alumni
-    """, data.nisn, data.nis, data.nik, data.nama_siswa, data.tanggal_lahir, data.tahun_lulus)
-
-    await conn.execute("""
-        INSERT INTO tracer(id_alumni, is_filled)
-        VALUES($1, FALSE)
-    """, id_alumni)
-
-    await conn.close()
+    async with get_db() as conn, conn.transaction():
+        id_alumni = await conn.fetchval("""
+            INSERT INTO alumni(nisn, nis, nik, nama_siswa, tanggal_lahir, tahun_lulus)
+            VALUES($1, $2, $3, $4, $5, $6) RETURNING id_alumni
+        """, data.nisn, data.nis, data.nik, data.nama_siswa, data.tanggal_lahir, data.tahun_lulus)
+
+        await conn.execute("""
+            INSERT INTO tracer(id_alumni, is_filled)
+            VALUES($1, FALSE)
+        """, id_alumni)
+
+        await statistik.record_alumni_added(conn, [data.tahun_lulus])
+    cube_cache.invalidate()
     return {"message": "Alumni created successfully"}
 
 # 9. Detail alumni lengkap
-@app.get("/questionnaire/detail/{id_alumni}")
+ALUMNI_DETAIL_SQL = """
+    SELECT a.nisn, a.nis, a.nik, a.nama_siswa, a.tanggal_lahir, a.tahun_lulus
+    FROM alumni a
+    WHERE a.id_alumni = $1
+"""
+
+
+@router.get("/questionnaire/detail/{id_alumni}")
 async def detail_alumni(id_alumni: str):
-    conn = await get_db()
-    try:
-        result = await conn.fetchrow("""
-            SELECT a.nisn, a.nis, a.nik, a.nama_siswa, a.tanggal_lahir, a.tahun_lulus
-            FROM alumni a
-            WHERE a.id_alumni = $1
-        """, id_alumni)
+    async with get_db(readonly=True, sticky=_alumni_key(id_alumni)) as conn:
+        result = await conn.fetchrow(ALUMNI_DETAIL_SQL, id_alumni)
 
         if result is None:
             raise HTTPException(status_code=404, detail="Alumni not found")
 
         return dict(result)
-    finally:
-        await conn.close()
 
 
 # 10. Login
-@app.post("/login")
+@router.post("/login")
 async def login(data: LoginRequest):
-    conn = await get_db()
-    result = await conn.fetchrow('SELECT nama FROM "user" WHERE username=$1 AND password=$2', data.email, data.password)
-
-    await conn.close()
-    if not result:
+    """
+    Memverifikasi kredensial admin dan menerbitkan `access_token` (Bearer) serta
+    `refresh_token`. Password lama yang masih plaintext di-hash ulang dengan bcrypt.
+    """
+    async with get_db() as conn:
+        result = await conn.fetchrow('SELECT username, password, nama FROM "user" WHERE username=$1', data.email)
+    # Verifikasi bcrypt berjalan di thread pool, tanpa memegang koneksi database
+    valid, new_hash = await auth.verify_password(data.password, result["password"]) if result else (False, None)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"message": "Login successful", "data": dict(result)}
+    if new_hash is not None:
+        async with get_db() as conn:
+            await conn.execute('UPDATE "user" SET password=$1 WHERE username=$2', new_hash, result["username"])
+    return {
+        "message": "Login successful",
+        "data": {"nama": result["nama"]},
+        **auth.issue_tokens(result["username"], result["nama"]),
+    }
+
 
 # 11. Get Jawaban
-@app.get("/referensi/jawaban")
-async def get_jawaban():
-    conn = await get_db()
-    rows = await conn.fetch("SELECT id_jawaban, jawaban FROM jawaban")
-    await conn.close()
-    return [dict(row) for row in rows]
+async def _load_jawaban():
+    async with get_db(readonly=True) as conn:
+        rows = await conn.fetch("SELECT id_jawaban, jawaban FROM jawaban")
+    return JsonBody.from_data([dict(row) for row in rows])
 
-# 12. Get full questioner metadata
-@app.get("/quesioner-metadata")
-async def get_questioner_metadata():
-    conn = await get_db()
-    perguruan_rows = await conn.fetch("""
-        SELECT pt.id_perguruan_tinggi, pt.perguruan_tinggi
-        FROM perguruan_tinggi pt
-    """)
-
-    status_rows = await conn.fetch("SELECT * FROM status")
-    kuesioner_rows = await conn.fetch("SELECT * FROM kuesioner")
-    jawaban_rows = await conn.fetch("SELECT * FROM jawaban")
-    sumber_rows = await conn.fetch("SELECT * FROM sumber_biaya")
-    await conn.close()
 
-    return {
+@router.get("/referensi/jawaban")
+async def get_jawaban(request: Request):
+    entry = await reference_cache.get("jawaban", _load_jawaban)
+    return reference_cache.response(request, entry)
+
+# 12. Get full questioner metadata
+async def _load_questioner_metadata():
+    async with get_db(readonly=True) as conn:
+        perguruan_rows = await conn.fetch("""
+            SELECT pt.id_perguruan_tinggi, pt.perguruan_tinggi
+            FROM perguruan_tinggi pt
+        """)
+
+        status_rows = await conn.fetch("SELECT * FROM status")
+        kuesioner_rows = await conn.fetch("SELECT id_kuesioner, pertanyaan FROM kuesioner")
+        jawaban_rows = await conn.fetch("SELECT * FROM jawaban")
+        sumber_rows = await conn.fetch("SELECT * FROM sumber_biaya")
+
+    return JsonBody.from_data({
             "perguruanTinggiOptions": [dict(r) for r in perguruan_rows],
             "statusOptions": [dict(r) for r in status_rows],
             "questioner": [dict(r) for r in kuesioner_rows],
             "answerOptions": [dict(r) for r in jawaban_rows],
             "sumberBiayaOptions": [dict(r) for r in sumber_rows]
-    }
+    })
+
+
+@router.get("/quesioner-metadata")
+async def get_questioner_metadata(request: Request):
+    entry = await reference_cache.get("quesioner_metadata", _load_questioner_metadata)
+    return reference_cache.response(request, entry)
 
 
 # 13. Check alumni tracer status
-@app.get("/tracer/status/{id_alumni}")
+TRACER_STATUS_SQL = """
+    SELECT t.is_filled
+    FROM alumni a
+    LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
+    WHERE a.id_alumni = $1
+"""
+
+
+@router.get("/tracer/status/{id_alumni}")
 async def check_tracer_status(id_alumni: str):
-    conn = await get_db()
-    result = await conn.fetchrow("""
-        SELECT t.is_filled
-        FROM alumni a
-        LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
-        WHERE a.id_alumni = $1
-    """, id_alumni)
-    await conn.close()
+    # Tepat setelah submit, status dibaca dari primary agar langsung terlihat terisi
+    async with get_db(readonly=True, sticky=_alumni_key(id_alumni)) as conn:
+        result = await conn.fetchrow(TRACER_STATUS_SQL, id_alumni)
 
     if result:
         return result
@@ -365,33 +652,68 @@ async def check_tracer_status(id_alumni: str):
     raise HTTPException(status_code=404, detail="Alumni not found")
 
 # 14. Check Program Study by Perguruan Tinggi
-@app.get("/programStudi/{id_perguruan_tinggi}")
-async def get_program_studi(id_perguruan_tinggi: int):
-    conn = await get_db()
-    try:
+_EMPTY_PROGRAM_STUDI = JsonBody.from_data([])
+
+
+async def _load_program_studi():
+    # Satu query untuk semua perguruan tinggi, body per id dibangun sekali di sini
+    async with get_db(readonly=True) as conn:
         rows = await conn.fetch("""
-            SELECT ps.id_program_studi, ps.nama_program_studi
+            SELECT ptp.id_perguruan_tinggi, ps.id_program_studi, ps.nama_program_studi
             FROM perguruan_tinggi_prodi ptp
             JOIN program_studi ps ON ps.id_program_studi = ptp.id_program_studi
-            WHERE ptp.id_perguruan_tinggi = $1
-        """, id_perguruan_tinggi)
+        """)
 
-        return (dict(row) for row in rows)
-    finally:
-        await conn.close()
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row["id_perguruan_tinggi"], []).append({
+            "id_program_studi": row["id_program_studi"],
+            "nama_program_studi": row["nama_program_studi"]
+        })
+    return {pt_id: JsonBody.from_data(items) for pt_id, items in grouped.items()}
+
+
+@router.get("/programStudi/{id_perguruan_tinggi}")
+async def get_program_studi(id_perguruan_tinggi: int, request: Request):
+    by_pt = await reference_cache.get("program_studi", _load_program_studi)
+    entry = by_pt.get(id_perguruan_tinggi, _EMPTY_PROGRAM_STUDI)
+    return reference_cache.response(request, entry)
 
 
 # 15. Submit kuesioner (Versi baru yang lebih baik)
-@app.post("/questionnaire/submit", tags=["Tracer"])
+# Update tracer sekaligus mengembalikan status lama untuk snapshot statistik
+SUBMIT_TRACER_UPDATE_SQL = """
+    UPDATE tracer t
+    SET kode_status = $1,
+        is_filled   = TRUE,
+        fill_date   = CURRENT_DATE
+    FROM (SELECT id_tracer, is_filled, kode_status
+          FROM tracer
+          WHERE id_alumni = $2
+          FOR UPDATE) old,
+         alumni a
+    WHERE t.id_tracer = old.id_tracer
+      AND a.id_alumni = t.id_alumni
+    RETURNING t.id_tracer, a.tahun_lulus,
+              old.is_filled AS old_is_filled, old.kode_status AS old_kode_status
+"""
+
+@router.post("/questionnaire/submit", tags=["Tracer"])
 async def submit_questionnaire(
         payload_str: Annotated[str, Form(alias="payload")],
         bukti_kuliah: Annotated[Optional[UploadFile], File()] = None,
+        idempotency_key: Annotated[Optional[str], Header(alias="Idempotency-Key", max_length=255)] = None,
 ):
     """
     Endpoint untuk menyimpan seluruh data kuesioner tracer study.
 
     - **payload**: String JSON yang berisi data alumni, status, kuesioner, dan detail pendidikan.
-    - **bukti_kuliah**: File bukti kuliah (opsional, wajib jika status 'PEND').
+      Untuk status 'PEND', ``bukti_kuliah_key`` berisi object key dari
+      ``/questionnaire/upload-url`` setelah file diupload langsung ke storage.
+    - **bukti_kuliah**: File bukti kuliah, cara lama (wajib jika status 'PEND'
+      dan ``bukti_kuliah_key`` tidak diisi).
+    - **Idempotency-Key**: Header opsional. Retry dengan key yang sama mendapat
+      respons pertama tanpa diproses ulang.
     """
     try:
         # Validasi data JSON yang masuk menggunakan model Pydantic
@@ -399,189 +721,404 @@ async def submit_questionnaire(
     except ValidationError as e:
         raise HTTPException(status_code=422, detail=e.errors())
 
-    conn = await get_db()
-
-    # Gunakan transaksi untuk memastikan semua data berhasil dimasukkan atau tidak sama sekali
-    async with conn.transaction():
+    if payload.status == 'PEND' and (not payload.detail_pendidikan or not (bukti_kuliah or payload.bukti_kuliah_key)):
+        raise HTTPException(
+            status_code=400,
+            detail="Detail pendidikan dan bukti kuliah wajib diisi untuk status 'Melanjutkan Pendidikan'."
+        )
+    if payload.status == 'PEND' and payload.bukti_kuliah_key is not None:
+        if bukti_kuliah:
+            raise HTTPException(status_code=400, detail="Kirim bukti kuliah sebagai file atau bukti_kuliah_key, tidak keduanya.")
+        if payload.bukti_kuliah_key != bukti_kuliah_path(_alumni_key(payload.id_alumni)):
+            raise HTTPException(status_code=400, detail="bukti_kuliah_key tidak sesuai dengan alumni.")
+
+    upload, upload_sha256 = None, None
+    if payload.status == 'PEND' and payload.bukti_kuliah_key is None:
+        upload = bukti_kuliah
+        size, upload_sha256 = await inspect_upload(upload, settings.bukti_kuliah_max_bytes)
+        metrics.observe_upload("bukti_kuliah", size)
+
+    # Retry/double-click dijawab dari cache tanpa menyentuh storage maupun database.
+    # Tanpa header, submit yang identik dengan submit terakhir alumni ini dianggap retry.
+    fingerprint = submission.fingerprint(payload, upload_sha256)
+    if idempotency_key:
+        key, strict = ("key", payload.id_alumni, idempotency_key), True
+    else:
+        key, strict = ("alumni", _alumni_key(payload.id_alumni)), False
+    return await idempotency_cache.run(key, fingerprint, lambda: _save_submission(payload, upload), strict=strict)
+
+
+async def _save_submission(payload: SubmissionPayload, upload: Optional[UploadFile]) -> FastJSONResponse:
+    # Submit baru (dengan key apa pun) membuat hasil submit terakhir alumni ini tidak berlaku lagi
+    idempotency_cache.forget(("alumni", _alumni_key(payload.id_alumni)))
+
+    # Upload bukti kuliah dilakukan sebelum transaksi agar transfer file tidak
+    # menahan koneksi/transaksi database; jika transaksi gagal, file yang baru
+    # dibuat dihapus kembali. File yang diupload langsung oleh klien hanya
+    # diperiksa, dan tidak dihapus bila transaksi gagal agar submit bisa diulang.
+    file_name = None
+    file_created = False
+    public_bukti_kuliah_url = None
+    if payload.status == 'PEND' and upload is None:
+        file_name = payload.bukti_kuliah_key
+        await _check_uploaded_bukti_kuliah(file_name)
+        public_bukti_kuliah_url = storage.public_url(file_name)
+    elif payload.status == 'PEND':
+        file_name = bukti_kuliah_path(_alumni_key(payload.id_alumni))
         try:
-            print(payload.detail_pendidikan)
-            # 1. Update data personal alumni (email dan telepon)
-            await conn.execute("""
-                UPDATE alumni
-                SET alamat_email = $1,
-                    no_telepon   = $2
-                WHERE id_alumni = $3
-            """, payload.personal_data.alamat_email, payload.personal_data.no_telepon, payload.id_alumni)
-
-            # 2. Update tracer dan dapatkan id_tracer
-            tracer_id = await conn.fetchval("""
-                UPDATE tracer
-                SET kode_status = $1,
-                    is_filled   = TRUE,
-                    fill_date   = CURRENT_DATE
-                WHERE id_alumni = $2
-                RETURNING id_tracer
-            """, payload.status, payload.id_alumni)
-
-            # 3. Jika status 'Melanjutkan Pendidikan', simpan detail pendidikan
-            if payload.status == 'PEND':
-                if not payload.detail_pendidikan or not bukti_kuliah:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Detail pendidikan dan bukti kuliah wajib diisi untuk status 'Melanjutkan Pendidikan'."
-                    )
+            file_created = await storage.upload(file_name, iter_upload(upload), PDF_CONTENT_TYPE)
+        except StorageError as e:
+            raise HTTPException(status_code=502, detail=f"Upload bukti kuliah gagal: {str(e)}")
+        public_bukti_kuliah_url = storage.public_url(file_name)
 
-                file_name = f"bukti-kuliah-{payload.id_alumni}.pdf"
-                supabase.storage.from_('tracer-study/bukti-kuliah').upload(
-                    file=bukti_kuliah.file.read(),
-                    path=file_name,
-                    file_options={"content-type": "application/pdf"}
-                )
-                public_bukti_kuliah_url = supabase.storage.from_('tracer-study/bukti-kuliah').get_public_url(file_name)
+    if submission_queue is not None:
+        # Mode antrean: cukup dicatat di jurnal, diterapkan ke database oleh worker background
+        try:
+            id_submission = await submission_queue.enqueue(payload, public_bukti_kuliah_url, file_name, file_created)
+        except Exception:
+            if file_created:
+                await storage.discard([file_name])
+            raise
+        return FastJSONResponse({
+            "message": "Data kuesioner diterima dan sedang diproses.",
+            "submission_id": id_submission,
+            "status_url": f"/questionnaire/submit/{id_submission}/status",
+            "bukti_kuliah": public_bukti_kuliah_url,
+        }, status_code=202)
 
+    try:
+        async with get_db() as conn:
+            # Gunakan transaksi untuk memastikan semua data berhasil dimasukkan atau tidak sama sekali
+            async with conn.transaction():
+                # 1. Update data personal alumni (email dan telepon)
                 await conn.execute("""
-                    INSERT INTO detail_pendidikan_tinggi(
-                        id_tracer, id_perguruan_tinggi, id_program_studi,
-                        tahun_masuk, id_sumber_biaya, bukti_kuliah
+                    UPDATE alumni
+                    SET alamat_email = $1,
+                        no_telepon   = $2
+                    WHERE id_alumni = $3
+                """, payload.personal_data.alamat_email, payload.personal_data.no_telepon, payload.id_alumni)
+
+                # 2. Update tracer dan dapatkan id_tracer (beserta status lama untuk snapshot statistik)
+                tracer_rows = await conn.fetch(SUBMIT_TRACER_UPDATE_SQL, payload.status, payload.id_alumni)
+                tracer_id = tracer_rows[0]["id_tracer"] if tracer_rows else None
+                tahun_by_tracer = {row["id_tracer"]: row["tahun_lulus"] for row in tracer_rows}
+
+                # 3. Jika status 'Melanjutkan Pendidikan', simpan detail pendidikan (satu per tracer);
+                #    status lain menghapus detail pendidikan dari submit 'PEND' sebelumnya
+                removed_files = []
+                if payload.status == 'PEND':
+                    detail = payload.detail_pendidikan
+                    await submission.upsert_pendidikan(conn, [(
+                        tracer_id, detail.id_perguruan_tinggi, detail.id_program_studi,
+                        detail.tahun_masuk, detail.id_sumber_biaya, public_bukti_kuliah_url,
+                    )])
+                elif tracer_id is not None:
+                    removed_files = await submission.remove_pendidikan(conn, [tracer_id])
+
+                # 4. Simpan jawaban kuesioner; submit ulang hanya mengubah jawaban yang berbeda
+                answer_deltas = await submission.upsert_answers(conn, [
+                    (tracer_id, q_id, a_id)
+                    for q_id, a_id in payload.kuesioner.items()
+                ], tahun_by_tracer)
+
+                # 5. Perbarui snapshot statistik (terakhir, agar lock counter dipegang sesingkat mungkin)
+                for row in tracer_rows:
+                    await statistik.record_tracer_change(
+                        conn, row["tahun_lulus"], row["old_is_filled"], row["old_kode_status"],
+                        True, payload.status
                     )
-                    VALUES ($1, $2, $3, $4, $5, $6)
-                """, tracer_id, payload.detail_pendidikan.id_perguruan_tinggi,
-                     payload.detail_pendidikan.id_program_studi,
-                     payload.detail_pendidikan.tahun_masuk,
-                     payload.detail_pendidikan.id_sumber_biaya,
-                     public_bukti_kuliah_url)
-            else:
-                public_bukti_kuliah_url = None
-
-            # 4. Insert jawaban kuesioner ke tabel detail_kuesioner
-            kuesioner_records = [
-                (tracer_id, q_id, a_id)
-                for q_id, a_id in payload.kuesioner.items()
-            ]
-
-            await conn.copy_records_to_table(
-                'detail_kuesioner',
-                records=kuesioner_records,
-                columns=['id_tracer', 'id_kuesioner', 'id_jawaban']
-            )
+                await statistik.record_answer_deltas(conn, answer_deltas)
+        pin_primary(_alumni_key(payload.id_alumni))
 
-            return {
-                "message": "Data kuesioner berhasil disimpan.",
-                "json": payload.dict(),
-                "bukti_kuliah": public_bukti_kuliah_url
-            }
+    except Exception as e:
+        # Kompensasi: transaksi sudah di-rollback, hapus file yang baru saja dibuat
+        if file_created:
+            await storage.discard([file_name])
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database transaction failed: {str(e)}"
+        )
 
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Database transaction failed: {str(e)}"
-            )
-    await conn.close()
+    cube_cache.invalidate()
+    # File bukti kuliah yang tidak dipakai lagi dihapus di background setelah respons dikirim
+    return FastJSONResponse({
+        "message": "Data kuesioner berhasil disimpan.",
+        "json": payload.dict(),
+        "bukti_kuliah": public_bukti_kuliah_url
+    }, background=BackgroundTask(storage.purge, removed_files) if removed_files else None)
+
+
+async def _check_uploaded_bukti_kuliah(path: str) -> None:
+    """Bukti kuliah yang diupload langsung harus ada, tidak kosong, dalam batas ukuran, dan berupa PDF."""
+    try:
+        info = await storage.stat(path)
+    except StorageError as e:
+        raise HTTPException(status_code=502, detail=f"Pemeriksaan bukti kuliah gagal: {str(e)}")
+    if info is None:
+        raise HTTPException(status_code=400, detail="Bukti kuliah belum diupload.")
+    if info.size > settings.bukti_kuliah_max_bytes:
+        raise HTTPException(status_code=413, detail=f"Ukuran file melebihi batas {settings.bukti_kuliah_max_bytes} byte.")
+    if info.size == 0 or info.content_type != PDF_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail="Bukti kuliah harus berupa file PDF.")
+    metrics.observe_upload("bukti_kuliah_direct", info.size)
+
+
+_ALUMNI_TRACER_SELECT = """
+    SELECT a.id_alumni,
+           a.nis,
+           a.nisn,
+           a.nik,
+           a.nama_siswa,
+           a.tanggal_lahir,
+           a.tahun_lulus,
+           a.alamat_email,
+           a.no_telepon,
+           t.is_filled,
+           s.status,
+           dpt.tahun_masuk,
+           pt.perguruan_tinggi,
+           ps.nama_program_studi,
+           sb.sumber_biaya,
+           dpt.bukti_kuliah,
+           {answers}
+    FROM alumni a
+             LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
+             LEFT JOIN status s ON t.kode_status = s.kode_status
+             LEFT JOIN detail_pendidikan_tinggi dpt ON t.id_tracer = dpt.id_tracer
+             LEFT JOIN perguruan_tinggi pt ON dpt.id_perguruan_tinggi = pt.id_perguruan_tinggi
+             LEFT JOIN program_studi ps ON dpt.id_program_studi = ps.id_program_studi
+             LEFT JOIN sumber_biaya sb ON dpt.id_sumber_biaya = sb.id_sumber_biaya
+"""
+
+ALUMNI_TRACER_SELECT = _ALUMNI_TRACER_SELECT.format(answers="""
+           (SELECT jsonb_agg(jsonb_build_object('id_kuesioner', k.id_kuesioner, 'jawaban', j.jawaban))
+            FROM detail_kuesioner dk
+                     JOIN kuesioner k ON dk.id_kuesioner = k.id_kuesioner
+                     JOIN jawaban j ON dk.id_jawaban = j.id_jawaban
+            WHERE dk.id_tracer = t.id_tracer) AS answered_questionnaires""".strip())
+
+# Mode compact (answer_storage.py): array jawaban di-decode di _build_alumni_detail
+ALUMNI_TRACER_SELECT_COMPACT = _ALUMNI_TRACER_SELECT.format(answers="t.jawaban")
+
+# Urutan keyset: (tahun_lulus DESC, nama_siswa, id_alumni) unik untuk setiap baris
+ALUMNI_TRACER_ORDER = " ORDER BY a.tahun_lulus DESC, a.nama_siswa ASC, a.id_alumni ASC"
+ALUMNI_TRACER_AFTER = """
+    (a.tahun_lulus < $1 OR (a.tahun_lulus = $1 AND (a.nama_siswa, a.id_alumni) > ($2, $3)))
+"""
+
+STREAM_BATCH_SIZE = 200
+
+
+def _alumni_tracer_select(labels) -> str:
+    return ALUMNI_TRACER_SELECT if labels is None else ALUMNI_TRACER_SELECT_COMPACT
+
+
+def _build_alumni_detail(record, master_questions, labels=None):
+    """
+    Menyusun satu baris hasil ALUMNI_TRACER_SELECT menjadi objek respons per alumni.
+    ``labels`` (``{id_jawaban: jawaban}``) diisi untuk baris ALUMNI_TRACER_SELECT_COMPACT.
+    """
+    # Buat lookup map untuk jawaban yang sudah diisi oleh alumni ini
+    answered_map = {}
+    if labels is not None:
+        # Elemen ke-n tracer.jawaban adalah id_jawaban untuk pertanyaan dengan posisi_jawaban n
+        for question in master_questions:
+            a_id = answer_storage.decode(record['jawaban'], question['posisi_jawaban'])
+            if a_id is not None:
+                answered_map[question['id_kuesioner']] = labels.get(a_id)
+    elif record['answered_questionnaires']:
+        # Kolom jsonb sudah di-decode oleh codec koneksi (lihat db._init_connection)
+        answered_map = {item['id_kuesioner']: item['jawaban'] for item in record['answered_questionnaires']}
+
+    # Buat daftar kuesioner lengkap untuk alumni ini
+    full_questionnaire_list = []
+    for question in master_questions:
+        full_questionnaire_list.append({
+            "questionnaire": question['pertanyaan'],
+            "answer": answered_map.get(question['id_kuesioner'], None)
+            # Ambil jawaban jika ada, jika tidak -> null
+        })
+
+    # Susun objek respons sesuai struktur yang diinginkan
+    return {
+        "personal_data": {
+            "id_alumni": record['id_alumni'],
+            "nis": record['nis'],
+            "nisn": record['nisn'],
+            "nik": record['nik'],
+            "tanggal_lahir": record['tanggal_lahir'],
+            "nama_siswa": record['nama_siswa'],
+            "tahun_lulus": record['tahun_lulus'],
+            "alamat_email": record['alamat_email'],
+            "no_telepon": record['no_telepon'],
+        },
+        "tracer_data": {
+            "status": record['status'],
+            "is_filled": record['is_filled'] if record['is_filled'] is not None else False,
+        },
+        "pendidikan_data": {
+            "perguruan_tinggi": record['perguruan_tinggi'],
+            "program_studi": record['nama_program_studi'],
+            "sumber_biaya": record['sumber_biaya'],
+            "bukti_kuliah": record['bukti_kuliah'] if record['bukti_kuliah'] else None,
+            "tahun_masuk": record['tahun_masuk'],
+        } if record['perguruan_tinggi'] else None,
+        "questionnaire_data": full_questionnaire_list,
+    }
+
+
+def encode_cursor(record) -> str:
+    raw = fastjson.dumps([record['tahun_lulus'], record['nama_siswa'], str(record['id_alumni'])])
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        tahun_lulus, nama_siswa, id_alumni = fastjson.loads(base64.urlsafe_b64decode(padded))
+        return int(tahun_lulus), str(nama_siswa), str(uuid.UUID(str(id_alumni)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor tidak valid.")
+
+
+async def _fetch_master_questions():
+    """
+    Daftar master pertanyaan, dan label ``{id_jawaban: jawaban}`` untuk
+    men-decode ``tracer.jawaban`` bila penyimpanan jawaban dalam mode compact
+    (``None`` di mode rows).
+    """
+    async with get_db(readonly=True) as conn:
+        master_questions = await conn.fetch(
+            "SELECT id_kuesioner, pertanyaan, posisi_jawaban FROM kuesioner ORDER BY id_kuesioner;")
+        labels = None
+        if await answer_storage.is_compact(conn):
+            labels = {row["id_jawaban"]: row["jawaban"] for row in await conn.fetch("SELECT id_jawaban, jawaban FROM jawaban")}
+    return master_questions, labels
 
 
-@app.get("/tracer/all", tags=["Tracer"])
-async def get_all_alumni_tracer_data():
+async def _stream_alumni_tracer(master_questions, labels, fmt: str):
+    """
+    Mengalirkan seluruh alumni lewat server-side cursor, sehingga memori puncak
+    tidak bergantung pada jumlah baris di tabel.
+    """
+    query = _alumni_tracer_select(labels) + ALUMNI_TRACER_ORDER
+    ndjson = fmt == "ndjson"
+    first = True
+
+    if not ndjson:
+        yield b"["
+    async with get_db(readonly=True) as conn:
+        # Cursor asyncpg hanya bisa dipakai di dalam transaksi
+        async with conn.transaction(readonly=True):
+            chunk = []
+            async for record in conn.cursor(query, prefetch=STREAM_BATCH_SIZE):
+                item = fastjson.dumps(_build_alumni_detail(record, master_questions, labels))
+                if ndjson:
+                    chunk.append(item + b"\n")
+                else:
+                    chunk.append(item if first else b"," + item)
+                    first = False
+                if len(chunk) >= STREAM_BATCH_SIZE:
+                    yield b"".join(chunk)
+                    chunk = []
+            if chunk:
+                yield b"".join(chunk)
+    if not ndjson:
+        yield b"]"
+
+
+@router.get("/tracer/all", tags=["Tracer"], dependencies=[Depends(require_admin)])
+async def get_all_alumni_tracer_data(
+        limit: Annotated[Optional[int], Query(ge=1, le=1000)] = None,
+        cursor: Optional[str] = None,
+        format: Annotated[str, Query(pattern="^(json|ndjson)$")] = "json",
+):
     """
     Mengambil daftar lengkap semua alumni beserta status tracer, detail pendidikan,
     dan jawaban kuesioner mereka. Sesuai dengan catatan:
     - Alumni yang belum mengisi tracer akan tetap ditampilkan dengan data tracer null/default.
     - Semua pertanyaan kuesioner akan ditampilkan, dengan jawaban `null` jika belum dijawab.
-    """
-    conn = await get_db()
-    try:
-        # Query 1: Ambil daftar master semua pertanyaan
-        master_questions_query = "SELECT id_kuesioner, pertanyaan FROM kuesioner ORDER BY id_kuesioner;"
-        master_questions = await conn.fetch(master_questions_query)
-
-        # Query 2: Ambil data gabungan semua alumni
-        alumni_data_query = """
-                            SELECT a.id_alumni, \
-                                   a.nis, \
-                                   a.nisn, \
-                                   a.nik, \
-                                   a.nama_siswa, \
-                                   a.tanggal_lahir, \
-                                   a.tahun_lulus, \
-                                   a.alamat_email, \
-                                   a.no_telepon, \
-                                   t.is_filled, \
-                                   s.status, \
-                                   dpt.tahun_masuk, \
-                                   pt.perguruan_tinggi, \
-                                   ps.nama_program_studi, \
-                                   sb.sumber_biaya, \
-                                   dpt.bukti_kuliah, \
-                                   (SELECT jsonb_agg(jsonb_build_object('id_kuesioner', k.id_kuesioner, 'jawaban', \
-                                                                        j.jawaban))
-                                    FROM detail_kuesioner dk
-                                             JOIN kuesioner k ON dk.id_kuesioner = k.id_kuesioner
-                                             JOIN jawaban j ON dk.id_jawaban = j.id_jawaban
-                                    WHERE dk.id_tracer = t.id_tracer) AS answered_questionnaires
-                            FROM alumni a
-                                     LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
-                                     LEFT JOIN status s ON t.kode_status = s.kode_status
-                                     LEFT JOIN detail_pendidikan_tinggi dpt ON t.id_tracer = dpt.id_tracer
-                                     LEFT JOIN perguruan_tinggi pt ON dpt.id_perguruan_tinggi = pt.id_perguruan_tinggi
-                                     LEFT JOIN program_studi ps ON dpt.id_program_studi = ps.id_program_studi
-                                     LEFT JOIN sumber_biaya sb ON dpt.id_sumber_biaya = sb.id_sumber_biaya
-                            ORDER BY a.tahun_lulus DESC, a.nama_siswa ASC; \
-                            """
-        alumni_records = await conn.fetch(alumni_data_query)
-
-        # Proses transformasi data di Python
-        response_list = []
-        for record in alumni_records:
-            # Buat lookup map untuk jawaban yang sudah diisi oleh alumni ini
-            answered_map = {}
-            if record['answered_questionnaires']:
-                # `answered_questionnaires` bisa berupa string JSON, perlu di-parse
-                answered_list = json.loads(record['answered_questionnaires'])
-                answered_map = {item['id_kuesioner']: item['jawaban'] for item in answered_list}
-
-            # Buat daftar kuesioner lengkap untuk alumni ini
-            full_questionnaire_list = []
-            for question in master_questions:
-                full_questionnaire_list.append({
-                    "questionnaire": question['pertanyaan'],
-                    "answer": answered_map.get(question['id_kuesioner'], None)
-                    # Ambil jawaban jika ada, jika tidak -> null
-                })
-
-            # Susun objek respons sesuai struktur yang diinginkan
-            alumni_detail = {
-                "personal_data": {
-                    "id_alumni": record['id_alumni'],
-                    "nis": record['nis'],
-                    "nisn": record['nisn'],
-                    "nik": record['nik'],
-                    "tanggal_lahir": record['tanggal_lahir'],
-                    "nama_siswa": record['nama_siswa'],
-                    "tahun_lulus": record['tahun_lulus'],
-                    "alamat_email": record['alamat_email'],
-                    "no_telepon": record['no_telepon'],
-                },
-                "tracer_data": {
-                    "status": record['status'],
-                    "is_filled": record['is_filled'] if record['is_filled'] is not None else False,
-                },
-                "pendidikan_data": {
-                    "perguruan_tinggi": record['perguruan_tinggi'],
-                    "program_studi": record['nama_program_studi'],
-                    "sumber_biaya": record['sumber_biaya'],
-                    "bukti_kuliah": record['bukti_kuliah'] if record['bukti_kuliah'] else None,
-                    "tahun_masuk": record['tahun_masuk'],
-                } if record['perguruan_tinggi'] else None,
-                "questionnaire_data": full_questionnaire_list,
-            }
-            response_list.append(alumni_detail)
 
-        return response_list
+    Mode respons:
+    - Tanpa `limit`/`cursor`: seluruh data dialirkan sebagai array JSON (atau NDJSON
+      jika `format=ndjson`) langsung dari server-side cursor.
+    - Dengan `limit` dan/atau `cursor`: satu halaman keyset
+      `{"data": [...], "next_cursor": ...}`, diurutkan `(tahun_lulus DESC, nama_siswa, id_alumni)`.
+      Kirim `next_cursor` sebagai `cursor` untuk halaman berikutnya.
+    """
+    # Query 1: Ambil daftar master semua pertanyaan
+    master_questions, labels = await _fetch_master_questions()
+
+    if limit is None and cursor is None:
+        media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+        return StreamingResponse(_stream_alumni_tracer(master_questions, labels, format), media_type=media_type)
+
+    # Query 2: Ambil satu halaman alumni setelah cursor
+    limit = limit or 100
+    select = _alumni_tracer_select(labels)
+    if cursor:
+        query = select + " WHERE " + ALUMNI_TRACER_AFTER + ALUMNI_TRACER_ORDER + " LIMIT $4"
+        args = (*decode_cursor(cursor), limit + 1)
+    else:
+        query = select + ALUMNI_TRACER_ORDER + " LIMIT $1"
+        args = (limit + 1,)
+
+    async with get_db(readonly=True) as conn:
+        alumni_records = await conn.fetch(query, *args)
+
+    has_more = len(alumni_records) > limit
+    alumni_records = alumni_records[:limit]
+    response_list = [_build_alumni_detail(record, master_questions, labels) for record in alumni_records]
+
+    if format == "ndjson":
+        body = b"".join(fastjson.dumps(item) + b"\n" for item in response_list)
+        headers = {"X-Next-Cursor": encode_cursor(alumni_records[-1])} if has_more else {}
+        return Response(content=body, media_type="application/x-ndjson", headers=headers)
+
+    # Diserialisasi langsung oleh orjson, tanpa salinan rekursif jsonable_encoder
+    return FastJSONResponse({
+        "data": response_list,
+        "next_cursor": encode_cursor(alumni_records[-1]) if has_more else None,
+    })
+
+
+# Kunci alumni yang akan dihapus dan catat mana yang punya file bukti kuliah
+DELETE_ALUMNI_LOCK_SQL = """
+    SELECT a.id_alumni::text AS id_alumni, dpt.bukti_kuliah IS NOT NULL AS has_bukti
+    FROM alumni a
+             LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
+             LEFT JOIN detail_pendidikan_tinggi dpt ON t.id_tracer = dpt.id_tracer
+    WHERE a.id_alumni = ANY($1::uuid[])
+    FOR UPDATE OF a
+"""
+
+
+async def _delete_alumni_batch(conn, id_alumni_list) -> tuple:
+    """
+    Menghapus satu batch alumni (beserta tracer, detail pendidikan dan jawaban
+    lewat ON DELETE CASCADE) dalam satu transaksi. Mengembalikan
+    ``(jumlah_terhapus, path_bukti_kuliah)``; file-nya dihapus pemanggil di luar transaksi.
+    """
+    async with conn.transaction():
+        rows = await conn.fetch(DELETE_ALUMNI_LOCK_SQL, list(id_alumni_list))
+        if not rows:
+            return 0, []
+        locked = [row["id_alumni"] for row in rows]
+        # Kurangi snapshot statistik selagi baris tracer dan jawabannya masih ada
+        await statistik.record_alumni_removed(conn, locked)
+        # Format status dari asyncpg adalah 'DELETE N' dimana N adalah jumlah baris yang terhapus
+        result_status = await conn.execute("DELETE FROM alumni WHERE id_alumni = ANY($1::uuid[])", locked)
+    for id_alumni in locked:
+        idempotency_cache.forget(("alumni", id_alumni))
+        pin_primary(id_alumni)
+    paths = [bukti_kuliah_path(row["id_alumni"]) for row in rows if row["has_bukti"]]
+    return int(result_status.split()[-1]), paths
 
-    finally:
-        await conn.close()
 
 # 17. Delete Alumni Data
-@app.delete("/alumni/{id_alumni}", tags=["Alumni"])
+@router.delete("/alumni/{id_alumni}", tags=["Alumni"], dependencies=[Depends(require_admin)])
 async def delete_alumni(id_alumni: str):
     """
     Menghapus data alumni berdasarkan ID.
@@ -589,35 +1126,488 @@ async def delete_alumni(id_alumni: str):
     **Penting**: Endpoint ini mengasumsikan bahwa database Anda telah dikonfigurasi
     dengan 'ON DELETE CASCADE' pada foreign key dari tabel `alumni` ke `tracer`.
     Ini akan memastikan semua data terkait (tracer, detail pendidikan, kuesioner)
-    juga ikut terhapus.
+    juga ikut terhapus. File bukti kuliah dihapus di background setelah respons dikirim.
 
     - **id_alumni**: ID unik dari alumni yang akan dihapus.
     """
-    conn = await get_db()
     try:
-        # Menjalankan perintah DELETE dan mendapatkan statusnya
-        # Format status dari asyncpg adalah 'DELETE N' dimana N adalah jumlah baris yang terhapus
-        result_status = await conn.execute(
-            "DELETE FROM alumni WHERE id_alumni = $1",
-            id_alumni
+        uuid.UUID(id_alumni)
+    except ValueError:
+        raise HTTPException(status_code=404, detail=f"Alumni with ID '{id_alumni}' not found.")
+
+    try:
+        async with get_db() as conn:
+            deleted_count, paths = await _delete_alumni_batch(conn, [id_alumni])
+    except Exception as e:
+        # Menangkap error umum dari database
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred while deleting alumni data: {str(e)}"
+        )
+
+    if deleted_count == 0:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Alumni with ID '{id_alumni}' not found."
+        )
+    cube_cache.invalidate()
+
+    return FastJSONResponse(
+        {"message": f"Alumni with ID '{id_alumni}' and all related data deleted successfully."},
+        background=BackgroundTask(storage.purge, paths) if paths else None,
+    )
+
+
+# 18. Status pool koneksi database
+@router.get("/health/db", tags=["Health"])
+async def health_db():
+    """
+    Menampilkan saturasi pool koneksi database (koneksi terpakai, idle, antrean)
+    dan statistik waktu tunggu saat meminjam koneksi, beserta antrean admission
+    control per kelas route.
+    """
+    stats = pool_stats()
+    stats["admission"] = {
+        limiter.name: {
+            "concurrency": limiter.concurrency,
+            "active": limiter.active,
+            "waiting": limiter.waiting,
+            "admitted": limiter.admitted,
+            "shed": limiter.shed,
+            "timed_out": limiter.timed_out,
+        }
+        for limiter in admission.limiters()
+    }
+    return stats
+
+
+# 19. Invalidasi cache data referensi
+@router.post("/referensi/cache/invalidate", tags=["Referensi"], dependencies=[Depends(require_admin)])
+async def invalidate_reference_cache(key: Optional[str] = None):
+    """
+    Mengosongkan cache data referensi setelah tabel referensi diubah.
+
+    - **key**: nama entry (misal `status`, `kuesioner`, `program_studi`); kosongkan untuk semua.
+
+    Invalidasi juga dikirim lewat `NOTIFY` sehingga worker lain yang menjalankan
+    listener ikut mengosongkan cache-nya.
+    """
+    reference_cache.invalidate(key)
+    async with get_db() as conn:
+        await conn.execute("SELECT pg_notify($1, $2)", settings.referensi_cache_channel, key or "")
+    return {"message": "Cache referensi berhasil dihapus.", "key": key}
+
+
+# 20. Ekspor data tracer (CSV/XLSX)
+@router.get("/tracer/export", tags=["Tracer"], dependencies=[Depends(require_admin)])
+async def export_tracer_data(
+        format: Annotated[str, Query(pattern="^(csv|xlsx)$")] = "csv",
+        tahun_lulus: Optional[int] = None,
+):
+    """
+    Mengunduh data tracer sebagai tabel datar: satu baris per alumni, satu kolom
+    per pertanyaan kuesioner (urutan sama dengan `/tracer/all`).
+
+    - **format**: `csv` (dialirkan langsung dari `COPY`) atau `xlsx`.
+    - **tahun_lulus**: batasi ke satu angkatan; kosongkan untuk semua alumni.
+    """
+    master_questions, labels = await _fetch_master_questions()
+    base_name = f"tracer-study-{tahun_lulus or 'semua'}"
+
+    if format == "csv":
+        return StreamingResponse(
+            export.stream_csv(master_questions, tahun_lulus, compact=labels is not None),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{base_name}.csv"'},
+        )
+
+    try:
+        path = await export.write_xlsx(master_questions, tahun_lulus, compact=labels is not None)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Ekspor XLSX membutuhkan paket XlsxWriter.")
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=f"{base_name}.xlsx",
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+# 21. Impor alumni massal (CSV / JSON-lines)
+@router.post("/alumni/bulk", tags=["Alumni"], dependencies=[Depends(require_admin)])
+async def bulk_create_alumni(
+        file: Annotated[UploadFile, File()],
+        format: Annotated[Optional[str], Query(pattern="^(csv|jsonl)$")] = None,
+):
+    """
+    Mendaftarkan satu angkatan alumni sekaligus dalam satu transaksi.
+
+    - **file**: CSV dengan header `nisn,nis,nik,nama_siswa,tanggal_lahir,tahun_lulus`
+      (pemisah `,` atau `;`), atau JSON-lines dengan field yang sama.
+    - **format**: `csv` atau `jsonl`; jika kosong ditebak dari nama/tipe file.
+
+    Respons berisi laporan per baris: `inserted`, `duplicate` (NISN sudah ada atau
+    berulang di file) atau `invalid` beserta pesan validasinya.
+    """
+    if format is None:
+        name = (file.filename or "").lower()
+        is_jsonl = name.endswith((".jsonl", ".ndjson", ".json")) or "json" in (file.content_type or "")
+        format = "jsonl" if is_jsonl else "csv"
+
+    try:
+        records, report = await run_in_threadpool(
+            alumni_import.parse_upload, file.file, format, settings.alumni_bulk_max_rows
+        )
+    except alumni_import.BulkImportError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File harus berenkoding UTF-8.")
+
+    async with get_db() as conn:
+        try:
+            async with conn.transaction():
+                inserted_rows = await alumni_import.import_records(conn, records)
+                await statistik.record_alumni_added(conn, [row["tahun_lulus"] for row in inserted_rows])
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Database transaction failed: {str(e)}"
+            )
+
+    if inserted_rows:
+        cube_cache.invalidate()
+    summary = alumni_import.finalize_report(report, inserted_rows)
+    return {"message": "Impor alumni selesai.", "summary": summary, "rows": report}
+
+
+# 22. Bangun ulang snapshot statistik
+@router.post("/statistik/rebuild", tags=["Statistik"], dependencies=[Depends(require_admin)])
+async def rebuild_statistik():
+    """
+    Menghitung ulang snapshot `statistik_tahun` dan `statistik_jawaban` dari tabel
+    sumber. Dipakai untuk perbaikan jika data diubah di luar API (misal lewat
+    dashboard Supabase). Setara dengan `python statistik.py rebuild`.
+    """
+    async with get_db() as conn:
+        await statistik.rebuild(conn)
+    return {"message": "Snapshot statistik berhasil dibangun ulang."}
+
+
+# 23. Metrik Prometheus
+@router.get("/metrics", tags=["Health"], include_in_schema=False)
+async def get_metrics():
+    """Metrik per route (latensi, status, query database) dalam format teks Prometheus."""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# 24. Refresh token akses
+@router.post("/token/refresh")
+async def refresh_token(data: RefreshTokenRequest):
+    """Menukar refresh token yang masih berlaku dengan pasangan token baru."""
+    claims = auth.decode_token(data.refresh_token, auth.REFRESH_TOKEN)
+    # Satu query per refresh (bukan per request) agar user yang dihapus tidak bisa memperpanjang sesi
+    async with get_db() as conn:
+        nama = await conn.fetchval('SELECT nama FROM "user" WHERE username=$1', claims["sub"])
+    if nama is None:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    return auth.issue_tokens(claims["sub"], nama)
+
+
+# 25. Statistik multidimensi (cube)
+def _parse_csv_param(value: str, allowed, name: str) -> list:
+    items = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item or item in items:
+            continue
+        if item not in allowed:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{name} '{item}' tidak dikenal. Pilihan: {', '.join(allowed)}."
+            )
+        items.append(item)
+    return items
+
+
+@router.get("/statistik/cube", tags=["Statistik"])
+async def statistik_cube(
+        dims: str = "tahun_lulus",
+        measures: str = "count",
+        tahun_dari: Optional[int] = None,
+        tahun_sampai: Optional[int] = None,
+):
+    """
+    Agregasi alumni untuk kombinasi dimensi apa pun, dihitung dalam satu query
+    `GROUP BY CUBE(...)`: setiap subset dimensi (termasuk total keseluruhan)
+    dikembalikan sebagai satu grup.
+
+    - **dims**: dipisah koma, maksimal 4. Pilihan: `tahun_lulus`, `status`,
+      `perguruan_tinggi`, `program_studi`, `sumber_biaya`, `tahun_masuk`.
+    - **measures**: dipisah koma. Pilihan: `count` (jumlah alumni), `responden`,
+      `melanjutkan`.
+    - **tahun_dari** / **tahun_sampai**: batasi ke rentang `tahun_lulus` (inklusif).
+
+    Hasil disimpan di cache LRU dan dikosongkan setiap kali ada kuesioner atau
+    data alumni yang tersimpan.
+    """
+    dim_list = _parse_csv_param(dims, statistik.CUBE_DIMENSIONS, "Dimensi")
+    measure_list = _parse_csv_param(measures, statistik.CUBE_MEASURES, "Ukuran") or ["count"]
+    if len(dim_list) > statistik.CUBE_MAX_DIMENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maksimal {statistik.CUBE_MAX_DIMENSIONS} dimensi per request."
         )
 
-        # Mengecek apakah ada baris yang benar-benar terhapus
-        # deleted_count = int(result_status.split()[-1])
-        # if deleted_count == 0:
-        #     raise HTTPException(
-        #         status_code=404,
-        #         detail=f"Alumni with ID '{id_alumni}' not found."
-        #     )
+    key = (tuple(dim_list), tuple(measure_list), tahun_dari, tahun_sampai)
+    body = cube_cache.get(key)
+    if body is None:
+        generation = cube_cache.generation()
+        async with get_db(readonly=True) as conn:
+            groups = await statistik.fetch_cube(conn, dim_list, measure_list, tahun_dari, tahun_sampai)
+        body = fastjson.dumps({"dims": dim_list, "measures": measure_list, "data": groups})
+        cube_cache.put(key, body, generation)
+    return FastJSONResponse(body)
+
+
+# 26. Liveness
+@router.get("/health/live", tags=["Health"])
+async def health_live():
+    """Proses hidup dan event loop merespons. Tidak menyentuh database."""
+    return {"status": "ok"}
+
 
-        return {"message": f"Alumni with ID '{id_alumni}' and all related data deleted successfully."}
+# 27. Readiness
+@router.get("/health/ready", tags=["Health"])
+async def health_ready(request: Request):
+    """
+    200 setelah startup selesai (pool terbuka, migrasi jalan, cache referensi
+    terisi); 503 selama startup dan ketika worker sedang shutdown.
+    """
+    state = request.app.state
+    if not getattr(state, "ready", False) or not pool_stats().get("initialized"):
+        return FastJSONResponse({"status": "starting"}, status_code=503, headers={"Retry-After": "1"})
+    return {"status": "ready", "pid": os.getpid(), "startup_seconds": state.startup_seconds}
+
+
+# 28. Status submisi kuesioner (mode antrean)
+@router.get("/questionnaire/submit/{id_submission}/status", tags=["Tracer"])
+async def submission_status(id_submission: str):
+    """
+    Status submisi yang diterima dengan 202: ``queued`` (dengan posisi
+    antrean), ``processing``, ``done`` atau ``failed`` (dengan pesan error).
+    """
+    result = await submission_queue.status(id_submission) if submission_queue is not None else None
+    if result is None:
+        raise HTTPException(status_code=404, detail="Submisi tidak ditemukan.")
+    return result
+
+
+# 29. Pencarian alumni (panel admin)
+@router.get("/alumni/search", tags=["Alumni"], dependencies=[Depends(require_admin)])
+async def search_alumni(
+        q: Annotated[Optional[str], Query(min_length=2, max_length=100)] = None,
+        nisn: Optional[str] = None,
+        nis: Optional[str] = None,
+        tahun_lulus: Optional[int] = None,
+        is_filled: Optional[bool] = None,
+        kode_status: Optional[str] = None,
+        id_perguruan_tinggi: Optional[int] = None,
+        limit: Annotated[int, Query(ge=1, le=200)] = 50,
+        cursor: Optional[str] = None,
+):
+    """
+    Mencari alumni dengan filter di sisi server dan mengembalikan satu halaman
+    dengan bentuk data yang sama seperti `/tracer/all`.
 
+    - **q**: nama siswa (substring/mirip jika `pg_trgm` tersedia, selain itu awalan nama).
+    - **nisn** / **nis**: pencocokan persis.
+    - **tahun_lulus**, **is_filled**, **kode_status**, **id_perguruan_tinggi**: filter.
+    - **cursor**: `next_cursor` dari halaman sebelumnya.
+
+    `total` hanya dihitung di halaman pertama; di atas 1000 baris nilainya
+    estimasi planner (`total_is_estimate: true`).
+    """
+    filters = alumni_search.SearchFilters(q, nisn, nis, tahun_lulus, is_filled, kode_status, id_perguruan_tinggi)
+    after = decode_cursor(cursor) if cursor else None
+    master_questions, labels = await _fetch_master_questions()
+
+    total, total_exact = None, None
+    async with get_db(readonly=True) as conn:
+        trigram = await alumni_search.trigram_enabled(conn)
+        query, args = alumni_search.build_page_query(
+            _alumni_tracer_select(labels), ALUMNI_TRACER_ORDER, filters, trigram, after, limit
+        )
+        alumni_records = await conn.fetch(query, *args)
+        if after is None:
+            total, total_exact = await alumni_search.count_matches(conn, filters, trigram)
+
+    has_more = len(alumni_records) > limit
+    alumni_records = alumni_records[:limit]
+    return FastJSONResponse({
+        "data": [_build_alumni_detail(record, master_questions, labels) for record in alumni_records],
+        "next_cursor": encode_cursor(alumni_records[-1]) if has_more else None,
+        "total": total,
+        "total_is_estimate": None if total_exact is None else not total_exact,
+    })
+
+
+# 30. Hapus alumni massal (per angkatan atau daftar id)
+@router.delete("/alumni", tags=["Alumni"], dependencies=[Depends(require_admin)])
+async def delete_alumni_bulk(
+        tahun_lulus: Optional[int] = None,
+        body: Optional[AlumniDeleteRequest] = None,
+):
+    """
+    Menghapus satu angkatan (`?tahun_lulus=...`) atau daftar id
+    (`{"id_alumni": [...]}` di body), tidak keduanya.
+
+    Penghapusan berjalan per batch (`ALUMNI_DELETE_BATCH_SIZE`), masing-masing
+    dalam transaksi dan koneksi sendiri, sehingga lock dan lonjakan WAL tetap
+    kecil dan request lain tetap mendapat koneksi. Batch yang sudah commit tetap
+    terhapus walaupun batch berikutnya gagal. File bukti kuliah dihapus di
+    background setelah respons dikirim, tanpa menahan koneksi database.
+    """
+    if (tahun_lulus is None) == (body is None):
+        raise HTTPException(status_code=400, detail="Isi salah satu: tahun_lulus atau daftar id_alumni.")
+
+    batch_size = settings.alumni_delete_batch_size
+    deleted = 0
+    batches = 0
+    paths = []
+    try:
+        if body is not None:
+            id_list = list(dict.fromkeys(str(id_alumni) for id_alumni in body.id_alumni))
+            for start in range(0, len(id_list), batch_size):
+                async with get_db() as conn:
+                    count, batch_paths = await _delete_alumni_batch(conn, id_list[start:start + batch_size])
+                deleted += count
+                paths.extend(batch_paths)
+                batches += 1
+        else:
+            while True:
+                async with get_db() as conn:
+                    id_list = await conn.fetchval(
+                        "SELECT array_agg(id_alumni::text) FROM "
+                        "(SELECT id_alumni FROM alumni WHERE tahun_lulus = $1 LIMIT $2) a",
+                        tahun_lulus, batch_size,
+                    )
+                    if not id_list:
+                        break
+                    count, batch_paths = await _delete_alumni_batch(conn, id_list)
+                deleted += count
+                paths.extend(batch_paths)
+                batches += 1
     except Exception as e:
-        # Menangkap error umum dari database
+        if deleted:
+            cube_cache.invalidate()
         raise HTTPException(
             status_code=500,
-            detail=f"An error occurred while deleting alumni data: {str(e)}"
+            detail=f"Penghapusan berhenti setelah {deleted} alumni terhapus: {str(e)}"
         )
-    finally:
-        # Memastikan koneksi selalu ditutup
-        await conn.close()
\ No newline at end of file
+
+    if deleted:
+        cube_cache.invalidate()
+    result = {
+        "message": f"{deleted} alumni beserta seluruh datanya dihapus.",
+        "deleted": deleted,
+        "batches": batches,
+        "files_queued": len(paths),
+    }
+    if body is not None:
+        result["not_found"] = len(id_list) - deleted
+    # Tidak ada koneksi yang ditahan selama panggilan storage
+    return FastJSONResponse(result, background=BackgroundTask(storage.purge, paths) if paths else None)
+
+
+# 31. Daftar profil request
+@router.get("/debug/profiles", tags=["Debug"], dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """
+    Ringkasan request yang diprofil di worker ini, terbaru dulu. Request diprofil
+    bila dikirim dengan header `X-Profile: 1` dan token admin, atau terpilih oleh
+    `PROFILE_SAMPLE_RATE`.
+    """
+    return {"data": [profile.summary() for profile in profiling.recent()]}
+
+
+# 32. Detail profil request
+@router.get("/debug/profiles/{id_profile}", tags=["Debug"], dependencies=[Depends(require_admin)])
+async def get_profile(id_profile: str):
+    """
+    Rincian satu profil (id dari header `X-Profile-Id`): waktu tunggu pool,
+    setiap query beserta durasinya, waktu encode JSON, sisa waktu Python, dan
+    stack yang paling sering tersampling.
+    """
+    profile = profiling.find(id_profile)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profil tidak ditemukan.")
+    return profile.detail()
+
+
+# 33. Flamegraph profil request
+@router.get("/debug/profiles/{id_profile}/flamegraph", tags=["Debug"], dependencies=[Depends(require_admin)])
+async def get_profile_flamegraph(id_profile: str):
+    """
+    Stack hasil sampling dalam format folded (`frame;frame;... jumlah`), bisa
+    dibuka di speedscope.app atau diubah menjadi SVG dengan `flamegraph.pl`.
+    """
+    profile = profiling.find(id_profile)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profil tidak ditemukan.")
+    return Response(content=profile.folded(), media_type="text/plain; charset=utf-8")
+
+
+# 34. Slow query log
+@router.get("/debug/slow-queries", tags=["Debug"], dependencies=[Depends(require_admin)])
+async def get_slow_queries(reset: bool = False):
+    """
+    Query yang melewati `SLOW_QUERY_MS` di worker ini, terlama dulu, beserta
+    hasil `EXPLAIN (ANALYZE, BUFFERS)` yang dijalankan ulang di koneksi tersendiri.
+
+    - **reset**: kosongkan log setelah dibaca.
+    """
+    if slow_query_log is None:
+        raise HTTPException(status_code=404, detail="Slow query log tidak aktif (SLOW_QUERY_MS=0).")
+    entries = slow_query_log.entries()
+    if reset:
+        slow_query_log.clear()
+    return {"threshold_ms": settings.slow_query_ms, "data": entries}
+
+
+# 35. URL upload langsung bukti kuliah
+# Klien mengupload PDF langsung ke storage lalu mengirim object key-nya sebagai
+# bukti_kuliah_key di payload submit, sehingga worker API hanya menerima JSON kecil
+UPLOAD_URL_TRACER_SQL = "SELECT EXISTS (SELECT 1 FROM tracer WHERE id_alumni = $1)"
+
+@router.post("/questionnaire/upload-url", tags=["Tracer"])
+async def questionnaire_upload_url(data: UploadUrlRequest):
+    """
+    Membuat URL upload bertanda tangan berumur pendek untuk bukti kuliah alumni.
+
+    Klien mengirim file ke ``upload_url`` dengan ``method`` dan ``headers`` yang
+    dikembalikan (paling besar ``max_bytes``, sebelum ``expires_in`` detik),
+    lalu submit dengan ``bukti_kuliah_key`` berisi ``object_key``. Ukuran dan
+    tipe file diperiksa ulang saat submit.
+    """
+    async with get_db(readonly=True) as conn:
+        found = await conn.fetchval(UPLOAD_URL_TRACER_SQL, data.id_alumni)
+    if not found:
+        raise HTTPException(status_code=404, detail="Alumni not found")
+
+    object_key = bukti_kuliah_path(str(data.id_alumni))
+    try:
+        signed = await storage.signed_upload_url(object_key, PDF_CONTENT_TYPE, settings.bukti_kuliah_max_bytes)
+    except StorageError as e:
+        raise HTTPException(status_code=502, detail=f"Gagal membuat URL upload: {str(e)}")
+    return FastJSONResponse({
+        "object_key": object_key,
+        "upload_url": signed.url,
+        "method": signed.method,
+        "headers": signed.headers,
+        "expires_in": signed.expires_in,
+        "max_bytes": settings.bukti_kuliah_max_bytes,
+    })
+
+
+# Target default server: `hypercorn main:app` (lihat hypercorn.toml)
+app = create_app()
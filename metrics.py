@@ -0,0 +1,223 @@
+"""
+Metrik aplikasi dalam format teks Prometheus (``GET /metrics``).
+
+``MetricsMiddleware`` adalah middleware ASGI murni yang mencatat per route
+(template path FastAPI, bukan path mentah, agar kardinalitas label tetap kecil):
+
+- histogram latensi dan jumlah request per status code;
+- request yang sedang berjalan (dihitung saat scrape dari daftar request aktif);
+- jumlah dan total waktu query database, lewat observer di ``db.PooledConnection``.
+
+Selain itu ada counter byte upload ``bukti_kuliah``, gauge pool koneksi, dan
+antrean/penolakan admission control per kelas route.
+
+Semua counter adalah int/float Python biasa yang hanya diubah dari thread event
+loop, jadi tidak butuh lock. Per request hanya dibuat satu ``_RequestState`` dan
+satu closure ``send``.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import admission
+import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class _RequestState:
+    __slots__ = ("scope", "status", "queries", "db_seconds")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.status = 500
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+class RouteMetrics:
+    __slots__ = ("buckets", "latency_sum", "count", "statuses", "queries", "db_seconds")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.statuses: Dict[int, int] = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar[Optional[_RequestState]] = ContextVar("metrics_request", default=None)
+
+_routes: Dict[Tuple[str, str], RouteMetrics] = {}
+_active: Dict[int, _RequestState] = {}
+_uploads: Dict[str, list] = {}
+
+
+def _route_path(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def observe_query(seconds: float) -> None:
+    """Observer untuk ``db.set_query_observer``: diatribusikan ke request yang sedang berjalan."""
+    state = _current.get()
+    if state is not None:
+        state.queries += 1
+        state.db_seconds += seconds
+
+
+def observe_upload(field: str, size: int) -> None:
+    """Mencatat satu file upload (misal ``bukti_kuliah``) beserta ukurannya."""
+    entry = _uploads.get(field)
+    if entry is None:
+        entry = _uploads[field] = [0, 0]
+    entry[0] += 1
+    entry[1] += size
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        db.set_query_observer(observe_query)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = _RequestState(scope)
+        key = id(state)
+        _active[key] = state
+        token = _current.set(state)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                state.status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            del _active[key]
+
+            route_key = (scope["method"], _route_path(scope))
+            metrics = _routes.get(route_key)
+            if metrics is None:
+                metrics = _routes[route_key] = RouteMetrics()
+            metrics.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            metrics.latency_sum += elapsed
+            metrics.count += 1
+            metrics.statuses[state.status] = metrics.statuses.get(state.status, 0) + 1
+            metrics.queries += state.queries
+            metrics.db_seconds += state.db_seconds
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(method: str, route: str) -> str:
+    return f'method="{method}",route="{_escape(route)}"'
+
+
+def render() -> str:
+    """Menyusun seluruh metrik dalam format teks Prometheus 0.0.4."""
+    routes = sorted(_routes.items())
+    lines = []
+
+    lines.append("# HELP tracer_http_requests_total Jumlah request HTTP per route dan status.")
+    lines.append("# TYPE tracer_http_requests_total counter")
+    for (method, route), m in routes:
+        labels = _labels(method, route)
+        for status, count in sorted(m.statuses.items()):
+            lines.append(f'tracer_http_requests_total{{{labels},status="{status}"}} {count}')
+
+    lines.append("# HELP tracer_http_request_duration_seconds Latensi request HTTP per route.")
+    lines.append("# TYPE tracer_http_request_duration_seconds histogram")
+    for (method, route), m in routes:
+        labels = _labels(method, route)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, m.buckets):
+            cumulative += count
+            lines.append(f'tracer_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'tracer_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m.count}')
+        lines.append(f"tracer_http_request_duration_seconds_sum{{{labels}}} {m.latency_sum:.6f}")
+        lines.append(f"tracer_http_request_duration_seconds_count{{{labels}}} {m.count}")
+
+    in_flight: Dict[Tuple[str, str], int] = {}
+    for state in list(_active.values()):
+        key = (state.scope["method"], _route_path(state.scope))
+        in_flight[key] = in_flight.get(key, 0) + 1
+    lines.append("# HELP tracer_http_requests_in_flight Request yang sedang diproses per route.")
+    lines.append("# TYPE tracer_http_requests_in_flight gauge")
+    for (method, route) in sorted(set(in_flight) | {key for key, _ in routes}):
+        lines.append(f"tracer_http_requests_in_flight{{{_labels(method, route)}}} {in_flight.get((method, route), 0)}")
+
+    lines.append("# HELP tracer_db_queries_total Jumlah query database per route.")
+    lines.append("# TYPE tracer_db_queries_total counter")
+    for (method, route), m in routes:
+        lines.append(f"tracer_db_queries_total{{{_labels(method, route)}}} {m.queries}")
+
+    lines.append("# HELP tracer_db_query_seconds_total Total waktu query database per route.")
+    lines.append("# TYPE tracer_db_query_seconds_total counter")
+    for (method, route), m in routes:
+        lines.append(f"tracer_db_query_seconds_total{{{_labels(method, route)}}} {m.db_seconds:.6f}")
+
+    lines.append("# HELP tracer_upload_files_total Jumlah file yang diupload.")
+    lines.append("# TYPE tracer_upload_files_total counter")
+    for field, (files, _) in sorted(_uploads.items()):
+        lines.append(f'tracer_upload_files_total{{field="{field}"}} {files}')
+    lines.append("# HELP tracer_upload_bytes_total Total byte file yang diupload.")
+    lines.append("# TYPE tracer_upload_bytes_total counter")
+    for field, (_, size) in sorted(_uploads.items()):
+        lines.append(f'tracer_upload_bytes_total{{field="{field}"}} {size}')
+
+    pool = db.pool_stats()
+    if pool.get("initialized"):
+        for name, key, kind in (
+            ("tracer_db_pool_size", "size", "gauge"),
+            ("tracer_db_pool_in_use", "in_use", "gauge"),
+            ("tracer_db_pool_waiting", "waiting", "gauge"),
+            ("tracer_db_pool_acquire_timeouts_total", "acquire_timeouts", "counter"),
+        ):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {pool[key]}")
+        if pool["replicas"]:
+            for name, key, kind in (
+                ("tracer_db_replica_up", "healthy", "gauge"),
+                ("tracer_db_replica_reads_total", "reads", "counter"),
+                ("tracer_db_replica_failures_total", "failures", "counter"),
+            ):
+                lines.append(f"# TYPE {name} {kind}")
+                for replica in pool["replicas"]:
+                    lines.append(f'{name}{{replica="{_escape(replica["name"])}"}} {int(replica[key])}')
+            lines.append("# TYPE tracer_db_replica_fallbacks_total counter")
+            lines.append(f"tracer_db_replica_fallbacks_total {pool['replica_fallbacks']}")
+
+    limiters = admission.limiters()
+    for name, attr, kind, help_text in (
+        ("tracer_admission_active", "active", "gauge", "Request yang sedang dilayani per kelas admission."),
+        ("tracer_admission_waiting", "waiting", "gauge", "Request yang menunggu slot per kelas admission."),
+        ("tracer_admission_admitted_total", "admitted", "counter", "Request yang diterima per kelas admission."),
+        ("tracer_admission_shed_total", "shed", "counter", "Request yang ditolak 503 karena antrean penuh."),
+        ("tracer_admission_query_timeouts_total", "timed_out", "counter",
+         "Query yang melewati statement timeout kelasnya."),
+    ):
+        if not limiters:
+            break
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for limiter in limiters:
+            lines.append(f'{name}{{class="{limiter.name}"}} {getattr(limiter, attr)}')
+
+    lines.append("")
+    return "\n".join(lines)
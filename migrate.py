@@ -0,0 +1,223 @@
+"""
+Migrasi skema berversi.
+
+Setiap file ``migrations/NNNN_nama.sql`` dijalankan sekali, berurutan, masing-
+masing di dalam transaksinya sendiri, lalu dicatat di tabel ``schema_migrations``.
+Lock advisory memastikan hanya satu worker yang menjalankan migrasi ketika
+beberapa proses start bersamaan.
+
+File yang baris pertamanya ``-- migrate: no-transaction`` dijalankan per
+statement tanpa transaksi, untuk ``CREATE INDEX CONCURRENTLY`` pada tabel besar
+yang tidak boleh terkunci selama indeks dibangun. Statement seperti itu harus
+aman diulang (``IF NOT EXISTS``): indeks INVALID sisa build yang gagal dihapus
+dulu sebelum dibangun ulang. Baris ``-- migrate: if <ekspresi SQL>`` tepat di
+atas sebuah statement membuat statement itu hanya dijalankan bila ekspresinya
+bernilai true.
+
+Lock-nya lock sesi, jadi migrasi butuh koneksi langsung ke Postgres (atau
+pooler mode session), bukan pooler mode transaction: di sana unlock bisa jatuh
+ke koneksi server yang lain. Aplikasi memakai ``SUPABASE_DB_MIGRATE_URL`` untuk
+itu (default ``SUPABASE_DB_URL``).
+
+Dijalankan otomatis saat startup (matikan dengan ``DB_MIGRATE_ON_STARTUP=0``)
+atau manual::
+
+    python migrate.py up
+    python migrate.py status
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sys
+from typing import List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+_LOCK_ID = 7240602
+_LOCK_POLL_INTERVAL = 0.5
+_FILE_PATTERN = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+_NO_TRANSACTION = "-- migrate: no-transaction"
+_CONDITION_PREFIX = "-- migrate: if "
+_CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+_INVALID_INDEX_SQL = """
+    SELECT EXISTS (SELECT 1 FROM pg_index WHERE indexrelid = to_regclass($1) AND NOT indisvalid)
+"""
+
+_CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version    text PRIMARY KEY,
+        name       text NOT NULL,
+        checksum   text NOT NULL,
+        applied_at timestamptz NOT NULL DEFAULT now()
+    )
+"""
+
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    path: str
+
+    def read(self) -> str:
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def checksum(self) -> str:
+        return hashlib.sha256(self.read().encode("utf-8")).hexdigest()
+
+    def transactional(self) -> bool:
+        return not self.read().startswith(_NO_TRANSACTION)
+
+
+def split_statements(sql: str) -> List[Tuple[Optional[str], str]]:
+    """
+    Memecah script menjadi ``(kondisi, statement)``. Statement berakhir pada baris
+    yang diakhiri titik koma di luar blok ``$$ ... $$``; baris komentar di luar
+    statement dibuang, kecuali ``-- migrate: if`` yang menjadi kondisi statement
+    berikutnya.
+    """
+    statements = []
+    condition, lines, in_body = None, [], False
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not lines and not in_body:
+            if stripped.startswith(_CONDITION_PREFIX):
+                condition = stripped[len(_CONDITION_PREFIX):]
+                continue
+            if not stripped or stripped.startswith("--"):
+                continue
+        lines.append(line)
+        if line.count("$$") % 2:
+            in_body = not in_body
+        if not in_body and stripped.endswith(";"):
+            statements.append((condition, "\n".join(lines)))
+            condition, lines = None, []
+    if lines:
+        statements.append((condition, "\n".join(lines)))
+    return statements
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILE_PATTERN.match(filename)
+        if match:
+            migrations.append(Migration(match.group(1), match.group(2), os.path.join(directory, filename)))
+    return migrations
+
+
+async def _applied(conn) -> dict:
+    rows = await conn.fetch("SELECT version, checksum FROM schema_migrations")
+    return {row["version"]: row["checksum"] for row in rows}
+
+
+async def _lock(conn) -> None:
+    """
+    Mengambil lock migrasi dengan polling, bukan ``pg_advisory_lock`` yang
+    menunggu di dalam statement: statement yang menunggu memegang snapshot, dan
+    ``CREATE INDEX CONCURRENTLY`` di worker pemegang lock menunggu semua snapshot
+    yang lebih tua, sehingga keduanya saling menunggu.
+    """
+    while not await conn.fetchval("SELECT pg_try_advisory_lock($1)", _LOCK_ID):
+        await asyncio.sleep(_LOCK_POLL_INTERVAL)
+
+
+async def _run_statements(conn, sql: str) -> None:
+    for condition, statement in split_statements(sql):
+        if condition is not None and not await conn.fetchval(f"SELECT {condition}"):
+            continue
+        index = _CONCURRENT_INDEX.search(statement)
+        if index and await conn.fetchval(_INVALID_INDEX_SQL, index.group(1)):
+            # Sisa CREATE INDEX CONCURRENTLY yang gagal; IF NOT EXISTS akan melewatinya
+            logger.warning("Menghapus indeks INVALID %s sebelum dibangun ulang", index.group(1))
+            await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index.group(1)}")
+        await conn.execute(statement)
+
+
+async def _record(conn, migration: Migration, checksum: str) -> None:
+    await conn.execute(
+        "INSERT INTO schema_migrations(version, name, checksum) VALUES ($1, $2, $3)",
+        migration.version, migration.name, checksum,
+    )
+
+
+async def migrate(conn, directory: str = MIGRATIONS_DIR) -> List[str]:
+    """
+    Menjalankan migrasi yang belum diterapkan dan mengembalikan versinya.
+    ``conn`` harus koneksi langsung (lihat docstring modul).
+    """
+    applied_now = []
+    await _lock(conn)
+    try:
+        await conn.execute(_CREATE_TABLE_SQL)
+        applied = await _applied(conn)
+        for migration in discover(directory):
+            checksum = migration.checksum()
+            if migration.version in applied:
+                if applied[migration.version] != checksum:
+                    logger.warning("Migrasi %s_%s sudah diterapkan tetapi isi filenya berubah",
+                                   migration.version, migration.name)
+                continue
+            if migration.transactional():
+                logger.info("Menerapkan migrasi %s_%s", migration.version, migration.name)
+                async with conn.transaction():
+                    await conn.execute(migration.read())
+                    await _record(conn, migration, checksum)
+            else:
+                logger.info("Menerapkan migrasi %s_%s (tanpa transaksi)", migration.version, migration.name)
+                await _run_statements(conn, migration.read())
+                await _record(conn, migration, checksum)
+            applied_now.append(migration.version)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", _LOCK_ID)
+    return applied_now
+
+
+async def status(conn, directory: str = MIGRATIONS_DIR) -> List[dict]:
+    await conn.execute(_CREATE_TABLE_SQL)
+    applied = await _applied(conn)
+    return [
+        {
+            "version": m.version,
+            "name": m.name,
+            "applied": m.version in applied,
+            "modified": m.version in applied and applied[m.version] != m.checksum(),
+        }
+        for m in discover(directory)
+    ]
+
+
+async def _main(argv) -> int:
+    import asyncpg
+    from dotenv import load_dotenv
+
+    if argv[1:] not in (["up"], ["status"]):
+        print("Penggunaan: python migrate.py up|status", file=sys.stderr)
+        return 2
+
+    load_dotenv()
+    dsn = os.getenv("SUPABASE_DB_MIGRATE_URL") or os.environ["SUPABASE_DB_URL"]
+    conn = await asyncpg.connect(dsn, statement_cache_size=0)
+    try:
+        if argv[1] == "up":
+            versions = await migrate(conn)
+            print(f"{len(versions)} migrasi diterapkan: {', '.join(versions) or '-'}")
+        else:
+            for entry in await status(conn):
+                mark = "x" if entry["applied"] else " "
+                note = " (file berubah)" if entry["modified"] else ""
+                print(f"[{mark}] {entry['version']}_{entry['name']}{note}")
+    finally:
+        await conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main(sys.argv)))
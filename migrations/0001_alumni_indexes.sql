@@ -0,0 +1,25 @@
+-- migrate: no-transaction
+-- Indeks untuk lookup alumni, dibangun CONCURRENTLY agar tabel tetap bisa ditulis.
+--
+-- * /alumni/check memfilter (nisn, nis, nik, tanggal_lahir); indeks covering
+--   membuat lookup cukup index-only scan.
+-- * /alumni/bulk memakai ON CONFLICT (nisn), yang butuh indeks unik pada nisn.
+-- * /tracer/all dan /tracer/export berurutan keyset (tahun_lulus DESC, nama_siswa, id_alumni).
+
+-- NISN ganda tidak dibersihkan otomatis: kedua baris bisa berisi data tracer
+-- orang yang berbeda dan harus dipilah manual
+DO $$
+BEGIN
+    IF EXISTS (SELECT nisn FROM alumni GROUP BY nisn HAVING COUNT(*) > 1) THEN
+        RAISE EXCEPTION 'Tabel alumni berisi NISN ganda; bersihkan duplikat sebelum menjalankan migrasi ini';
+    END IF;
+END
+$$;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS alumni_nisn_key ON alumni (nisn);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS alumni_check_idx
+    ON alumni (nisn, nis, nik, tanggal_lahir) INCLUDE (id_alumni);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS alumni_keyset_idx
+    ON alumni (tahun_lulus DESC, nama_siswa, id_alumni);
@@ -0,0 +1,33 @@
+-- migrate: no-transaction
+-- Satu baris tracer per alumni. Semua join alumni -> tracer memakai id_alumni,
+-- dan submit kuesioner mengunci baris tracer lewat kolom yang sama.
+--
+-- Jalur /tracer/submit lama membuat baris tracer baru di setiap submit. Yang
+-- dipertahankan adalah baris terbaru (id_tracer terbesar) per alumni; jawaban
+-- dan detail pendidikan baris lama ikut dihapus. Snapshot statistik (jika sudah
+-- ada) ikut dihapus dan dihitung ulang oleh statistik.ensure_schema saat startup.
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT id_alumni FROM tracer GROUP BY id_alumni HAVING COUNT(*) > 1) THEN
+        CREATE TEMP TABLE tracer_duplikat ON COMMIT DROP AS
+        SELECT id_tracer
+        FROM (SELECT id_tracer, row_number() OVER (PARTITION BY id_alumni ORDER BY id_tracer DESC) AS n
+              FROM tracer) t
+        WHERE n > 1;
+
+        DELETE FROM detail_kuesioner WHERE id_tracer IN (SELECT id_tracer FROM tracer_duplikat);
+        DELETE FROM detail_pendidikan_tinggi WHERE id_tracer IN (SELECT id_tracer FROM tracer_duplikat);
+        DELETE FROM tracer WHERE id_tracer IN (SELECT id_tracer FROM tracer_duplikat);
+        RAISE NOTICE 'Menghapus % baris tracer ganda', (SELECT COUNT(*) FROM tracer_duplikat);
+
+        DROP TABLE IF EXISTS statistik_jawaban, statistik_tahun;
+    END IF;
+END
+$$;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS tracer_id_alumni_key
+    ON tracer (id_alumni) INCLUDE (id_tracer, is_filled, kode_status);
+
+-- FK ke status
+CREATE INDEX CONCURRENTLY IF NOT EXISTS tracer_kode_status_idx ON tracer (kode_status);
@@ -0,0 +1,11 @@
+-- migrate: no-transaction
+-- Jawaban dan detail pendidikan selalu dibaca per id_tracer (/tracer/all,
+-- /tracer/export, penghapusan alumni dan snapshot statistik).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS detail_kuesioner_id_tracer_idx
+    ON detail_kuesioner (id_tracer) INCLUDE (id_kuesioner, id_jawaban);
+
+-- FK ke kuesioner (hapus/ubah pertanyaan)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS detail_kuesioner_id_kuesioner_idx ON detail_kuesioner (id_kuesioner);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS detail_pendidikan_tinggi_id_tracer_idx ON detail_pendidikan_tinggi (id_tracer);
@@ -0,0 +1,8 @@
+-- Id submisi antrean (submission_queue.py) yang sudah diterapkan. Ditulis di
+-- transaksi yang sama dengan datanya, sehingga batch yang diulang setelah crash
+-- tidak menyimpan jawaban dua kali.
+
+CREATE TABLE IF NOT EXISTS submission_applied (
+    id_submission text PRIMARY KEY,
+    applied_at    timestamptz NOT NULL DEFAULT now()
+);
@@ -0,0 +1,50 @@
+-- migrate: no-transaction
+-- Satu jawaban per (tracer, pertanyaan) dan satu detail pendidikan per tracer,
+-- sebagai target ON CONFLICT untuk submit ulang. Duplikat dari submit lama
+-- dibersihkan dulu; yang dipertahankan adalah baris terbaru. Snapshot
+-- statistik_jawaban (jika sudah ada) dikurangi sebanyak jawaban yang dihapus.
+-- Submit yang masuk di antara pembersihan dan selesainya indeks unik bisa
+-- menambah duplikat baru; build indeksnya lalu gagal, dan migrasi cukup diulang.
+
+DO $$
+BEGIN
+    IF to_regclass('statistik_jawaban') IS NULL THEN
+        DELETE FROM detail_kuesioner d
+        USING detail_kuesioner n
+        WHERE n.id_tracer = d.id_tracer
+          AND n.id_kuesioner = d.id_kuesioner
+          AND n.id_detail_kuesioner > d.id_detail_kuesioner;
+    ELSE
+        WITH removed AS (
+            DELETE FROM detail_kuesioner d
+            USING detail_kuesioner n
+            WHERE n.id_tracer = d.id_tracer
+              AND n.id_kuesioner = d.id_kuesioner
+              AND n.id_detail_kuesioner > d.id_detail_kuesioner
+            RETURNING d.id_tracer, d.id_kuesioner, d.id_jawaban
+        )
+        INSERT INTO statistik_jawaban AS sj (tahun_lulus, id_kuesioner, id_jawaban, jumlah)
+        SELECT a.tahun_lulus, r.id_kuesioner, r.id_jawaban, -COUNT(*)
+        FROM removed r
+        JOIN tracer t ON t.id_tracer = r.id_tracer
+        JOIN alumni a ON a.id_alumni = t.id_alumni
+        GROUP BY a.tahun_lulus, r.id_kuesioner, r.id_jawaban
+        ON CONFLICT (tahun_lulus, id_kuesioner, id_jawaban) DO UPDATE
+        SET jumlah = sj.jumlah + EXCLUDED.jumlah;
+    END IF;
+END
+$$;
+
+DELETE FROM detail_pendidikan_tinggi d
+USING detail_pendidikan_tinggi n
+WHERE n.id_tracer = d.id_tracer
+  AND n.id_detail_pendidikan > d.id_detail_pendidikan;
+
+-- Menggantikan indeks (id_tracer) INCLUDE (...) dari 0003 untuk pembacaan per tracer
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS detail_kuesioner_tracer_kuesioner_key
+    ON detail_kuesioner (id_tracer, id_kuesioner) INCLUDE (id_jawaban);
+DROP INDEX CONCURRENTLY IF EXISTS detail_kuesioner_id_tracer_idx;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS detail_pendidikan_tinggi_id_tracer_key
+    ON detail_pendidikan_tinggi (id_tracer);
+DROP INDEX CONCURRENTLY IF EXISTS detail_pendidikan_tinggi_id_tracer_idx;
@@ -0,0 +1,27 @@
+-- migrate: no-transaction
+-- Indeks untuk /alumni/search.
+--
+-- * Nama: indeks trigram (pg_trgm) untuk pencarian substring dan fuzzy. Jika
+--   ekstensi tidak tersedia di server, dibuat indeks prefix sebagai gantinya
+--   dan alumni_search.py hanya mencari berdasarkan awalan nama.
+-- * NIS dicari persis; NISN sudah punya alumni_nisn_key.
+-- * Filter perguruan tinggi masuk dari sisi detail pendidikan (juga FK).
+
+-- migrate: if EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- migrate: if EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')
+CREATE INDEX CONCURRENTLY IF NOT EXISTS alumni_nama_trgm_idx ON alumni USING gin (nama_siswa gin_trgm_ops);
+
+-- migrate: if NOT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')
+CREATE INDEX CONCURRENTLY IF NOT EXISTS alumni_nama_prefix_idx ON alumni (lower(nama_siswa) text_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS alumni_nis_idx ON alumni (nis);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS detail_pendidikan_tinggi_id_perguruan_tinggi_idx
+    ON detail_pendidikan_tinggi (id_perguruan_tinggi) INCLUDE (id_tracer);
+
+-- Statistik indeks ekspresi baru ada setelah ANALYZE; tanpanya planner menebak
+-- selektivitas nama dan memilih menyusuri indeks keyset
+ANALYZE alumni;
+ANALYZE detail_pendidikan_tinggi;
@@ -0,0 +1,98 @@
+-- Kolom dan fungsi untuk mode penyimpanan jawaban "compact" (lihat answer_storage.py).
+--
+-- tracer.jawaban menyimpan seluruh jawaban satu tracer: elemen ke-n berisi
+-- id_jawaban untuk pertanyaan dengan kuesioner.posisi_jawaban = n, NULL bila
+-- belum dijawab. Kolom ini baru dipakai setelah `python answer_storage.py
+-- migrate`; sampai saat itu detail_kuesioner tetap sumber datanya. Menambah
+-- kolom nullable tanpa default tidak menulis ulang tabel.
+
+ALTER TABLE tracer ADD COLUMN IF NOT EXISTS jawaban int[];
+
+-- Posisi jawaban setiap pertanyaan di tracer.jawaban: nomor urut rapat mulai 1,
+-- terpisah dari id_kuesioner, sehingga id yang besar atau berlubang tidak
+-- memperpanjang array. Pertanyaan baru mendapat posisi berikutnya dari sequence;
+-- posisi pertanyaan yang dihapus tidak dipakai ulang.
+ALTER TABLE kuesioner ADD COLUMN IF NOT EXISTS posisi_jawaban int;
+CREATE SEQUENCE IF NOT EXISTS kuesioner_posisi_jawaban_seq OWNED BY kuesioner.posisi_jawaban;
+
+UPDATE kuesioner k
+SET posisi_jawaban = p.posisi
+FROM (SELECT id_kuesioner, row_number() OVER (ORDER BY id_kuesioner) AS posisi FROM kuesioner) p
+WHERE k.id_kuesioner = p.id_kuesioner;
+
+SELECT setval('kuesioner_posisi_jawaban_seq', COALESCE(max(posisi_jawaban), 0) + 1, false) FROM kuesioner;
+
+ALTER TABLE kuesioner
+    ALTER COLUMN posisi_jawaban SET DEFAULT nextval('kuesioner_posisi_jawaban_seq'),
+    ALTER COLUMN posisi_jawaban SET NOT NULL,
+    ADD CONSTRAINT kuesioner_posisi_jawaban_key UNIQUE (posisi_jawaban);
+
+-- Batas bawah array selalu 1, sehingga posisi elemen sama dengan posisi_jawaban
+-- juga setelah di-decode asyncpg (yang membuang batas array)
+ALTER TABLE tracer ADD CONSTRAINT tracer_jawaban_bentuk
+    CHECK (jawaban IS NULL OR (array_ndims(jawaban) = 1 AND array_lower(jawaban, 1) = 1)) NOT VALID;
+
+-- Menimpa elemen posisi q[i] dengan a[i] (NULL menghapus jawaban) dan
+-- memperpanjang array bila perlu. Posisi yang sama muncul lebih dari sekali:
+-- yang terakhir menang.
+CREATE OR REPLACE FUNCTION tracer_jawaban_merge(old int[], q int[], a int[])
+RETURNS int[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT array_agg(CASE WHEN n.hit THEN n.a ELSE old[g] END ORDER BY g)
+    FROM generate_series(1, GREATEST(COALESCE(array_upper(old, 1), 0), (SELECT max(x) FROM unnest(q) x))) g
+    LEFT JOIN LATERAL (
+        SELECT p.a, true AS hit
+        FROM unnest(q, a) WITH ORDINALITY AS p(q, a, n)
+        WHERE p.q = g
+        ORDER BY p.n DESC
+        LIMIT 1
+    ) n ON true
+$$;
+
+-- Selama backfill: mencatat tracer yang jawabannya berubah di detail_kuesioner,
+-- untuk disusulkan sebelum pindah mode
+CREATE OR REPLACE FUNCTION detail_kuesioner_capture() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        INSERT INTO detail_kuesioner_dirty VALUES (OLD.id_tracer) ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        INSERT INTO detail_kuesioner_dirty VALUES (NEW.id_tracer) ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+-- Trigger INSTEAD OF untuk view kompatibilitas detail_kuesioner di mode compact:
+-- tulisan berbentuk baris lama diterjemahkan ke tracer.jawaban, dengan
+-- pemeriksaan yang sama seperti foreign key tabel lama
+CREATE OR REPLACE FUNCTION detail_kuesioner_write() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    posisi int;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        SELECT posisi_jawaban INTO posisi FROM kuesioner WHERE id_kuesioner = OLD.id_kuesioner;
+        UPDATE tracer
+        SET jawaban = tracer_jawaban_merge(jawaban, ARRAY[posisi], ARRAY[NULL::int])
+        WHERE id_tracer = OLD.id_tracer;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+
+    SELECT posisi_jawaban INTO posisi FROM kuesioner WHERE id_kuesioner = NEW.id_kuesioner;
+    IF posisi IS NULL OR NOT EXISTS (SELECT 1 FROM jawaban WHERE id_jawaban = NEW.id_jawaban) THEN
+        RAISE foreign_key_violation
+            USING MESSAGE = format('id_kuesioner %s / id_jawaban %s tidak dikenal', NEW.id_kuesioner, NEW.id_jawaban);
+    END IF;
+    UPDATE tracer
+    SET jawaban = tracer_jawaban_merge(jawaban, ARRAY[posisi], ARRAY[NEW.id_jawaban])
+    WHERE id_tracer = NEW.id_tracer;
+    IF NOT FOUND THEN
+        RAISE foreign_key_violation USING MESSAGE = format('id_tracer %s tidak ditemukan', NEW.id_tracer);
+    END IF;
+    RETURN NEW;
+END
+$$;
@@ -0,0 +1,65 @@
+from fastapi import Form
+from pydantic import BaseModel
+
+from datetime import date
+from typing import Optional, Dict, List
+from uuid import UUID
+
+
+# Models
+class AlumniCheckRequest(BaseModel):
+    nisn: str
+    nis: str
+    nik: str
+    tanggal_lahir: date
+
+class TracerData(BaseModel):
+    id_alumni: str
+    alamat_email: str
+    no_telepon: str
+    status: str
+    perguruan_tinggi: str
+    program_studi: str
+    sumber_biaya: str
+    tahun_masuk: int
+    jawaban_kuesioner: dict
+
+class AlumniCreate(BaseModel):
+    nisn: str
+    nis: str
+    nik: str
+    nama_siswa: str
+    tanggal_lahir: date
+    tahun_lulus: int
+
+class LoginRequest(BaseModel):
+    email: str = Form(...)
+    password: str = Form(...)
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class AlumniDeleteRequest(BaseModel):
+    id_alumni: List[UUID]
+
+class UploadUrlRequest(BaseModel):
+    id_alumni: UUID
+
+class PersonalData(BaseModel):
+    alamat_email: str
+    no_telepon: str
+
+class DetailPendidikan(BaseModel):
+    id_perguruan_tinggi: int
+    id_program_studi: int
+    tahun_masuk: int
+    id_sumber_biaya: int
+
+class SubmissionPayload(BaseModel):
+    id_alumni: str
+    personal_data: PersonalData
+    status: str
+    kuesioner: Dict[int, int]
+    detail_pendidikan: Optional[DetailPendidikan] = None
+    # Object key bukti kuliah yang sudah diupload langsung ke storage (lihat /questionnaire/upload-url)
+    bukti_kuliah_key: Optional[str] = None
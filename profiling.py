@@ -0,0 +1,266 @@
+"""
+Profiling per request, on-demand.
+
+Request diprofil bila membawa header ``X-Profile: 1`` bersama access token
+admin (``Authorization: Bearer ...``), atau terpilih acak dengan peluang
+``PROFILE_SAMPLE_RATE`` (default 0, mati). Untuk request itu dicatat:
+
+- waktu tunggu pool koneksi dan setiap query beserta durasinya (lewat
+  ``db.PooledConnection``);
+- waktu encode JSON (``fastjson.dumps``);
+- sisa waktu dinding sebagai waktu Python (transformasi di handler);
+- stack yang disampling setiap ``PROFILE_SAMPLE_INTERVAL_MS`` (default 5) waktu
+  CPU lewat ``SIGPROF``, hanya ketika event loop sedang menjalankan task milik
+  request tersebut. Hasilnya berupa folded stacks (format ``flamegraph.pl`` /
+  speedscope).
+
+Respons request yang diprofil membawa header ``X-Profile-Id``; hasilnya
+disimpan di memori worker (``PROFILE_KEEP`` terakhir, default 100) dan dibaca
+lewat ``/debug/profiles``. Semua waktu adalah waktu dinding, jadi di bawah
+beban waktu Python ikut memuat giliran task lain; ``sampled_cpu_ms`` adalah
+perkiraan waktu CPU event loop yang benar-benar dipakai request ini.
+"""
+import asyncio
+import os
+import random
+import signal
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from settings import ProfilingSettings
+
+# Profil milik request yang sedang berjalan; dibaca oleh db.py dan fastjson.py
+current: ContextVar[Optional["Profile"]] = ContextVar("request_profile", default=None)
+
+MAX_QUERIES = 200
+MAX_SQL_LENGTH = 1000
+
+_sample_rate = 0.0
+_interval = 0.005
+_recent: Deque["Profile"] = deque(maxlen=100)
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_previous_factory = None
+_sampling = False
+# Task yang sedang diprofil -> profilnya (task request dan task anaknya)
+_tasks: Dict[asyncio.Task, "Profile"] = {}
+
+
+class Profile:
+    def __init__(self, method: str, path: str, sampled: bool):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.sampled = sampled
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self.total = 0.0
+        self.pool_wait = 0.0
+        self.sql = 0.0
+        self.sql_count = 0
+        self.encode = 0.0
+        self.queries: List[dict] = []
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+
+    def add_query(self, sql: str, seconds: float) -> None:
+        self.sql += seconds
+        self.sql_count += 1
+        if len(self.queries) < MAX_QUERIES:
+            self.queries.append({"sql": " ".join(sql.split())[:MAX_SQL_LENGTH], "ms": round(seconds * 1000, 3)})
+
+    def summary(self) -> dict:
+        python = max(self.total - self.pool_wait - self.sql - self.encode, 0.0)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "sampled": self.sampled,
+            "started_at": self.started_at,
+            "total_ms": round(self.total * 1000, 3),
+            "pool_wait_ms": round(self.pool_wait * 1000, 3),
+            "sql_ms": round(self.sql * 1000, 3),
+            "sql_count": self.sql_count,
+            "encode_ms": round(self.encode * 1000, 3),
+            "python_ms": round(python * 1000, 3),
+            "sampled_cpu_ms": round(self.samples * _interval * 1000, 3),
+        }
+
+    def detail(self) -> dict:
+        top = sorted(dict(self.stacks).items(), key=lambda item: item[1], reverse=True)[:20]
+        return {
+            **self.summary(),
+            "queries": self.queries,
+            "queries_truncated": self.sql_count > len(self.queries),
+            "samples": self.samples,
+            "top_stacks": [{"stack": stack, "samples": count} for stack, count in top],
+        }
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(dict(self.stacks).items()))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _fold(frame) -> str:
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        # Frame event loop di atas task (run_forever, _run_once, Handle._run) dibuang
+        if code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            break
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _on_sample(signum, frame) -> None:
+    # Handler SIGPROF berjalan di thread event loop di antara bytecode, jadi
+    # current_task() adalah task yang sedang memakai CPU saat timer berbunyi
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return
+    profile = _tasks.get(task) if task is not None else None
+    if profile is None:
+        return
+    stack = _fold(frame)
+    profile.stacks[stack] = profile.stacks.get(stack, 0) + 1
+    profile.samples += 1
+
+
+def _watch(task: asyncio.Task, profile: Profile) -> None:
+    if not _tasks and _sampling:
+        signal.setitimer(signal.ITIMER_PROF, _interval, _interval)
+    _tasks[task] = profile
+
+
+def _unwatch(profile: Profile) -> None:
+    for task in [t for t, p in _tasks.items() if p is profile]:
+        del _tasks[task]
+    if not _tasks and _sampling:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+
+
+def _task_factory(previous):
+    def factory(loop, coro, **kwargs):
+        task = previous(loop, coro, **kwargs) if previous is not None else asyncio.Task(coro, loop=loop, **kwargs)
+        # Task anak (misal body StreamingResponse) ikut diprofil bersama request induknya
+        profile = current.get()
+        if profile is not None:
+            _watch(task, profile)
+        return task
+    return factory
+
+
+def configure(options: Optional[ProfilingSettings] = None) -> None:
+    """Menerapkan konfigurasi (dari create_app); tanpa argumen dibaca dari environment."""
+    global _sample_rate, _interval, _recent
+    options = options or ProfilingSettings.from_env()
+    _sample_rate = options.sample_rate
+    _interval = options.sample_interval_ms / 1000
+    _recent = deque(maxlen=options.keep)
+
+
+def start() -> None:
+    """
+    Memasang task factory dan handler SIGPROF pada event loop yang sedang
+    berjalan (dipanggil dari lifespan). Sampling stack hanya tersedia bila event
+    loop berjalan di main thread pada platform yang punya ``setitimer``.
+    """
+    global _loop, _previous_factory, _sampling
+    if _loop is not None:
+        return
+    _loop = asyncio.get_running_loop()
+    _previous_factory = _loop.get_task_factory()
+    _loop.set_task_factory(_task_factory(_previous_factory))
+    _sampling = hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if _sampling:
+        signal.signal(signal.SIGPROF, _on_sample)
+
+
+def stop() -> None:
+    global _loop, _sampling
+    if _loop is None:
+        return
+    if _sampling:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+    _loop.set_task_factory(_previous_factory)
+    _tasks.clear()
+    _loop, _sampling = None, False
+
+
+def recent() -> List[Profile]:
+    return list(reversed(_recent))
+
+
+def find(profile_id: str) -> Optional[Profile]:
+    for profile in _recent:
+        if profile.id == profile_id:
+            return profile
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI: ``authorize(token)`` mengembalikan ``True`` bila bearer token
+    boleh meminta profiling lewat header ``X-Profile``.
+    """
+
+    def __init__(self, app: ASGIApp, authorize):
+        self.app = app
+        self.authorize = authorize
+
+    def _wanted(self, scope: Scope) -> Optional[bool]:
+        requested, token = False, None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                requested = value.strip() not in (b"", b"0")
+            elif name == b"authorization" and value[:7].lower() == b"bearer ":
+                token = value[7:].decode("latin-1").strip()
+        if requested and token and self.authorize(token):
+            return False
+        if _sample_rate and random.random() < _sample_rate:
+            return True
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        sampled = self._wanted(scope) if scope["type"] == "http" else None
+        if sampled is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], sampled)
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", ()), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        token = current.set(profile)
+        if _loop is not None:
+            _watch(asyncio.current_task(), profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.total = time.perf_counter() - start
+            current.reset(token)
+            if _loop is not None:
+                _unwatch(profile)
+            route = scope.get("route")
+            profile.route = getattr(route, "path", None)
+            _recent.append(profile)
@@ -0,0 +1,252 @@
+"""
+Konfigurasi aplikasi yang dibaca sekali dari environment (dan file ``.env``).
+
+``Settings.from_env()`` hanya membaca variabel; tidak ada koneksi jaringan dan
+tidak ada yang gagal saat import. Nilai wajib diperiksa oleh ``require()`` di
+lifespan, sehingga konfigurasi yang kurang menghasilkan pesan yang jelas saat
+worker start, bukan traceback ketika modul diimpor.
+
+Konfigurasi pool database, autentikasi, admission control, storage dan
+profiling dikelompokkan di dataclass tersendiri (``PoolSettings`` dan
+seterusnya) yang diteruskan ``create_app`` ke modulnya masing-masing. Modul itu
+hanya membaca environment sendiri bila dipakai tanpa ``create_app`` (skrip dan
+test).
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Pool asyncpg dan replika baca (db.py)."""
+    min_size: int = 2
+    max_size: int = 10
+    max_inactive_lifetime: float = 300.0
+    acquire_timeout: float = 10.0
+    healthcheck_idle: float = 30.0
+    prepared_statements: bool = False
+    statement_cache_size: int = 100
+    replica_retry_interval: float = 30.0
+    replica_max_lag: float = 30.0
+    replica_check_interval: float = 10.0
+    read_your_writes_window: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        return cls(
+            min_size=_env_int("DB_POOL_MIN_SIZE", 2),
+            max_size=_env_int("DB_POOL_MAX_SIZE", 10),
+            max_inactive_lifetime=_env_float("DB_POOL_MAX_INACTIVE_LIFETIME", 300.0),
+            acquire_timeout=_env_float("DB_POOL_ACQUIRE_TIMEOUT", 10.0),
+            healthcheck_idle=_env_float("DB_POOL_HEALTHCHECK_IDLE", 30.0),
+            prepared_statements=_env_bool("DB_PREPARED_STATEMENTS", False),
+            statement_cache_size=_env_int("DB_STATEMENT_CACHE_SIZE", 100),
+            replica_retry_interval=_env_float("DB_REPLICA_RETRY_INTERVAL", 30.0),
+            replica_max_lag=_env_float("DB_REPLICA_MAX_LAG", 30.0),
+            replica_check_interval=_env_float("DB_REPLICA_CHECK_INTERVAL", 10.0),
+            read_your_writes_window=_env_float("DB_READ_YOUR_WRITES_WINDOW", 10.0),
+        )
+
+
+@dataclass(frozen=True)
+class AuthSettings:
+    """Token admin (auth.py). ``secret_key`` wajib: setiap worker harus memakai kunci yang sama."""
+    secret_key: Optional[str] = None
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 15
+    refresh_token_expire_days: int = 7
+    bcrypt_rounds: int = 12
+
+    @classmethod
+    def from_env(cls) -> "AuthSettings":
+        return cls(
+            secret_key=os.getenv("JWT_SECRET_KEY") or None,
+            algorithm=os.getenv("JWT_ALGORITHM") or "HS256",
+            access_token_expire_minutes=_env_int("ACCESS_TOKEN_EXPIRE_MINUTES", 15),
+            refresh_token_expire_days=_env_int("REFRESH_TOKEN_EXPIRE_DAYS", 7),
+            bcrypt_rounds=_env_int("PASSWORD_BCRYPT_ROUNDS", 12),
+        )
+
+
+# (concurrency, queue_timeout, max_queue, statement_timeout) per kelas route, per worker
+ADMISSION_DEFAULTS: Dict[str, Tuple[int, float, int, float]] = {
+    "public": (32, 1.0, 256, 5.0),
+    "submit": (8, 10.0, 128, 15.0),
+    "admin": (2, 30.0, 16, 120.0),
+}
+
+
+@dataclass(frozen=True)
+class AdmissionSettings:
+    """Anggaran admission control per kelas route (admission.py)."""
+    enabled: bool = True
+    limits: Dict[str, Tuple[int, float, int, float]] = field(default_factory=lambda: dict(ADMISSION_DEFAULTS))
+
+    @classmethod
+    def from_env(cls) -> "AdmissionSettings":
+        limits = {}
+        for name, (concurrency, queue_timeout, max_queue, statement_timeout) in ADMISSION_DEFAULTS.items():
+            prefix = f"ADMISSION_{name.upper()}_"
+            limits[name] = (
+                _env_int(prefix + "CONCURRENCY", concurrency),
+                _env_float(prefix + "QUEUE_TIMEOUT", queue_timeout),
+                _env_int(prefix + "MAX_QUEUE", max_queue),
+                _env_float(prefix + "STATEMENT_TIMEOUT", statement_timeout),
+            )
+        return cls(enabled=_env_bool("ADMISSION_ENABLED", True), limits=limits)
+
+
+@dataclass(frozen=True)
+class StorageSettings:
+    """Backend penyimpanan bukti kuliah (storage.py)."""
+    backend: str = "supabase"
+    bucket: str = "tracer-study"
+    folder: str = "bukti-kuliah"
+    local_dir: str = "storage"
+    local_base_url: str = "/storage"
+    local_upload_url: str = "http://127.0.0.1:9000"
+    local_signing_key: Optional[str] = None
+    upload_url_ttl: int = 600
+    max_concurrency: int = 4
+    queue_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "StorageSettings":
+        return cls(
+            backend=os.getenv("STORAGE_BACKEND", "supabase").lower(),
+            bucket=os.getenv("STORAGE_BUCKET", "tracer-study"),
+            folder=os.getenv("STORAGE_FOLDER", "bukti-kuliah"),
+            local_dir=os.getenv("STORAGE_LOCAL_DIR", "storage"),
+            local_base_url=os.getenv("STORAGE_LOCAL_BASE_URL", "/storage"),
+            local_upload_url=os.getenv("STORAGE_LOCAL_UPLOAD_URL", "http://127.0.0.1:9000"),
+            local_signing_key=os.getenv("STORAGE_LOCAL_SIGNING_KEY") or None,
+            upload_url_ttl=_env_int("STORAGE_UPLOAD_URL_TTL", 600),
+            max_concurrency=_env_int("STORAGE_MAX_CONCURRENCY", 4),
+            queue_timeout=_env_float("STORAGE_QUEUE_TIMEOUT", 30.0),
+        )
+
+
+@dataclass(frozen=True)
+class ProfilingSettings:
+    """Profil per request (profiling.py)."""
+    sample_rate: float = 0.0
+    sample_interval_ms: float = 5.0
+    keep: int = 100
+
+    @classmethod
+    def from_env(cls) -> "ProfilingSettings":
+        return cls(
+            sample_rate=_env_float("PROFILE_SAMPLE_RATE", 0.0),
+            sample_interval_ms=_env_float("PROFILE_SAMPLE_INTERVAL_MS", 5.0),
+            keep=_env_int("PROFILE_KEEP", 100),
+        )
+
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: Optional[str] = None
+    read_database_urls: Tuple[str, ...] = ()
+    supabase_api_url: Optional[str] = None
+    supabase_api_key: Optional[str] = None
+    alumni_bulk_max_rows: int = 10000
+    alumni_delete_batch_size: int = 500
+    bukti_kuliah_max_bytes: int = 5 * 1024 * 1024
+    referensi_cache_ttl: float = 3600.0
+    referensi_cache_max_age: int = 300
+    referensi_cache_channel: str = "referensi_changed"
+    referensi_cache_listen: bool = False
+    listen_database_url: Optional[str] = None
+    cube_cache_size: int = 128
+    cube_cache_ttl: float = 60.0
+    migrate_on_startup: bool = True
+    migrate_database_url: Optional[str] = None
+    warm_on_startup: bool = True
+    submit_queue_enabled: bool = False
+    submit_queue_path: str = "data/submit-queue.sqlite3"
+    submit_queue_batch_size: int = 100
+    submit_queue_max_pending: int = 10000
+    idempotency_cache_size: int = 10000
+    idempotency_ttl: float = 86400.0
+    slow_query_ms: float = 1000.0
+    slow_query_dsn: Optional[str] = None
+    slow_query_keep: int = 100
+    slow_query_explain_interval: float = 600.0
+    slow_query_analyze_max: float = 10.0
+    pool: PoolSettings = field(default_factory=PoolSettings)
+    auth: AuthSettings = field(default_factory=AuthSettings)
+    admission: AdmissionSettings = field(default_factory=AdmissionSettings)
+    storage: StorageSettings = field(default_factory=StorageSettings)
+    profiling: ProfilingSettings = field(default_factory=ProfilingSettings)
+
+    @classmethod
+    def from_env(cls, env_file: bool = True) -> "Settings":
+        if env_file:
+            load_dotenv()
+        return cls(
+            database_url=os.getenv("SUPABASE_DB_URL"),
+            read_database_urls=tuple(
+                url.strip() for url in os.getenv("SUPABASE_DB_READ_URLS", "").split(",") if url.strip()
+            ),
+            supabase_api_url=os.getenv("SUPABASE_API_URL"),
+            supabase_api_key=os.getenv("SUPABASE_API_KEY"),
+            alumni_bulk_max_rows=int(os.getenv("ALUMNI_BULK_MAX_ROWS", "10000")),
+            alumni_delete_batch_size=int(os.getenv("ALUMNI_DELETE_BATCH_SIZE", "500")),
+            bukti_kuliah_max_bytes=int(os.getenv("BUKTI_KULIAH_MAX_BYTES", str(5 * 1024 * 1024))),
+            referensi_cache_ttl=float(os.getenv("REFERENSI_CACHE_TTL", "3600")),
+            referensi_cache_max_age=int(os.getenv("REFERENSI_CACHE_MAX_AGE", "300")),
+            referensi_cache_channel=os.getenv("REFERENSI_CACHE_CHANNEL", "referensi_changed"),
+            referensi_cache_listen=_env_bool("REFERENSI_CACHE_LISTEN", False),
+            listen_database_url=os.getenv("SUPABASE_DB_LISTEN_URL"),
+            cube_cache_size=int(os.getenv("STATISTIK_CUBE_CACHE_SIZE", "128")),
+            cube_cache_ttl=float(os.getenv("STATISTIK_CUBE_TTL", "60")),
+            migrate_on_startup=_env_bool("DB_MIGRATE_ON_STARTUP", True),
+            migrate_database_url=os.getenv("SUPABASE_DB_MIGRATE_URL"),
+            warm_on_startup=_env_bool("STARTUP_WARMUP", True),
+            submit_queue_enabled=_env_bool("SUBMIT_QUEUE_ENABLED", False),
+            submit_queue_path=os.getenv("SUBMIT_QUEUE_PATH", "data/submit-queue.sqlite3"),
+            submit_queue_batch_size=int(os.getenv("SUBMIT_QUEUE_BATCH_SIZE", "100")),
+            submit_queue_max_pending=int(os.getenv("SUBMIT_QUEUE_MAX_PENDING", "10000")),
+            idempotency_cache_size=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+            idempotency_ttl=float(os.getenv("IDEMPOTENCY_TTL", "86400")),
+            slow_query_ms=float(os.getenv("SLOW_QUERY_MS", "1000")),
+            slow_query_dsn=os.getenv("SLOW_QUERY_DSN"),
+            slow_query_keep=int(os.getenv("SLOW_QUERY_KEEP", "100")),
+            slow_query_explain_interval=float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "600")),
+            slow_query_analyze_max=float(os.getenv("SLOW_QUERY_ANALYZE_MAX", "10")),
+            pool=PoolSettings.from_env(),
+            auth=AuthSettings.from_env(),
+            admission=AdmissionSettings.from_env(),
+            storage=StorageSettings.from_env(),
+            profiling=ProfilingSettings.from_env(),
+        )
+
+    def require(self) -> None:
+        """Gagal dengan pesan yang jelas bila konfigurasi wajib belum diisi."""
+        if not self.database_url:
+            raise RuntimeError("SUPABASE_DB_URL belum diisi")
+        # Kunci acak per proses membuat token dan URL upload dari satu worker
+        # ditolak worker lain (hypercorn.toml menjalankan beberapa worker)
+        if not self.auth.secret_key:
+            raise RuntimeError("JWT_SECRET_KEY belum diisi")
+        if self.storage.backend == "local" and not self.storage.local_signing_key:
+            raise RuntimeError("STORAGE_LOCAL_SIGNING_KEY belum diisi")
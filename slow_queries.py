@@ -0,0 +1,181 @@
+"""
+Slow query log dengan rencana eksekusi.
+
+Setiap query lewat ``db.PooledConnection`` yang berjalan lebih lama dari
+``SLOW_QUERY_MS`` dicatat per teks SQL (jumlah kejadian, durasi terlama dan
+terakhir). Untuk setiap SQL, paling sering sekali per
+``SLOW_QUERY_EXPLAIN_INTERVAL`` detik, query diulang dengan
+``EXPLAIN (ANALYZE, BUFFERS)`` memakai argumen kejadian terakhir:
+
+- di koneksi tersendiri (``SLOW_QUERY_DSN``, default DSN primary), jadi tidak
+  memakai kapasitas pool;
+- hanya statement baca (SELECT/WITH tanpa INSERT/UPDATE/DELETE/MERGE atau
+  ``FOR UPDATE``) yang dijalankan ulang, di dalam transaksi ``READ ONLY`` yang
+  selalu di-rollback dengan ``lock_timeout`` pendek. Statement tulis hanya
+  di-``EXPLAIN``: mengulangnya di primary tetap mengambil row lock dan memicu
+  trigger/sequence meski di-rollback;
+- query yang aslinya lebih lama dari ``SLOW_QUERY_ANALYZE_MAX`` detik juga
+  hanya di-``EXPLAIN`` tanpa dijalankan.
+
+Rencana berisi nilai parameter (termasuk data pribadi alumni), jadi hanya
+disajikan lewat endpoint admin ``/debug/slow-queries``.
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import db
+
+logger = logging.getLogger(__name__)
+
+MAX_SQL_LENGTH = 4000
+
+# Statement yang bisa di-EXPLAIN
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete", "values", "table")
+# Statement yang boleh dijalankan ulang dengan ANALYZE: baca saja. Kata kunci tulis
+# di mana pun (CTE, FOR UPDATE, bahkan di dalam literal) membuatnya hanya di-EXPLAIN.
+_READ_ONLY = ("select", "with", "values", "table")
+_WRITE_KEYWORD = re.compile(r"\b(insert|update|delete|merge)\b", re.IGNORECASE)
+
+
+def _is_read_only(sql: str) -> bool:
+    return sql.lstrip().lower().startswith(_READ_ONLY) and not _WRITE_KEYWORD.search(sql)
+
+
+class _Entry:
+    __slots__ = ("sql", "count", "max_seconds", "last_seconds", "last_seen",
+                 "plan", "analyzed", "plan_error", "explained_at", "pending")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self.last_seen = 0.0
+        self.plan: Optional[str] = None
+        self.analyzed = False
+        self.plan_error: Optional[str] = None
+        self.explained_at = 0.0
+        self.pending = False
+
+    def to_dict(self) -> dict:
+        return {
+            "sql": self.sql[:MAX_SQL_LENGTH],
+            "count": self.count,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "last_ms": round(self.last_seconds * 1000, 3),
+            "last_seen": self.last_seen,
+            "plan": self.plan,
+            "plan_analyzed": self.analyzed,
+            "plan_error": self.plan_error,
+            "explained_at": self.explained_at or None,
+        }
+
+
+class SlowQueryLog:
+    def __init__(self, dsn: str, threshold: float, keep: int = 100, explain_interval: float = 600.0,
+                 analyze_max: float = 10.0, explain_timeout: float = 30.0):
+        self.dsn = dsn
+        self.threshold = threshold
+        self.keep = keep
+        self.explain_interval = explain_interval
+        self.analyze_max = analyze_max
+        self.explain_timeout = explain_timeout
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+        self._task: Optional[asyncio.Task] = None
+        self._conn = None
+
+    def start(self) -> None:
+        db.set_slow_query_hook(self.threshold, self.observe)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        db.set_slow_query_hook(0.0, None)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            self._conn.terminate()
+            self._conn = None
+
+    def observe(self, sql: str, params: Optional[tuple], seconds: float) -> None:
+        """Hook ``db.set_slow_query_hook``; dipanggil di event loop, tidak boleh blocking."""
+        key = " ".join(sql.split())
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(key)
+            while len(self._entries) > self.keep:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        entry.count += 1
+        entry.last_seconds = seconds
+        entry.max_seconds = max(entry.max_seconds, seconds)
+        entry.last_seen = time.time()
+
+        if entry.pending or time.time() - entry.explained_at < self.explain_interval:
+            return
+        if params is None or not key.lower().startswith(_EXPLAINABLE):
+            entry.plan_error = "Statement ini tidak bisa di-EXPLAIN."
+            entry.explained_at = time.time()
+            return
+        try:
+            self._queue.put_nowait((entry, sql, params, seconds))
+            entry.pending = True
+        except asyncio.QueueFull:
+            return
+        logger.warning("Slow query %.0f ms: %s", seconds * 1000, key[:200])
+
+    def entries(self) -> List[dict]:
+        return [entry.to_dict() for entry in sorted(self._entries.values(), key=lambda e: e.max_seconds, reverse=True)]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def _run(self) -> None:
+        while True:
+            entry, sql, params, seconds = await self._queue.get()
+            analyze = seconds <= self.analyze_max and _is_read_only(sql)
+            try:
+                try:
+                    entry.plan = await self._explain(sql, params, analyze)
+                except asyncio.TimeoutError:
+                    if not analyze:
+                        raise
+                    # Ulangan dengan ANALYZE terlalu lama: cukup rencana dari planner
+                    analyze = False
+                    entry.plan = await self._explain(sql, params, analyze)
+                entry.analyzed = analyze
+                entry.plan_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                entry.plan_error = f"{type(e).__name__}: {e}"
+                if self._conn is not None and self._conn.is_closed():
+                    self._conn = None
+            finally:
+                entry.pending = False
+                entry.explained_at = time.time()
+
+    async def _explain(self, sql: str, params: tuple, analyze: bool) -> str:
+        if self._conn is None:
+            self._conn = await db.connect(self.dsn)
+        options = "ANALYZE, BUFFERS" if analyze else "VERBOSE false"
+        transaction = self._conn.transaction()
+        await transaction.start()
+        try:
+            # READ ONLY: fungsi yang menulis di dalam SELECT (nextval, dsb.) pun ditolak
+            await self._conn.execute("SET TRANSACTION READ ONLY")
+            await self._conn.execute("SET LOCAL lock_timeout = '1s'")
+            rows = await self._conn.fetch(f"EXPLAIN ({options}) {sql}", *params, timeout=self.explain_timeout)
+        finally:
+            await transaction.rollback()
+        return "\n".join(row[0] for row in rows)
@@ -0,0 +1,361 @@
+"""
+Snapshot statistik yang dipelihara secara inkremental.
+
+Dua tabel ringkasan menggantikan agregasi penuh di setiap hit dashboard:
+
+- ``statistik_tahun``: jumlah siswa, responden dan yang melanjutkan per ``tahun_lulus``.
+- ``statistik_jawaban``: histogram jawaban per (``tahun_lulus``, pertanyaan, jawaban).
+
+Setiap jalur tulis (submit kuesioner, tambah/impor/hapus alumni) memanggil fungsi
+``record_*`` di bawah ini di dalam transaksinya sendiri, sehingga snapshot ikut
+ter-commit atau ter-rollback bersama datanya. Panggil fungsi ini sebagai
+statement terakhir transaksi agar lock baris counter dipegang sesingkat mungkin.
+
+``rebuild()`` menghitung ulang semuanya dari tabel sumber untuk perbaikan::
+
+    python statistik.py rebuild
+"""
+import asyncio
+import os
+import sys
+from typing import Iterable, Optional, Sequence
+
+import answer_storage
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS statistik_tahun (
+        tahun_lulus        int PRIMARY KEY,
+        jumlah_siswa       int NOT NULL DEFAULT 0,
+        total_responden    int NOT NULL DEFAULT 0,
+        jumlah_melanjutkan int NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS statistik_jawaban (
+        tahun_lulus  int NOT NULL,
+        id_kuesioner int NOT NULL,
+        id_jawaban   int NOT NULL,
+        jumlah       int NOT NULL DEFAULT 0,
+        PRIMARY KEY (tahun_lulus, id_kuesioner, id_jawaban)
+    );
+"""
+
+STATUS_MELANJUTKAN = "PEND"
+
+# Lock advisory agar hanya satu worker yang membuat/membangun ulang snapshot
+_SCHEMA_LOCK_ID = 7240601
+
+_UPSERT_TAHUN_SQL = """
+    INSERT INTO statistik_tahun AS st (tahun_lulus, jumlah_siswa, total_responden, jumlah_melanjutkan)
+    SELECT tahun_lulus, SUM(siswa), SUM(responden), SUM(melanjutkan)
+    FROM unnest($1::int[], $2::int[], $3::int[], $4::int[]) AS d(tahun_lulus, siswa, responden, melanjutkan)
+    GROUP BY tahun_lulus
+    ON CONFLICT (tahun_lulus) DO UPDATE
+    SET jumlah_siswa       = st.jumlah_siswa + EXCLUDED.jumlah_siswa,
+        total_responden    = st.total_responden + EXCLUDED.total_responden,
+        jumlah_melanjutkan = st.jumlah_melanjutkan + EXCLUDED.jumlah_melanjutkan
+"""
+
+_UPSERT_JAWABAN_SQL = """
+    INSERT INTO statistik_jawaban AS sj (tahun_lulus, id_kuesioner, id_jawaban, jumlah)
+    SELECT tahun_lulus, id_kuesioner, id_jawaban, SUM(delta)
+    FROM unnest($1::int[], $2::int[], $3::int[], $4::int[]) AS d(tahun_lulus, id_kuesioner, id_jawaban, delta)
+    GROUP BY tahun_lulus, id_kuesioner, id_jawaban
+    ON CONFLICT (tahun_lulus, id_kuesioner, id_jawaban) DO UPDATE
+    SET jumlah = sj.jumlah + EXCLUDED.jumlah
+"""
+
+_REMOVE_ANSWERS_SQL = """
+    INSERT INTO statistik_jawaban AS sj (tahun_lulus, id_kuesioner, id_jawaban, jumlah)
+    SELECT a.tahun_lulus, dk.id_kuesioner, dk.id_jawaban, -COUNT(*)
+    FROM alumni a
+    JOIN tracer t ON t.id_alumni = a.id_alumni
+    JOIN detail_kuesioner dk ON dk.id_tracer = t.id_tracer
+    WHERE a.id_alumni = ANY($1::uuid[])
+    GROUP BY a.tahun_lulus, dk.id_kuesioner, dk.id_jawaban
+    ON CONFLICT (tahun_lulus, id_kuesioner, id_jawaban) DO UPDATE
+    SET jumlah = sj.jumlah + EXCLUDED.jumlah
+"""
+
+# Mode compact (answer_storage.py): elemen ke-n tracer.jawaban adalah jawaban
+# pertanyaan dengan posisi_jawaban n
+_REMOVE_ANSWERS_COMPACT_SQL = """
+    INSERT INTO statistik_jawaban AS sj (tahun_lulus, id_kuesioner, id_jawaban, jumlah)
+    SELECT a.tahun_lulus, k.id_kuesioner, u.id_jawaban, -COUNT(*)
+    FROM alumni a
+    JOIN tracer t ON t.id_alumni = a.id_alumni
+    CROSS JOIN LATERAL unnest(t.jawaban) WITH ORDINALITY AS u(id_jawaban, posisi)
+    JOIN kuesioner k ON k.posisi_jawaban = u.posisi
+    WHERE a.id_alumni = ANY($1::uuid[])
+      AND u.id_jawaban IS NOT NULL
+    GROUP BY a.tahun_lulus, k.id_kuesioner, u.id_jawaban
+    ON CONFLICT (tahun_lulus, id_kuesioner, id_jawaban) DO UPDATE
+    SET jumlah = sj.jumlah + EXCLUDED.jumlah
+"""
+
+_REMOVE_ALUMNI_SQL = """
+    INSERT INTO statistik_tahun AS st (tahun_lulus, jumlah_siswa, total_responden, jumlah_melanjutkan)
+    SELECT a.tahun_lulus,
+           -COUNT(DISTINCT a.id_alumni),
+           -COUNT(t.id_tracer) FILTER (WHERE t.is_filled),
+           -COUNT(t.id_tracer) FILTER (WHERE t.kode_status = 'PEND')
+    FROM alumni a
+    LEFT JOIN tracer t ON t.id_alumni = a.id_alumni
+    WHERE a.id_alumni = ANY($1::uuid[])
+    GROUP BY a.tahun_lulus
+    ON CONFLICT (tahun_lulus) DO UPDATE
+    SET jumlah_siswa       = st.jumlah_siswa + EXCLUDED.jumlah_siswa,
+        total_responden    = st.total_responden + EXCLUDED.total_responden,
+        jumlah_melanjutkan = st.jumlah_melanjutkan + EXCLUDED.jumlah_melanjutkan
+"""
+
+_REBUILD_SQL = """
+    DELETE FROM statistik_tahun;
+    DELETE FROM statistik_jawaban;
+
+    INSERT INTO statistik_tahun (tahun_lulus, jumlah_siswa, total_responden, jumlah_melanjutkan)
+    SELECT a.tahun_lulus,
+           COUNT(DISTINCT a.id_alumni),
+           COUNT(t.id_tracer) FILTER (WHERE t.is_filled),
+           COUNT(t.id_tracer) FILTER (WHERE t.kode_status = 'PEND')
+    FROM alumni a
+    LEFT JOIN tracer t ON a.id_alumni = t.id_alumni
+    GROUP BY a.tahun_lulus;
+"""
+
+_REBUILD_ANSWERS_SQL = """
+    INSERT INTO statistik_jawaban (tahun_lulus, id_kuesioner, id_jawaban, jumlah)
+    SELECT a.tahun_lulus, dk.id_kuesioner, dk.id_jawaban, COUNT(*)
+    FROM detail_kuesioner dk
+    JOIN tracer t ON dk.id_tracer = t.id_tracer
+    JOIN alumni a ON a.id_alumni = t.id_alumni
+    GROUP BY a.tahun_lulus, dk.id_kuesioner, dk.id_jawaban
+"""
+
+_REBUILD_ANSWERS_COMPACT_SQL = """
+    INSERT INTO statistik_jawaban (tahun_lulus, id_kuesioner, id_jawaban, jumlah)
+    SELECT a.tahun_lulus, k.id_kuesioner, u.id_jawaban, COUNT(*)
+    FROM tracer t
+    JOIN alumni a ON a.id_alumni = t.id_alumni
+    CROSS JOIN LATERAL unnest(t.jawaban) WITH ORDINALITY AS u(id_jawaban, posisi)
+    JOIN kuesioner k ON k.posisi_jawaban = u.posisi
+    WHERE u.id_jawaban IS NOT NULL
+    GROUP BY a.tahun_lulus, k.id_kuesioner, u.id_jawaban
+"""
+
+
+async def _rebuild(conn) -> None:
+    await conn.execute(_REBUILD_SQL)
+    compact = await answer_storage.is_compact(conn, fresh=True)
+    await conn.execute(_REBUILD_ANSWERS_COMPACT_SQL if compact else _REBUILD_ANSWERS_SQL)
+
+
+async def ensure_schema(conn) -> None:
+    """Membuat tabel snapshot jika belum ada, lalu mengisinya dari data yang sudah ada."""
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", _SCHEMA_LOCK_ID)
+        exists = await conn.fetchval("SELECT to_regclass('statistik_tahun') IS NOT NULL")
+        if exists:
+            return
+        await conn.execute(SCHEMA_SQL)
+        await _rebuild(conn)
+
+
+async def rebuild(conn) -> None:
+    """Menghitung ulang seluruh snapshot dari tabel sumber."""
+    async with conn.transaction():
+        # Penulis inkremental menunggu sampai rebuild selesai, sehingga tidak ada delta yang hilang
+        await conn.execute("LOCK TABLE statistik_tahun, statistik_jawaban IN EXCLUSIVE MODE")
+        await _rebuild(conn)
+
+
+async def record_alumni_added(conn, tahun_lulus_list: Iterable[int]) -> None:
+    """Menambah ``jumlah_siswa`` untuk setiap alumni baru (satu entry per alumni)."""
+    years = list(tahun_lulus_list)
+    if years:
+        zeros = [0] * len(years)
+        await conn.execute(_UPSERT_TAHUN_SQL, years, [1] * len(years), zeros, zeros)
+
+
+async def record_tracer_change(conn, tahun_lulus: int, old_filled: bool, old_status: Optional[str],
+                               new_filled: bool, new_status: Optional[str]) -> None:
+    """Menyesuaikan counter responden/melanjutkan ketika status tracer berubah."""
+    responden = int(bool(new_filled)) - int(bool(old_filled))
+    melanjutkan = int(new_status == STATUS_MELANJUTKAN) - int(old_status == STATUS_MELANJUTKAN)
+    if responden or melanjutkan:
+        await conn.execute(_UPSERT_TAHUN_SQL, [tahun_lulus], [0], [responden], [melanjutkan])
+
+
+async def record_tracer_changes(conn, changes: Sequence[tuple]) -> None:
+    """
+    Versi batch ``record_tracer_change``: setiap entry berupa
+    ``(tahun_lulus, old_filled, old_status, new_filled, new_status)``.
+    """
+    years, responden, melanjutkan = [], [], []
+    for tahun_lulus, old_filled, old_status, new_filled, new_status in changes:
+        delta_responden = int(bool(new_filled)) - int(bool(old_filled))
+        delta_melanjutkan = int(new_status == STATUS_MELANJUTKAN) - int(old_status == STATUS_MELANJUTKAN)
+        if delta_responden or delta_melanjutkan:
+            years.append(tahun_lulus)
+            responden.append(delta_responden)
+            melanjutkan.append(delta_melanjutkan)
+    if years:
+        await conn.execute(_UPSERT_TAHUN_SQL, years, [0] * len(years), responden, melanjutkan)
+
+
+async def record_answer_deltas(conn, deltas: Sequence[tuple]) -> None:
+    """Menerapkan delta ``(tahun_lulus, id_kuesioner, id_jawaban, delta)`` ke histogram."""
+    if not deltas:
+        return
+    await conn.execute(
+        _UPSERT_JAWABAN_SQL,
+        [int(tahun) for tahun, _, _, _ in deltas],
+        [int(q_id) for _, q_id, _, _ in deltas],
+        [int(a_id) for _, _, a_id, _ in deltas],
+        [int(delta) for _, _, _, delta in deltas],
+    )
+
+
+async def record_alumni_removed(conn, id_alumni_list: Sequence[str]) -> None:
+    """
+    Mengurangi snapshot untuk alumni yang akan dihapus. Harus dipanggil di
+    transaksi yang sama, sebelum DELETE (selagi baris sumbernya masih ada).
+    """
+    if id_alumni_list:
+        compact = await answer_storage.is_compact(conn, fresh=True)
+        await conn.execute(_REMOVE_ANSWERS_COMPACT_SQL if compact else _REMOVE_ANSWERS_SQL, list(id_alumni_list))
+        await conn.execute(_REMOVE_ALUMNI_SQL, list(id_alumni_list))
+
+
+async def fetch_alumni_summary(conn, tahun_dari: Optional[int] = None, tahun_sampai: Optional[int] = None):
+    return await conn.fetchrow("""
+        SELECT COALESCE(SUM(jumlah_siswa), 0)::int       AS jumlah_siswa,
+               COALESCE(SUM(total_responden), 0)::int    AS total_responden,
+               COALESCE(SUM(jumlah_melanjutkan), 0)::int AS jumlah_melanjutkan
+        FROM statistik_tahun
+        WHERE ($1::int IS NULL OR tahun_lulus >= $1::int)
+          AND ($2::int IS NULL OR tahun_lulus <= $2::int)
+    """, tahun_dari, tahun_sampai)
+
+
+async def fetch_answer_histogram(conn, tahun_dari: Optional[int] = None, tahun_sampai: Optional[int] = None):
+    return await conn.fetch("""
+        SELECT sj.tahun_lulus AS tahun,
+               k.pertanyaan,
+               j.jawaban,
+               sj.jumlah
+        FROM statistik_jawaban sj
+        JOIN kuesioner k ON sj.id_kuesioner = k.id_kuesioner
+        JOIN jawaban j ON sj.id_jawaban = j.id_jawaban
+        WHERE sj.jumlah > 0
+          AND ($1::int IS NULL OR sj.tahun_lulus >= $1::int)
+          AND ($2::int IS NULL OR sj.tahun_lulus <= $2::int)
+        ORDER BY sj.tahun_lulus, sj.id_kuesioner, sj.id_jawaban
+    """, tahun_dari, tahun_sampai)
+
+
+# ---------------------------------------------------------------------------
+# Cube: agregasi multidimensi langsung dari tabel sumber
+# ---------------------------------------------------------------------------
+
+# Dimensi yang boleh diminta: nama -> (ekspresi SQL, butuh join detail pendidikan)
+CUBE_DIMENSIONS = {
+    "tahun_lulus": ("a.tahun_lulus", False),
+    "status": ("s.status", False),
+    "perguruan_tinggi": ("pt.perguruan_tinggi", True),
+    "program_studi": ("ps.nama_program_studi", True),
+    "sumber_biaya": ("sb.sumber_biaya", True),
+    "tahun_masuk": ("dpt.tahun_masuk", True),
+}
+
+CUBE_MEASURES = {
+    "count": "COUNT(*)",
+    "responden": "COUNT(*) FILTER (WHERE t.is_filled)",
+    "melanjutkan": f"COUNT(*) FILTER (WHERE t.kode_status = '{STATUS_MELANJUTKAN}')",
+}
+
+# CUBE atas n dimensi menghasilkan 2^n grouping set
+CUBE_MAX_DIMENSIONS = 4
+
+_CUBE_DETAIL_JOIN = """
+    -- Satu baris detail per tracer, walau kuesioner pernah dikirim ulang
+    LEFT JOIN LATERAL (
+        SELECT d.id_perguruan_tinggi, d.id_program_studi, d.id_sumber_biaya, d.tahun_masuk
+        FROM detail_pendidikan_tinggi d
+        WHERE d.id_tracer = t.id_tracer
+        LIMIT 1
+    ) dpt ON TRUE
+    LEFT JOIN perguruan_tinggi pt ON pt.id_perguruan_tinggi = dpt.id_perguruan_tinggi
+    LEFT JOIN program_studi ps ON ps.id_program_studi = dpt.id_program_studi
+    LEFT JOIN sumber_biaya sb ON sb.id_sumber_biaya = dpt.id_sumber_biaya
+"""
+
+
+def build_cube_query(dims: Sequence[str], measures: Sequence[str]) -> str:
+    """
+    Menyusun satu query ``GROUP BY CUBE(...)`` untuk dimensi dan ukuran yang
+    sudah divalidasi. Kolom ``_grouping`` berisi bitmask ``GROUPING()``: bit
+    bernilai 1 berarti dimensi tersebut di-rollup (tidak dikelompokkan).
+    """
+    exprs = [CUBE_DIMENSIONS[d][0] for d in dims]
+    columns = [f"{expr} AS {dim}" for expr, dim in zip(exprs, dims)]
+    if dims:
+        columns.append(f"GROUPING({', '.join(exprs)}) AS _grouping")
+    columns += [f"{CUBE_MEASURES[m]}::int AS {m}" for m in measures]
+
+    query = f"""
+        SELECT {', '.join(columns)}
+        FROM alumni a
+        LEFT JOIN tracer t ON t.id_alumni = a.id_alumni
+        LEFT JOIN status s ON s.kode_status = t.kode_status
+        {_CUBE_DETAIL_JOIN if any(CUBE_DIMENSIONS[d][1] for d in dims) else ""}
+        WHERE ($1::int IS NULL OR a.tahun_lulus >= $1::int)
+          AND ($2::int IS NULL OR a.tahun_lulus <= $2::int)
+    """
+    if dims:
+        query += f" GROUP BY CUBE ({', '.join(exprs)}) ORDER BY _grouping, {', '.join(dims)}"
+    return query
+
+
+async def fetch_cube(conn, dims: Sequence[str], measures: Sequence[str],
+                     tahun_dari: Optional[int] = None, tahun_sampai: Optional[int] = None) -> list:
+    """
+    Menghitung seluruh rollup dalam satu query dan mengelompokkannya per
+    grouping set: ``[{"group": [dimensi...], "rows": [...]}, ...]``, dari yang
+    paling rinci sampai total keseluruhan (``group`` kosong).
+    """
+    rows = await conn.fetch(build_cube_query(dims, measures), tahun_dari, tahun_sampai)
+    groups = {}
+    for row in rows:
+        mask = row["_grouping"] if dims else 0
+        # Argumen pertama GROUPING() adalah bit paling signifikan
+        grouped = [dim for i, dim in enumerate(dims) if not mask & (1 << (len(dims) - 1 - i))]
+        entry = groups.get(mask)
+        if entry is None:
+            entry = groups[mask] = {"group": grouped, "rows": []}
+        item = {dim: row[dim] for dim in grouped}
+        for m in measures:
+            item[m] = row[m]
+        entry["rows"].append(item)
+    return list(groups.values())
+
+
+async def _main(argv) -> int:
+    import asyncpg
+    from dotenv import load_dotenv
+
+    if argv[1:] != ["rebuild"]:
+        print("Penggunaan: python statistik.py rebuild", file=sys.stderr)
+        return 2
+
+    load_dotenv()
+    conn = await asyncpg.connect(os.environ["SUPABASE_DB_URL"], statement_cache_size=0)
+    try:
+        await ensure_schema(conn)
+        await rebuild(conn)
+    finally:
+        await conn.close()
+    print("Snapshot statistik berhasil dibangun ulang.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv)))
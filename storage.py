@@ -0,0 +1,477 @@
+"""
+Abstraksi penyimpanan file bukti kuliah.
+
+Semua backend bersifat async terhadap pemanggil: backend Supabase menjalankan
+client sync-nya di thread pool, backend lokal menulis ke filesystem (untuk test
+dan self-hosting). Jumlah upload yang berjalan bersamaan dibatasi semaphore agar
+upload lambat tidak menghabiskan thread pool milik request lain.
+
+Selain upload lewat API, klien bisa mengupload langsung ke storage memakai URL
+bertanda tangan (``signed_upload_url``); API cukup memeriksa objeknya dengan
+``stat`` sebelum menyimpan submisi. Untuk backend lokal, URL itu menunjuk ke
+server pengganti di ``storage_server.py``.
+
+Konfigurasi lewat environment (``settings.StorageSettings``):
+
+- ``STORAGE_BACKEND``: ``supabase`` (default) atau ``local``.
+- ``STORAGE_BUCKET`` / ``STORAGE_FOLDER``: default ``tracer-study`` / ``bukti-kuliah``.
+- ``STORAGE_LOCAL_DIR``: direktori backend lokal (default ``./storage``).
+- ``STORAGE_LOCAL_BASE_URL``: prefix URL publik backend lokal (default ``/storage``).
+- ``STORAGE_LOCAL_UPLOAD_URL``: alamat ``storage_server.py`` untuk URL upload
+  backend lokal (default ``http://127.0.0.1:9000``).
+- ``STORAGE_LOCAL_SIGNING_KEY``: kunci HMAC URL upload backend lokal; wajib, dan
+  harus sama di semua worker API dan ``storage_server.py``.
+- ``STORAGE_UPLOAD_URL_TTL``: masa berlaku URL upload backend lokal dalam detik
+  (default 600). URL upload Supabase selalu berlaku 2 jam (ditentukan Supabase).
+- ``STORAGE_MAX_CONCURRENCY``: batas upload/hapus bersamaan per worker (default 4).
+- ``STORAGE_QUEUE_TIMEOUT``: detik menunggu slot upload sebelum 503 (default 30).
+- ``BUKTI_KULIAH_MAX_BYTES``: batas ukuran file bukti kuliah (default 5 MB).
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from settings import StorageSettings
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 256 * 1024
+
+PDF_CONTENT_TYPE = "application/pdf"
+PDF_MAGIC = b"%PDF-"
+
+# Masa berlaku URL upload Supabase ditentukan server Supabase, tidak bisa diatur
+SUPABASE_UPLOAD_URL_TTL = 2 * 60 * 60
+
+
+class StorageError(Exception):
+    pass
+
+
+class ObjectTooLarge(StorageError):
+    pass
+
+
+class SignedUpload(NamedTuple):
+    """URL upload langsung: klien mengirim file dengan ``method`` dan ``headers`` ini."""
+    url: str
+    method: str
+    headers: Dict[str, str]
+    expires_in: int
+
+
+class ObjectInfo(NamedTuple):
+    size: int
+    content_type: str
+
+
+def _object_info(size: int, head: bytes) -> ObjectInfo:
+    """Content type ditentukan dari byte awal isi objek, bukan dari yang dideklarasikan pengupload."""
+    return ObjectInfo(size, PDF_CONTENT_TYPE if head.startswith(PDF_MAGIC) else "application/octet-stream")
+
+
+class StorageBackend:
+    """Antarmuka backend. ``path`` selalu relatif terhadap folder bukti kuliah."""
+
+    def __init__(self, max_concurrency: int = 4, queue_timeout: float = 30.0):
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._queue_timeout = queue_timeout
+
+    async def _acquire_slot(self) -> None:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self._queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail="Layanan penyimpanan sedang sibuk, silakan coba lagi.",
+                headers={"Retry-After": "5"},
+            )
+
+    async def start(self) -> None:
+        """Menyiapkan client sebelum request pertama (dipanggil dari lifespan)."""
+
+    async def upload(self, path: str, chunks: AsyncIterator[bytes], content_type: str) -> bool:
+        """
+        Menyimpan (atau menimpa) objek dari potongan-potongan isinya (misal
+        ``iter_upload``), tanpa menahan file utuh di memori. Mengembalikan
+        ``True`` jika objek baru dibuat, ``False`` jika menimpa objek lama; hanya
+        objek baru yang boleh dihapus sebagai kompensasi ketika transaksi
+        database gagal.
+        """
+        await self._acquire_slot()
+        try:
+            return await self._upload(path, chunks, content_type)
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(str(e)) from e
+        finally:
+            self._slots.release()
+
+    async def signed_upload_url(self, path: str, content_type: str, max_bytes: int) -> SignedUpload:
+        """
+        URL berumur pendek untuk mengupload (atau menimpa) objek ``path``
+        langsung dari klien. ``content_type`` dan ``max_bytes`` ditegakkan oleh
+        backend yang mendukungnya; pemanggil tetap harus memeriksa objeknya
+        dengan ``stat`` sebelum dipakai.
+        """
+        await self._acquire_slot()
+        try:
+            return await self._signed_upload_url(path, content_type, max_bytes)
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(str(e)) from e
+        finally:
+            self._slots.release()
+
+    async def stat(self, path: str) -> Optional[ObjectInfo]:
+        """
+        Ukuran dan content type objek, atau ``None`` jika objek tidak ada. Kedua
+        nilai diukur dari isi objek yang tersimpan (content type ``application/pdf``
+        hanya bila isinya diawali ``%PDF-``), bukan dari header pengupload.
+        """
+        await self._acquire_slot()
+        try:
+            return await self._stat(path)
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(str(e)) from e
+        finally:
+            self._slots.release()
+
+    async def remove(self, paths: List[str]) -> None:
+        if not paths:
+            return
+        await self._acquire_slot()
+        try:
+            await self._remove(paths)
+        finally:
+            self._slots.release()
+
+    async def discard(self, paths: List[str]) -> None:
+        """Hapus kompensasi: kegagalan hanya dicatat agar error aslinya tetap sampai ke klien."""
+        try:
+            await self.remove(paths)
+        except Exception:
+            logger.warning("Gagal menghapus objek storage %s", paths, exc_info=True)
+
+    async def purge(self, paths: List[str], batch_size: int = 100) -> None:
+        """
+        Menghapus banyak objek sebagai task background, ``batch_size`` objek per
+        panggilan ``remove``. Batch yang gagal dicatat lalu dilewati.
+        """
+        for start in range(0, len(paths), batch_size):
+            await self.discard(paths[start:start + batch_size])
+
+    def public_url(self, path: str) -> str:
+        raise NotImplementedError
+
+    async def _upload(self, path: str, chunks: AsyncIterator[bytes], content_type: str) -> bool:
+        raise NotImplementedError
+
+    async def _remove(self, paths: List[str]) -> None:
+        raise NotImplementedError
+
+    async def _signed_upload_url(self, path: str, content_type: str, max_bytes: int) -> SignedUpload:
+        raise NotImplementedError
+
+    async def _stat(self, path: str) -> Optional[ObjectInfo]:
+        raise NotImplementedError
+
+
+class SupabaseStorage(StorageBackend):
+    """
+    Backend Supabase Storage; client sync dijalankan di thread pool.
+
+    Client baru dibuat saat pertama dibutuhkan (atau di ``start()``), karena
+    import dan inisialisasi library supabase cukup mahal untuk cold start.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], bucket: str, folder: str, **kwargs):
+        super().__init__(**kwargs)
+        self._client_factory = client_factory
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.bucket = bucket
+        self.folder = folder.strip("/")
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    async def start(self) -> None:
+        await run_in_threadpool(lambda: self.client)
+
+    def _key(self, path: str) -> str:
+        return f"{self.folder}/{path}" if self.folder else path
+
+    def _upload_sync(self, path: str, source: str, content_type: str) -> bool:
+        from storage3.exceptions import StorageApiError
+
+        bucket = self.client.storage.from_(self.bucket)
+        try:
+            bucket.upload(file=source, path=self._key(path), file_options={"content-type": content_type})
+            return True
+        except StorageApiError as e:
+            # Objek sudah ada (pengisian ulang): timpa, tapi jangan dianggap objek baru
+            if str(e.status) != "409":
+                raise StorageError(str(e)) from e
+        bucket.update(file=source, path=self._key(path), file_options={"content-type": content_type})
+        return False
+
+    async def _upload(self, path: str, chunks: AsyncIterator[bytes], content_type: str) -> bool:
+        # Client sync Supabase mengirim isi dari path file (di-stream httpx dari
+        # disk), jadi potongan ditulis dulu ke file sementara
+        fd, tmp = tempfile.mkstemp(prefix="bukti-kuliah-", suffix=".upload")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    await run_in_threadpool(f.write, chunk)
+            return await run_in_threadpool(self._upload_sync, path, tmp, content_type)
+        finally:
+            os.remove(tmp)
+
+    async def _remove(self, paths: List[str]) -> None:
+        bucket = self.client.storage.from_(self.bucket)
+        await run_in_threadpool(bucket.remove, [self._key(p) for p in paths])
+
+    def public_url(self, path: str) -> str:
+        return self.client.storage.from_(self.bucket).get_public_url(self._key(path))
+
+    def _signed_upload_url_sync(self, path: str, content_type: str) -> SignedUpload:
+        from storage3.types import CreateSignedUploadUrlOptions
+
+        # upsert: pengisian ulang menimpa bukti kuliah lama. Batas ukuran dan tipe
+        # file di sisi Supabase mengikuti pengaturan bucket.
+        signed = self.client.storage.from_(self.bucket).create_signed_upload_url(
+            self._key(path), CreateSignedUploadUrlOptions(upsert="true"),
+        )
+        return SignedUpload(signed["signed_url"], "PUT", {"Content-Type": content_type}, SUPABASE_UPLOAD_URL_TTL)
+
+    async def _signed_upload_url(self, path: str, content_type: str, max_bytes: int) -> SignedUpload:
+        return await run_in_threadpool(self._signed_upload_url_sync, path, content_type)
+
+    def _stat_sync(self, path: str) -> Optional[ObjectInfo]:
+        from storage3.exceptions import StorageApiError
+
+        # Ukuran dan mimetype di metadata objek berasal dari klien yang mengupload
+        # lewat URL bertanda tangan, jadi tidak dipakai: ukuran diambil dari
+        # Content-Range dan tipe dari byte awal isi, seperti backend lokal.
+        # FileAPI tidak punya download sebagian, jadi dipakai _request-nya; karena
+        # itu versi supabase (dan storage3) dipin di requirements.txt dan perilakunya
+        # dijaga test_storage.py.
+        bucket = self.client.storage.from_(self.bucket)
+        try:
+            response = bucket._request("GET", ["object", self.bucket, *self._key(path).split("/")],
+                                       headers={"Range": f"bytes=0-{len(PDF_MAGIC) - 1}"})
+        except StorageApiError as e:
+            if str(e.status) in ("400", "404"):
+                return None
+            # Range tidak terpenuhi: objeknya kosong
+            if str(e.status) == "416":
+                return _object_info(0, b"")
+            raise
+        total = response.headers.get("content-range", "").rpartition("/")[2]
+        size = int(total) if total.isdigit() else len(response.content)
+        return _object_info(size, response.content[:len(PDF_MAGIC)])
+
+    async def _stat(self, path: str) -> Optional[ObjectInfo]:
+        return await run_in_threadpool(self._stat_sync, path)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Backend filesystem lokal untuk test dan self-hosting.
+
+    URL upload langsung ditandatangani HMAC (path, masa berlaku, content type dan
+    batas ukuran) dan diterima oleh ``storage_server.py`` di ``upload_url``.
+    """
+
+    def __init__(self, root: str, base_url: str = "/storage", upload_url: str = "http://127.0.0.1:9000",
+                 signing_key: Optional[str] = None, upload_ttl: int = 600, **kwargs):
+        super().__init__(**kwargs)
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        self.upload_url = upload_url.rstrip("/")
+        self.upload_ttl = upload_ttl
+        # Tanpa kunci, URL upload tidak dibuat maupun diterima. API menolak start
+        # tanpa kunci (Settings.require), storage_server.py juga.
+        self._signing_key = signing_key.encode("utf-8") if signing_key else None
+
+    def _full_path(self, path: str) -> str:
+        full = os.path.abspath(os.path.join(self.root, path))
+        if not full.startswith(self.root + os.sep):
+            raise StorageError(f"Path di luar direktori storage: {path}")
+        return full
+
+    def _remove_sync(self, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(self._full_path(path))
+            except FileNotFoundError:
+                pass
+
+    async def _upload(self, path: str, chunks: AsyncIterator[bytes], content_type: str) -> bool:
+        created = not os.path.exists(self._full_path(path))
+        await self.write_stream(path, chunks)
+        return created
+
+    async def _remove(self, paths: List[str]) -> None:
+        await run_in_threadpool(self._remove_sync, paths)
+
+    def public_url(self, path: str) -> str:
+        return f"{self.base_url}/{path}"
+
+    def _signature(self, path: str, expires: int, content_type: str, max_bytes: int) -> str:
+        if self._signing_key is None:
+            raise StorageError("STORAGE_LOCAL_SIGNING_KEY belum diisi")
+        message = f"{path}\n{expires}\n{content_type}\n{max_bytes}".encode("utf-8")
+        return hmac.new(self._signing_key, message, hashlib.sha256).hexdigest()
+
+    async def _signed_upload_url(self, path: str, content_type: str, max_bytes: int) -> SignedUpload:
+        self._full_path(path)
+        expires = int(time.time()) + self.upload_ttl
+        query = urlencode({
+            "expires": expires,
+            "type": content_type,
+            "max_bytes": max_bytes,
+            "signature": self._signature(path, expires, content_type, max_bytes),
+        })
+        return SignedUpload(f"{self.upload_url}/upload/{quote(path)}?{query}", "PUT",
+                            {"Content-Type": content_type}, self.upload_ttl)
+
+    def verify_upload(self, path: str, params: Mapping[str, str]) -> Tuple[str, int]:
+        """
+        Memeriksa query string URL upload (dipakai ``storage_server.py``).
+        Mengembalikan ``(content_type, max_bytes)`` yang ikut ditandatangani.
+        """
+        try:
+            expires = int(params["expires"])
+            content_type = params["type"]
+            max_bytes = int(params["max_bytes"])
+            signature = params["signature"]
+        except (KeyError, ValueError):
+            raise StorageError("URL upload tidak lengkap")
+        if not hmac.compare_digest(signature, self._signature(path, expires, content_type, max_bytes)):
+            raise StorageError("Tanda tangan URL upload tidak valid")
+        if expires < time.time():
+            raise StorageError("URL upload sudah kedaluwarsa")
+        return content_type, max_bytes
+
+    async def write_stream(self, path: str, chunks: AsyncIterator[bytes], max_bytes: Optional[int] = None) -> int:
+        """
+        Menulis isi objek per potongan tanpa menahannya di memori; ditolak
+        dengan ``ObjectTooLarge`` begitu melewati ``max_bytes``. Objek lama baru
+        tertimpa setelah seluruh isi diterima.
+        """
+        full = self._full_path(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        tmp = f"{full}.tmp-{os.getpid()}-{secrets.token_hex(4)}"
+        size = 0
+        try:
+            with open(tmp, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ObjectTooLarge(f"Ukuran file melebihi batas {max_bytes} byte.")
+                    await run_in_threadpool(f.write, chunk)
+            os.replace(tmp, full)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        return size
+
+    def _stat_sync(self, path: str) -> Optional[ObjectInfo]:
+        try:
+            with open(self._full_path(path), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                head = f.read(len(PDF_MAGIC))
+        except FileNotFoundError:
+            return None
+        # Filesystem tidak menyimpan content type; ditentukan dari isi file
+        return _object_info(size, head)
+
+    async def _stat(self, path: str) -> Optional[ObjectInfo]:
+        return await run_in_threadpool(self._stat_sync, path)
+
+
+def create_storage(supabase_client_factory: Optional[Callable[[], Any]] = None,
+                   backend: Optional[str] = None, options: Optional[StorageSettings] = None) -> StorageBackend:
+    """
+    Membuat backend sesuai ``backend`` atau ``options.backend``; tanpa
+    ``options`` konfigurasi dibaca dari environment. Untuk backend Supabase,
+    ``supabase_client_factory`` baru dipanggil ketika client pertama kali dipakai.
+    """
+    options = options or StorageSettings.from_env()
+    limits = {"max_concurrency": options.max_concurrency, "queue_timeout": options.queue_timeout}
+    backend = (backend or options.backend).lower()
+    if backend == "local":
+        return LocalStorage(
+            options.local_dir,
+            options.local_base_url,
+            upload_url=options.local_upload_url,
+            signing_key=options.local_signing_key,
+            upload_ttl=options.upload_url_ttl,
+            **limits,
+        )
+    if backend == "supabase":
+        return SupabaseStorage(supabase_client_factory, options.bucket, options.folder, **limits)
+    raise ValueError(f"STORAGE_BACKEND tidak dikenal: {backend}")
+
+
+async def inspect_upload(upload: UploadFile, max_bytes: int) -> Tuple[int, bytes]:
+    """
+    Membaca file upload per potongan untuk ukuran dan SHA-256-nya, dan menolak
+    dengan 413 begitu melewati ``max_bytes``. Isi file tidak ditahan di memori
+    (Starlette sudah menampungnya di file sementara); setelah ini isinya
+    diteruskan ke storage dengan ``iter_upload``.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    await upload.seek(0)
+    while True:
+        chunk = await upload.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Ukuran file melebihi batas {max_bytes} byte.",
+            )
+        digest.update(chunk)
+    return size, digest.digest()
+
+
+async def iter_upload(upload: UploadFile) -> AsyncIterator[bytes]:
+    """Isi file upload dari awal, per potongan ``READ_CHUNK_SIZE``."""
+    await upload.seek(0)
+    while True:
+        chunk = await upload.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def bukti_kuliah_path(id_alumni: str) -> str:
+    return f"bukti-kuliah-{id_alumni}.pdf"
@@ -0,0 +1,81 @@
+"""
+Server storage pengganti untuk upload langsung dengan backend lokal.
+
+Dengan ``STORAGE_BACKEND=local``, ``/questionnaire/upload-url`` mengembalikan
+URL bertanda tangan ke server ini (``STORAGE_LOCAL_UPLOAD_URL``), meniru URL
+upload Supabase Storage. Server menerima ``PUT /upload/{path}``, memeriksa
+tanda tangan, masa berlaku, ``Content-Type`` dan batas ukuran yang ikut
+ditandatangani, lalu menulis file ke ``STORAGE_LOCAL_DIR`` tanpa menahannya di
+memori. API membaca file yang sama dari direktori itu.
+
+Dijalankan terpisah dari API, dengan ``STORAGE_LOCAL_DIR`` dan
+``STORAGE_LOCAL_SIGNING_KEY`` yang sama::
+
+    hypercorn storage_server:app --bind 127.0.0.1:9000
+
+Untuk test in-process, ``create_app(storage)`` dapat dipasang langsung di atas
+backend milik aplikasi.
+"""
+from typing import Optional
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from settings import StorageSettings
+from storage import LocalStorage, ObjectTooLarge, StorageError, create_storage
+
+
+def _error(status_code: int, message: str) -> JSONResponse:
+    # Bentuk error mengikuti Supabase Storage
+    return JSONResponse({"statusCode": str(status_code), "error": message, "message": message},
+                        status_code=status_code)
+
+
+async def upload(request: Request) -> JSONResponse:
+    storage: LocalStorage = request.app.state.storage
+    path = request.path_params["path"]
+    try:
+        content_type, max_bytes = storage.verify_upload(path, request.query_params)
+    except StorageError as e:
+        return _error(403, str(e))
+
+    received_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if received_type != content_type:
+        return _error(415, f"Content-Type harus {content_type}")
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > max_bytes:
+        return _error(413, f"Ukuran file melebihi batas {max_bytes} byte.")
+
+    try:
+        size = await storage.write_stream(path, request.stream(), max_bytes)
+    except ObjectTooLarge as e:
+        return _error(413, str(e))
+    except StorageError as e:
+        return _error(400, str(e))
+    return JSONResponse({"Key": path, "size": size})
+
+
+def create_app(storage: Optional[LocalStorage] = None) -> Starlette:
+    """Membuat server pengganti; tanpa argumen, backend lokal dibaca dari environment."""
+    app = Starlette(
+        routes=[Route("/upload/{path:path}", upload, methods=["PUT"])],
+        # Browser mengupload langsung dari origin frontend
+        middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["PUT"], allow_headers=["*"])],
+    )
+    if storage is None:
+        load_dotenv()
+        options = StorageSettings.from_env()
+        # Kunci acak per proses tidak akan cocok dengan URL yang dibuat API
+        if not options.local_signing_key:
+            raise RuntimeError("STORAGE_LOCAL_SIGNING_KEY belum diisi")
+        storage = create_storage(backend="local", options=options)
+    app.state.storage = storage
+    return app
+
+
+app = create_app()
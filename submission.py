@@ -0,0 +1,173 @@
+"""
+Penyimpanan jawaban kuesioner dan detail pendidikan yang aman untuk submit ulang.
+
+Jawaban ditulis sebagai upsert berbasis diff terhadap indeks unik
+``(id_tracer, id_kuesioner)``: jawaban yang sama tidak menyentuh baris apa pun,
+jawaban yang berubah di-update di tempat, dan pertanyaan baru di-insert. Hanya
+baris yang benar-benar berubah dikembalikan, sehingga snapshot statistik cukup
+disesuaikan sebesar selisihnya. Dipakai oleh jalur sinkron ``/questionnaire/submit``
+maupun antrean (``submission_queue.py``), untuk satu atau banyak tracer sekaligus.
+
+Di mode penyimpanan compact (``answer_storage.py``) jawaban digabung ke array
+``tracer.jawaban`` dan delta dihitung dari selisih array lama dan baru.
+"""
+import hashlib
+from typing import Dict, List, Optional, Sequence
+
+import answer_storage
+from models import SubmissionPayload
+from storage import bukti_kuliah_path
+
+# Input berupa array paralel (unnest) sebagai tabel staging. Baris lama dibaca
+# di CTE terpisah: snapshot statement diambil sebelum upsert, dan tracer-nya sudah
+# dikunci FOR UPDATE oleh pemanggil sehingga tidak ada submit lain yang menyela.
+_UPSERT_ANSWERS_SQL = """
+    WITH incoming AS (
+        SELECT * FROM unnest($1::int[], $2::int[], $3::int[]) AS d(id_tracer, id_kuesioner, id_jawaban)
+    ),
+    old AS (
+        SELECT dk.id_tracer, dk.id_kuesioner, dk.id_jawaban
+        FROM detail_kuesioner dk
+        JOIN incoming i ON i.id_tracer = dk.id_tracer AND i.id_kuesioner = dk.id_kuesioner
+    ),
+    upserted AS (
+        INSERT INTO detail_kuesioner AS dk (id_tracer, id_kuesioner, id_jawaban)
+        SELECT id_tracer, id_kuesioner, id_jawaban FROM incoming
+        ON CONFLICT (id_tracer, id_kuesioner) DO UPDATE
+        SET id_jawaban = EXCLUDED.id_jawaban
+        WHERE dk.id_jawaban IS DISTINCT FROM EXCLUDED.id_jawaban
+        RETURNING dk.id_tracer, dk.id_kuesioner, dk.id_jawaban
+    )
+    SELECT u.id_tracer, u.id_kuesioner, u.id_jawaban, o.id_jawaban AS old_jawaban
+    FROM upserted u
+    LEFT JOIN old o ON o.id_tracer = u.id_tracer AND o.id_kuesioner = u.id_kuesioner
+"""
+
+# Mode compact: jawaban per tracer digabung ke array lama (id_kuesioner
+# diterjemahkan ke posisi_jawaban); tracer yang isinya tidak berubah tidak
+# di-update. Hasilnya satu baris per pertanyaan yang berubah, dengan kolom yang
+# sama seperti _UPSERT_ANSWERS_SQL.
+_UPSERT_ANSWERS_COMPACT_SQL = """
+    WITH incoming AS (
+        SELECT d.id_tracer, array_agg(k.posisi_jawaban ORDER BY d.n) AS q, array_agg(d.id_jawaban ORDER BY d.n) AS a
+        FROM unnest($1::int[], $2::int[], $3::int[]) WITH ORDINALITY AS d(id_tracer, id_kuesioner, id_jawaban, n)
+        JOIN kuesioner k ON k.id_kuesioner = d.id_kuesioner
+        GROUP BY d.id_tracer
+    ),
+    merged AS (
+        SELECT t.id_tracer, t.jawaban AS old_jawaban, tracer_jawaban_merge(t.jawaban, i.q, i.a) AS jawaban
+        FROM tracer t
+        JOIN incoming i ON i.id_tracer = t.id_tracer
+    ),
+    updated AS (
+        UPDATE tracer t
+        SET jawaban = m.jawaban
+        FROM merged m
+        WHERE t.id_tracer = m.id_tracer
+          AND m.jawaban IS DISTINCT FROM m.old_jawaban
+        RETURNING t.id_tracer, m.old_jawaban, m.jawaban
+    )
+    SELECT u.id_tracer, k.id_kuesioner, u.jawaban[k.posisi_jawaban] AS id_jawaban,
+           u.old_jawaban[k.posisi_jawaban] AS old_jawaban
+    FROM updated u
+    JOIN kuesioner k ON k.posisi_jawaban <= cardinality(u.jawaban)
+    WHERE u.jawaban[k.posisi_jawaban] IS DISTINCT FROM u.old_jawaban[k.posisi_jawaban]
+"""
+
+# Pengganti foreign key detail_kuesioner di mode compact
+_UNKNOWN_ANSWER_IDS_SQL = """
+    SELECT (SELECT array_agg(DISTINCT q) FROM unnest($1::int[]) q
+            WHERE NOT EXISTS (SELECT 1 FROM kuesioner k WHERE k.id_kuesioner = q)) AS id_kuesioner,
+           (SELECT array_agg(DISTINCT a) FROM unnest($2::int[]) a
+            WHERE NOT EXISTS (SELECT 1 FROM jawaban j WHERE j.id_jawaban = a)) AS id_jawaban
+"""
+
+_UPSERT_PENDIDIKAN_SQL = """
+    INSERT INTO detail_pendidikan_tinggi AS dpt (
+        id_tracer, id_perguruan_tinggi, id_program_studi,
+        tahun_masuk, id_sumber_biaya, bukti_kuliah
+    )
+    SELECT * FROM unnest($1::int[], $2::int[], $3::int[], $4::int[], $5::int[], $6::text[])
+    ON CONFLICT (id_tracer) DO UPDATE
+    SET id_perguruan_tinggi = EXCLUDED.id_perguruan_tinggi,
+        id_program_studi    = EXCLUDED.id_program_studi,
+        tahun_masuk         = EXCLUDED.tahun_masuk,
+        id_sumber_biaya     = EXCLUDED.id_sumber_biaya,
+        bukti_kuliah        = EXCLUDED.bukti_kuliah
+    WHERE (dpt.id_perguruan_tinggi, dpt.id_program_studi, dpt.tahun_masuk, dpt.id_sumber_biaya, dpt.bukti_kuliah)
+          IS DISTINCT FROM
+          (EXCLUDED.id_perguruan_tinggi, EXCLUDED.id_program_studi, EXCLUDED.tahun_masuk,
+           EXCLUDED.id_sumber_biaya, EXCLUDED.bukti_kuliah)
+"""
+
+_REMOVE_PENDIDIKAN_SQL = """
+    DELETE FROM detail_pendidikan_tinggi d
+    USING tracer t
+    WHERE t.id_tracer = d.id_tracer
+      AND d.id_tracer = ANY($1::int[])
+    RETURNING t.id_alumni::text AS id_alumni, d.bukti_kuliah
+"""
+
+
+async def upsert_answers(conn, records: Sequence[tuple], tahun_by_tracer: Dict[int, int]) -> List[tuple]:
+    """
+    Menyimpan jawaban ``(id_tracer, id_kuesioner, id_jawaban)`` dan mengembalikan
+    delta histogram ``(tahun_lulus, id_kuesioner, id_jawaban, delta)`` untuk
+    ``statistik.record_answer_deltas``. Submit ulang yang identik menghasilkan
+    list kosong.
+    """
+    if not records:
+        return []
+    if await answer_storage.is_compact(conn, fresh=True):
+        rows = await _upsert_answers_compact(conn, records)
+    else:
+        rows = await conn.fetch(
+            _UPSERT_ANSWERS_SQL,
+            [r[0] for r in records], [r[1] for r in records], [r[2] for r in records],
+        )
+    deltas = []
+    for row in rows:
+        tahun = tahun_by_tracer[row["id_tracer"]]
+        if row["id_jawaban"] is not None:
+            deltas.append((tahun, row["id_kuesioner"], row["id_jawaban"], 1))
+        if row["old_jawaban"] is not None:
+            deltas.append((tahun, row["id_kuesioner"], row["old_jawaban"], -1))
+    return deltas
+
+
+async def _upsert_answers_compact(conn, records: Sequence[tuple]):
+    q_ids, a_ids = [r[1] for r in records], [r[2] for r in records]
+    unknown = await conn.fetchrow(_UNKNOWN_ANSWER_IDS_SQL, q_ids, a_ids)
+    if unknown["id_kuesioner"] or unknown["id_jawaban"]:
+        raise ValueError(f"id_kuesioner {unknown['id_kuesioner'] or []} / id_jawaban {unknown['id_jawaban'] or []} tidak dikenal")
+    return await conn.fetch(_UPSERT_ANSWERS_COMPACT_SQL, [r[0] for r in records], q_ids, a_ids)
+
+
+async def upsert_pendidikan(conn, records: Sequence[tuple]) -> None:
+    """
+    Menyimpan detail pendidikan ``(id_tracer, id_perguruan_tinggi,
+    id_program_studi, tahun_masuk, id_sumber_biaya, bukti_kuliah)``; satu baris per tracer.
+    """
+    if not records:
+        return
+    await conn.execute(_UPSERT_PENDIDIKAN_SQL, *(list(column) for column in zip(*records)))
+
+
+async def remove_pendidikan(conn, tracer_ids: Sequence[int]) -> List[str]:
+    """
+    Menghapus detail pendidikan tracer yang statusnya tidak lagi 'PEND' dan
+    mengembalikan path bukti kuliahnya, untuk dihapus dari storage setelah commit.
+    """
+    if not tracer_ids:
+        return []
+    rows = await conn.fetch(_REMOVE_PENDIDIKAN_SQL, list(tracer_ids))
+    return [bukti_kuliah_path(row["id_alumni"]) for row in rows if row["bukti_kuliah"]]
+
+
+def fingerprint(payload: SubmissionPayload, bukti_kuliah_sha256: Optional[bytes] = None) -> str:
+    """Sidik jari isi submisi: payload ternormalisasi ditambah SHA-256 isi file bukti kuliah."""
+    digest = hashlib.sha256(payload.model_dump_json().encode("utf-8"))
+    if bukti_kuliah_sha256 is not None:
+        digest.update(b"\0")
+        digest.update(bukti_kuliah_sha256)
+    return digest.hexdigest()
@@ -0,0 +1,476 @@
+"""
+Antrean write-behind untuk ``/questionnaire/submit`` (opsional,
+``SUBMIT_QUEUE_ENABLED=1``).
+
+Saat lonjakan pengisian, endpoint cukup memvalidasi payload, mencatatnya di
+jurnal SQLite lokal (WAL, ``synchronous=FULL``, jadi sudah durable saat 202
+dikirim) lalu mengembalikan id submisi. Worker background di setiap proses
+mengambil batch dari jurnal dan menerapkannya dalam satu transaksi Postgres:
+update ``alumni``/``tracer`` berbasis ``unnest``, upsert jawaban dan detail
+pendidikan (``submission.py``), dan snapshot statistik sekali per batch.
+
+Jaminan:
+
+- Id submisi ditulis ke ``submission_applied`` di transaksi yang sama dengan
+  datanya, jadi batch yang diulang setelah crash tidak menyimpan jawaban dua kali.
+- Satu batch memuat paling banyak satu submisi per alumni, dan submisi alumni
+  yang sedang diproses worker lain tidak diambil, sehingga urutan per alumni terjaga.
+- Jika batch gagal karena data (FK/format), setiap submisi diterapkan sendiri-
+  sendiri agar hanya yang bermasalah yang ditandai ``failed``. Error lain
+  (koneksi, timeout) dicoba lagi sampai ``MAX_ATTEMPTS``.
+
+Beberapa worker hypercorn boleh berbagi file jurnal yang sama; klaim batch
+memakai ``BEGIN IMMEDIATE`` dan lease. File jurnal harus berada di volume
+persisten.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+from fastapi import HTTPException
+
+import statistik
+import submission
+from db import get_db, pin_primary
+from models import SubmissionPayload
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+POLL_INTERVAL = 0.5
+MAX_ATTEMPTS = 5
+# Submisi yang diklaim lebih lama dari ini dianggap milik worker yang mati
+LEASE_SECONDS = 300.0
+RETENTION_SECONDS = 7 * 86400
+PRUNE_INTERVAL = 600.0
+STOP_TIMEOUT = 30.0
+
+# Error karena isi data: mengulang tidak akan berhasil
+_PERMANENT_ERRORS = (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError, ValueError)
+
+_JOURNAL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS submissions (
+        seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+        id           TEXT NOT NULL UNIQUE,
+        id_alumni    TEXT NOT NULL,
+        payload      TEXT NOT NULL,
+        bukti_kuliah TEXT,
+        file_name    TEXT,
+        file_created INTEGER NOT NULL DEFAULT 0,
+        status       TEXT NOT NULL DEFAULT 'queued',
+        attempts     INTEGER NOT NULL DEFAULT 0,
+        error        TEXT,
+        claimed_by   TEXT,
+        claimed_at   REAL,
+        created_at   REAL NOT NULL,
+        updated_at   REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS submissions_status_idx ON submissions (status, seq);
+    CREATE INDEX IF NOT EXISTS submissions_alumni_idx ON submissions (id_alumni, status);
+"""
+
+# ---------------------------------------------------------------------------
+# SQL penerapan batch (padanan set-based dari submit_questionnaire)
+# ---------------------------------------------------------------------------
+
+_MARK_APPLIED_SQL = """
+    INSERT INTO submission_applied (id_submission)
+    SELECT unnest($1::text[])
+    ON CONFLICT DO NOTHING
+    RETURNING id_submission
+"""
+
+_UPDATE_ALUMNI_SQL = """
+    UPDATE alumni a
+    SET alamat_email = d.alamat_email,
+        no_telepon   = d.no_telepon
+    FROM unnest($1::uuid[], $2::text[], $3::text[]) AS d(id_alumni, alamat_email, no_telepon)
+    WHERE a.id_alumni = d.id_alumni
+      AND EXISTS (SELECT 1 FROM tracer t WHERE t.id_alumni = d.id_alumni)
+"""
+
+_UPDATE_TRACER_SQL = """
+    UPDATE tracer t
+    SET kode_status = d.kode_status,
+        is_filled   = TRUE,
+        fill_date   = CURRENT_DATE
+    FROM unnest($1::uuid[], $2::text[]) AS d(id_alumni, kode_status),
+         (SELECT id_tracer, is_filled, kode_status
+          FROM tracer
+          WHERE id_alumni = ANY($1::uuid[])
+          FOR UPDATE) old,
+         alumni a
+    WHERE t.id_alumni = d.id_alumni
+      AND t.id_tracer = old.id_tracer
+      AND a.id_alumni = t.id_alumni
+    RETURNING t.id_tracer, t.id_alumni::text AS id_alumni, a.tahun_lulus,
+              old.is_filled AS old_is_filled, old.kode_status AS old_kode_status
+"""
+
+
+class SubmissionJournal:
+    """Jurnal SQLite. Semua method sync; dipanggil dari satu thread khusus."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Transaksi dikelola manual (BEGIN IMMEDIATE) agar klaim antar proses atomik
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=30.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_JOURNAL_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def pending(self) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM submissions WHERE status IN (?, ?)", (QUEUED, PROCESSING)
+        ).fetchone()[0]
+
+    def enqueue(self, id_submission: str, payload: SubmissionPayload, bukti_kuliah: Optional[str],
+                file_name: Optional[str], file_created: bool) -> None:
+        now = time.time()
+        self._conn.execute("""
+            INSERT INTO submissions (id, id_alumni, payload, bukti_kuliah, file_name, file_created,
+                                     created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (id_submission, payload.id_alumni, payload.model_dump_json(), bukti_kuliah, file_name,
+              int(file_created), now, now))
+
+    def claim(self, worker: str, limit: int) -> List[sqlite3.Row]:
+        """Mengklaim sampai ``limit`` submisi antre, paling banyak satu per alumni."""
+        now = time.time()
+        expired = now - LEASE_SECONDS
+        with self._transaction():
+            candidates = self._conn.execute("""
+                SELECT id, id_alumni FROM submissions s
+                WHERE (status = ? OR (status = ? AND claimed_at < ?))
+                  AND NOT EXISTS (SELECT 1 FROM submissions p
+                                  WHERE p.id_alumni = s.id_alumni AND p.status = ?
+                                    AND p.claimed_at >= ?)
+                ORDER BY seq
+                LIMIT ?
+            """, (QUEUED, PROCESSING, expired, PROCESSING, expired, limit * 2)).fetchall()
+            seen = set()
+            ids = []
+            for row in candidates:
+                if row["id_alumni"] not in seen:
+                    seen.add(row["id_alumni"])
+                    ids.append(row["id"])
+                if len(ids) >= limit:
+                    break
+            if not ids:
+                return []
+            marks = ",".join("?" * len(ids))
+            self._conn.execute(
+                f"UPDATE submissions SET status = ?, claimed_by = ?, claimed_at = ?, updated_at = ? "
+                f"WHERE id IN ({marks})",
+                (PROCESSING, worker, now, now, *ids),
+            )
+            return self._conn.execute(
+                f"SELECT * FROM submissions WHERE id IN ({marks}) ORDER BY seq", ids
+            ).fetchall()
+
+    def complete(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        marks = ",".join("?" * len(ids))
+        self._conn.execute(
+            f"UPDATE submissions SET status = ?, error = NULL, updated_at = ? WHERE id IN ({marks})",
+            (DONE, time.time(), *ids),
+        )
+
+    def fail(self, id_submission: str, error: str) -> None:
+        self._conn.execute(
+            "UPDATE submissions SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (FAILED, error, time.time(), id_submission),
+        )
+
+    def release(self, ids: List[str], error: str) -> List[str]:
+        """Mengembalikan submisi ke antrean; yang sudah ``MAX_ATTEMPTS`` kali gagal ditandai ``failed``."""
+        failed = []
+        now = time.time()
+        with self._transaction():
+            for id_submission in ids:
+                attempts = self._conn.execute(
+                    "UPDATE submissions SET attempts = attempts + 1 WHERE id = ? RETURNING attempts",
+                    (id_submission,),
+                ).fetchone()[0]
+                status = FAILED if attempts >= MAX_ATTEMPTS else QUEUED
+                if status == FAILED:
+                    failed.append(id_submission)
+                self._conn.execute(
+                    "UPDATE submissions SET status = ?, error = ?, claimed_by = NULL, updated_at = ? WHERE id = ?",
+                    (status, error, now, id_submission),
+                )
+        return failed
+
+    def status(self, id_submission: str) -> Optional[dict]:
+        row = self._conn.execute("SELECT * FROM submissions WHERE id = ?", (id_submission,)).fetchone()
+        if row is None:
+            return None
+        result = {
+            "submission_id": row["id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "error": row["error"],
+            "created_at": datetime.fromtimestamp(row["created_at"], timezone.utc).isoformat(),
+            "updated_at": datetime.fromtimestamp(row["updated_at"], timezone.utc).isoformat(),
+        }
+        if row["status"] == QUEUED:
+            result["position"] = self._conn.execute(
+                "SELECT COUNT(*) FROM submissions WHERE status = ? AND seq < ?", (QUEUED, row["seq"])
+            ).fetchone()[0] + 1
+        return result
+
+    def prune(self, older_than: float) -> int:
+        return self._conn.execute(
+            "DELETE FROM submissions WHERE status = ? AND updated_at < ?", (DONE, older_than)
+        ).rowcount
+
+
+class _Item:
+    __slots__ = ("id", "payload", "bukti_kuliah", "file_name", "file_created")
+
+    def __init__(self, row: sqlite3.Row):
+        self.id = row["id"]
+        self.bukti_kuliah = row["bukti_kuliah"]
+        self.file_name = row["file_name"]
+        self.file_created = bool(row["file_created"])
+        self.payload = SubmissionPayload.model_validate_json(row["payload"])
+
+
+async def apply_batch(conn, items: List[_Item]) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Menerapkan satu batch di dalam transaksi milik pemanggil. Mengembalikan
+    ``{id_submission: error}`` untuk submisi yang dilewati karena alumni atau
+    tracer-nya tidak ada (sisanya sudah tersimpan), dan path bukti kuliah yang
+    tidak dipakai lagi karena status alumninya berpindah dari 'PEND'.
+    """
+    applied = await conn.fetch(_MARK_APPLIED_SQL, [item.id for item in items])
+    fresh = {row["id_submission"] for row in applied}
+    # Sudah diterapkan sebelum crash: cukup ditandai selesai
+    items = [item for item in items if item.id in fresh]
+    if not items:
+        return {}, []
+
+    payloads = [item.payload for item in items]
+    await conn.execute(
+        _UPDATE_ALUMNI_SQL,
+        [p.id_alumni for p in payloads],
+        [p.personal_data.alamat_email for p in payloads],
+        [p.personal_data.no_telepon for p in payloads],
+    )
+    tracer_rows = await conn.fetch(_UPDATE_TRACER_SQL, [p.id_alumni for p in payloads], [p.status for p in payloads])
+
+    tracer_by_alumni = {}
+    for row in tracer_rows:
+        tracer_by_alumni.setdefault(row["id_alumni"], row)
+
+    skipped = {}
+    pendidikan_records = []
+    not_pend_tracers = []
+    kuesioner_records = []
+    tahun_by_tracer = {}
+    for item in items:
+        payload = item.payload
+        row = tracer_by_alumni.get(str(uuid.UUID(payload.id_alumni)))
+        if row is None:
+            skipped[item.id] = "Data tracer alumni tidak ditemukan."
+            continue
+        tahun_by_tracer[row["id_tracer"]] = row["tahun_lulus"]
+        if payload.status == 'PEND' and payload.detail_pendidikan:
+            detail = payload.detail_pendidikan
+            pendidikan_records.append((
+                row["id_tracer"], detail.id_perguruan_tinggi, detail.id_program_studi,
+                detail.tahun_masuk, detail.id_sumber_biaya, item.bukti_kuliah,
+            ))
+        elif payload.status != 'PEND':
+            not_pend_tracers.append(row["id_tracer"])
+        for q_id, a_id in payload.kuesioner.items():
+            kuesioner_records.append((row["id_tracer"], q_id, a_id))
+
+    await submission.upsert_pendidikan(conn, pendidikan_records)
+    removed_files = await submission.remove_pendidikan(conn, not_pend_tracers)
+    answer_deltas = await submission.upsert_answers(conn, kuesioner_records, tahun_by_tracer)
+
+    # Snapshot statistik terakhir, agar lock counter dipegang sesingkat mungkin
+    status_by_alumni = {str(uuid.UUID(p.id_alumni)): p.status for p in payloads}
+    await statistik.record_tracer_changes(conn, [
+        (row["tahun_lulus"], row["old_is_filled"], row["old_kode_status"], True, status_by_alumni[row["id_alumni"]])
+        for row in tracer_rows
+    ])
+    await statistik.record_answer_deltas(conn, answer_deltas)
+    return skipped, removed_files
+
+
+class SubmissionQueue:
+    def __init__(self, path: str, batch_size: int = 100, max_pending: int = 10000,
+                 on_applied: Optional[Callable[[], None]] = None,
+                 discard_files: Optional[Callable[[List[str]], Awaitable[None]]] = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._on_applied = on_applied
+        self._discard_files = discard_files
+        self._worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Satu thread khusus: akses SQLite berurutan dan tidak bersaing dengan thread pool request
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="submission-journal")
+        self._journal: Optional[SubmissionJournal] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def start(self) -> None:
+        self._journal = await self._call(SubmissionJournal, self.path)
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Menunggu batch yang sedang berjalan selesai. Worker tidak pernah dibatalkan:
+        batch yang terputus di tengah transaksi baru diulang setelah lease-nya habis.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            # shield: shutdown yang dibatalkan dari luar juga tidak ikut membatalkan worker
+            done, _ = await asyncio.shield(asyncio.wait({self._task}, timeout=STOP_TIMEOUT))
+            if not done:
+                logger.warning("Worker antrean submit belum selesai setelah %.0fs, menunggu batch yang berjalan",
+                               STOP_TIMEOUT)
+                await asyncio.shield(self._task)
+            self._task = None
+        if self._journal is not None:
+            await self._call(self._journal.close)
+            self._journal = None
+
+    async def enqueue(self, payload: SubmissionPayload, bukti_kuliah: Optional[str] = None,
+                      file_name: Optional[str] = None, file_created: bool = False) -> str:
+        """Mencatat submisi secara durable dan mengembalikan id-nya; 503 jika antrean penuh."""
+        if await self._call(self._journal.pending) >= self.max_pending:
+            raise HTTPException(
+                status_code=503,
+                detail="Antrean pengisian sedang penuh, silakan coba lagi.",
+                headers={"Retry-After": "30"},
+            )
+        id_submission = uuid.uuid4().hex
+        await self._call(self._journal.enqueue, id_submission, payload, bukti_kuliah, file_name, file_created)
+        self._wakeup.set()
+        return id_submission
+
+    async def status(self, id_submission: str) -> Optional[dict]:
+        return await self._call(self._journal.status, id_submission)
+
+    async def _run(self) -> None:
+        last_prune = 0.0
+        delay = POLL_INTERVAL
+        while not self._stopping:
+            # Dibersihkan sebelum drain: enqueue yang masuk selama drain tetap membangunkan worker
+            self._wakeup.clear()
+            try:
+                processed = await self._drain_once()
+                delay = POLL_INTERVAL
+                if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                    await self._call(self._journal.prune, time.time() - RETENTION_SECONDS)
+                    last_prune = time.monotonic()
+            except Exception:
+                logger.exception("Worker antrean submit gagal, mencoba lagi dalam %.1fs", delay)
+                processed = 0
+                delay = min(delay * 2, 30.0)
+            if processed == 0 and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _drain_once(self) -> int:
+        rows = await self._call(self._journal.claim, self._worker_id, self.batch_size)
+        if not rows:
+            return 0
+
+        items = []
+        for row in rows:
+            try:
+                items.append(_Item(row))
+            except ValueError as e:
+                await self._finish_failed(row["id"], f"Payload tidak valid: {e}", row["file_name"] if row["file_created"] else None)
+
+        try:
+            skipped, removed_files = await self._apply(items)
+        except _PERMANENT_ERRORS:
+            # Pisahkan submisi yang bermasalah dari yang valid
+            skipped, removed_files = {}, []
+            for item in items:
+                try:
+                    item_skipped, item_removed = await self._apply([item])
+                    skipped.update(item_skipped)
+                    removed_files.extend(item_removed)
+                except _PERMANENT_ERRORS as e:
+                    skipped[item.id] = f"Data tidak valid: {e}"
+                except Exception as e:
+                    await self._release([item], str(e))
+                    skipped[item.id] = None
+        except Exception as e:
+            await self._release(items, str(e))
+            raise
+
+        done = [item.id for item in items if item.id not in skipped]
+        for item in items:
+            if item.id not in skipped:
+                pin_primary(str(uuid.UUID(item.payload.id_alumni)))
+        await self._call(self._journal.complete, done)
+        for item in items:
+            error = skipped.get(item.id)
+            if error:
+                await self._finish_failed(item.id, error, item.file_name if item.file_created else None)
+        if done and self._on_applied is not None:
+            self._on_applied()
+        # Bukti kuliah alumni yang berpindah dari 'PEND', setelah datanya commit
+        if removed_files and self._discard_files is not None:
+            await self._discard_files(removed_files)
+        return len(rows)
+
+    async def _apply(self, items: List[_Item]) -> Tuple[Dict[str, str], List[str]]:
+        async with get_db() as conn:
+            async with conn.transaction():
+                return await apply_batch(conn, items)
+
+    async def _release(self, items: List[_Item], error: str) -> None:
+        failed = set(await self._call(self._journal.release, [item.id for item in items], error))
+        for item in items:
+            if item.id in failed and item.file_created and self._discard_files is not None:
+                await self._discard_files([item.file_name])
+
+    async def _finish_failed(self, id_submission: str, error: str, file_name: Optional[str]) -> None:
+        await self._call(self._journal.fail, id_submission, error)
+        # Kompensasi seperti jalur sinkron: file yang baru dibuat untuk submisi ini dihapus
+        if file_name and self._discard_files is not None:
+            await self._discard_files([file_name])
@@ -0,0 +1,173 @@
+"""
+Fixture bersama test.
+
+Test yang menyentuh database memakai ``TEST_DATABASE_URL``: database sekali
+pakai yang dihapus isinya lalu diisi ulang (``benchmark.seed``, skala kecil)
+sekali per sesi. Tanpa variabel itu test tersebut dilewati. Test yang butuh
+replica streaming dari database itu membaca ``TEST_DATABASE_READ_URL``.
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost:5432/tracer_test python -m pytest -q
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+TEST_DSN = os.getenv("TEST_DATABASE_URL")
+TEST_READ_DSN = os.getenv("TEST_DATABASE_READ_URL")
+SEED_ALUMNI = 300
+
+# main.py membuat app saat diimpor, jadi environment disiapkan sebelum import pertama
+STORAGE_DIR = tempfile.mkdtemp(prefix="tracer-test-storage-")
+os.environ.update({
+    "SUPABASE_DB_URL": TEST_DSN or "postgresql://localhost/tracer_test_unset",
+    "SUPABASE_DB_READ_URLS": "",
+    "STORAGE_BACKEND": "local",
+    "STORAGE_LOCAL_DIR": STORAGE_DIR,
+    "STORAGE_LOCAL_UPLOAD_URL": "http://storage.test",
+    "STORAGE_LOCAL_SIGNING_KEY": "test-signing-key",
+    "JWT_SECRET_KEY": "test-jwt-secret",
+    "SUBMIT_QUEUE_ENABLED": "0",
+    "REFERENSI_CACHE_LISTEN": "0",
+    "PROFILE_SAMPLE_RATE": "0",
+})
+
+requires_db = pytest.mark.skipif(not TEST_DSN, reason="TEST_DATABASE_URL belum diisi")
+requires_replica = pytest.mark.skipif(not (TEST_DSN and TEST_READ_DSN), reason="TEST_DATABASE_READ_URL belum diisi")
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def seeded():
+    """Skema dan data benchmark kecil di ``TEST_DATABASE_URL``, plus migrasi."""
+    if not TEST_DSN:
+        pytest.skip("TEST_DATABASE_URL belum diisi")
+    import asyncpg
+    import migrate
+    from benchmark.seed import seed
+
+    async def run():
+        conn = await asyncpg.connect(TEST_DSN)
+        try:
+            await seed(conn, SEED_ALUMNI)
+            await migrate.migrate(conn)
+        finally:
+            await conn.close()
+
+    asyncio.run(run())
+    return TEST_DSN
+
+
+@pytest.fixture
+async def conn(seeded):
+    import asyncpg
+
+    connection = await asyncpg.connect(seeded)
+    try:
+        yield connection
+    finally:
+        await connection.close()
+
+
+@pytest.fixture
+def app_settings(seeded):
+    """Settings aplikasi untuk database test; test boleh menimpa dengan ``dataclasses.replace``."""
+    from settings import Settings
+
+    return Settings.from_env(env_file=False)
+
+
+@pytest.fixture
+async def app(app_settings):
+    import main
+
+    application = main.create_app(app_settings)
+    async with application.router.lifespan_context(application):
+        yield application
+
+
+@pytest.fixture
+async def client(app):
+    import httpx
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api.test") as http:
+        yield http
+
+
+@pytest.fixture
+def admin(app):
+    """Endpoint admin bisa dipanggil tanpa token selama satu test."""
+    import main
+
+    app.dependency_overrides[main.require_admin] = lambda: None
+
+
+@pytest.fixture
+async def unfilled_alumni(conn):
+    """Id alumni yang tracer-nya belum diisi; tiap pemanggilan mengambil alumni berbeda."""
+    used = set()
+
+    async def pick() -> str:
+        rows = await conn.fetch("""
+            SELECT t.id_alumni::text FROM tracer t
+            WHERE NOT t.is_filled ORDER BY t.id_tracer LIMIT 50
+        """)
+        for row in rows:
+            if row[0] not in used:
+                used.add(row[0])
+                return row[0]
+        raise RuntimeError("Tidak ada lagi alumni yang belum mengisi")
+
+    return pick
+
+
+def submission_payload(id_alumni: str, status: str = "KERJA", answer: int = 1, questions=(1, 2, 3), **extra) -> dict:
+    payload = {
+        "id_alumni": id_alumni,
+        "personal_data": {"alamat_email": "test@contoh.id", "no_telepon": "0812"},
+        "status": status,
+        "kuesioner": {q: answer for q in questions},
+    }
+    if status == "PEND":
+        payload["detail_pendidikan"] = {
+            "id_perguruan_tinggi": 1, "id_program_studi": 2, "tahun_masuk": 2020, "id_sumber_biaya": 1,
+        }
+    payload.update(extra)
+    return payload
+
+
+async def statistik_rows(conn) -> tuple:
+    # Baris nol (angkatan yang sudah dihapus semua) sama artinya dengan tidak ada baris
+    tahun = await conn.fetch("""
+        SELECT * FROM statistik_tahun WHERE (jumlah_siswa, total_responden, jumlah_melanjutkan) <> (0, 0, 0)
+        ORDER BY tahun_lulus
+    """)
+    jawaban = await conn.fetch("""
+        SELECT * FROM statistik_jawaban WHERE jumlah <> 0 ORDER BY tahun_lulus, id_kuesioner, id_jawaban
+    """)
+    return [tuple(r) for r in tahun], [tuple(r) for r in jawaban]
+
+
+async def assert_statistik_consistent(conn) -> None:
+    """Snapshot statistik yang diperbarui inkremental harus sama dengan hasil hitung ulang."""
+    import statistik
+
+    incremental = await statistik_rows(conn)
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        await statistik._rebuild(conn)
+        rebuilt = await statistik_rows(conn)
+    finally:
+        await transaction.rollback()
+    assert incremental == rebuilt
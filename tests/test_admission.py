@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import admission
+from conftest import requires_db
+from settings import AdmissionSettings
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def limiters():
+    configured = admission.configure(AdmissionSettings(limits={"public": (1, 0.2, 1, 0.0)}))
+    try:
+        yield configured
+    finally:
+        admission.configure(AdmissionSettings(enabled=False))
+
+
+def _app(gate: asyncio.Event):
+    async def slow(request):
+        await gate.wait()
+        return JSONResponse({"ok": True})
+
+    async def stream(request):
+        async def body():
+            yield b"a"
+            await gate.wait()
+            yield b"b"
+        return StreamingResponse(body())
+
+    async def boom(request):
+        raise RuntimeError("gagal")
+
+    def classify(method, path):
+        return None if path.startswith("/health") else admission.PUBLIC
+
+    app = Starlette(routes=[Route("/slow", slow), Route("/stream", stream), Route("/boom", boom),
+                            Route("/health", slow)])
+    return admission.AdmissionMiddleware(app, classify=classify)
+
+
+@pytest.fixture
+def gate():
+    return asyncio.Event()
+
+
+@pytest.fixture
+async def client(limiters, gate):
+    transport = httpx.ASGITransport(app=_app(gate), raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://admission.test") as http:
+        yield http
+
+
+async def _until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("kondisi tidak tercapai")
+
+
+async def test_excess_requests_queue_then_get_shed(client, limiters, gate):
+    limiter = limiters["public"]
+    first = asyncio.create_task(client.get("/slow"))
+    await _until(lambda: limiter.active == 1)
+    queued = asyncio.create_task(client.get("/slow"))
+    await _until(lambda: limiter.waiting == 1)
+
+    # Antrean penuh: ditolak langsung dengan Retry-After
+    shed = await client.get("/slow")
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+
+    gate.set()
+    assert (await first).status_code == 200
+    assert (await queued).status_code == 200
+    assert (limiter.active, limiter.waiting, limiter.admitted, limiter.shed) == (0, 0, 2, 1)
+
+
+async def test_queue_timeout_sheds(client, limiters):
+    limiter = limiters["public"]
+    first = asyncio.create_task(client.get("/slow"))
+    await _until(lambda: limiter.active == 1)
+    timed_out = await client.get("/slow")
+    assert timed_out.status_code == 503
+    assert limiter.shed == 1
+    first.cancel()
+
+
+async def test_unlimited_routes_skip_admission(client, limiters, gate):
+    limiter = limiters["public"]
+    first = asyncio.create_task(client.get("/slow"))
+    await _until(lambda: limiter.active == 1)
+    health = asyncio.create_task(client.get("/health"))
+    gate.set()
+    assert (await health).status_code == 200
+    assert (await first).status_code == 200
+    assert limiter.admitted == 1
+
+
+async def test_slot_is_held_until_stream_ends_and_released_on_error(client, limiters, gate):
+    limiter = limiters["public"]
+    streaming = asyncio.create_task(client.get("/stream"))
+    await _until(lambda: limiter.active == 1)
+    gate.set()
+    assert (await streaming).content == b"ab"
+    assert limiter.active == 0
+
+    assert (await client.get("/boom")).status_code == 500
+    assert limiter.active == 0
+
+
+def test_route_classes():
+    import main
+
+    assert main._route_class("GET", "/health/ready") is None
+    assert main._route_class("POST", "/questionnaire/submit") == admission.SUBMIT
+    assert main._route_class("GET", "/tracer/all") == admission.ADMIN
+    assert main._route_class("DELETE", "/alumni/abc") == admission.ADMIN
+    assert main._route_class("GET", "/referensi/status") == admission.PUBLIC
+
+
+@requires_db
+async def test_statement_timeout_cancels_query_with_503(seeded):
+    import db
+
+    await db.init_pool(seeded)
+    limiter = admission.Limiter("admin", concurrency=1, queue_timeout=1.0, max_queue=1, statement_timeout=0.1)
+    token = db.current_budget.set(limiter)
+    try:
+        async with db.get_db() as conn:
+            with pytest.raises(HTTPException) as error:
+                await conn.fetchval("SELECT pg_sleep(2)")
+            assert error.value.status_code == 503
+            # Cancel request sudah dikirim; koneksi tetap bisa dipakai
+            assert await conn.fetchval("SELECT 1") == 1
+    finally:
+        db.current_budget.reset(token)
+        await db.close_pool()
+    assert limiter.timed_out == 1
@@ -0,0 +1,76 @@
+import io
+import json
+
+import pytest
+
+import alumni_import
+from conftest import assert_statistik_consistent, requires_db
+
+pytestmark = pytest.mark.anyio
+
+TAHUN_LULUS = 2090
+HEADER = "nisn;nis;nik;nama_siswa;tanggal_lahir;tahun_lulus\n"
+
+
+def _row(nisn: str, nama: str = "Siswa Impor", tanggal_lahir: str = "2005-01-02") -> str:
+    return f"{nisn};{nisn};{nisn.zfill(16)};{nama};{tanggal_lahir};{TAHUN_LULUS}\n"
+
+
+def test_parse_upload_stops_at_max_rows():
+    csv_bytes = (HEADER + _row("9000000001") + _row("9000000002")).encode()
+    with pytest.raises(alumni_import.BulkImportError):
+        alumni_import.parse_upload(io.BytesIO(csv_bytes), "csv", max_rows=1)
+
+
+@pytest.fixture
+async def cohort(conn):
+    """Angkatan ``TAHUN_LULUS`` dihapus lagi (beserta snapshot statistiknya) setelah test."""
+    import statistik
+
+    try:
+        yield TAHUN_LULUS
+    finally:
+        async with conn.transaction():
+            await conn.execute("DELETE FROM alumni WHERE tahun_lulus = $1", TAHUN_LULUS)
+            await statistik._rebuild(conn)
+
+
+@requires_db
+async def test_csv_import_reports_each_row(client, conn, admin, cohort):
+    existing = await conn.fetchval("SELECT nisn FROM alumni ORDER BY nisn LIMIT 1")
+    body = "\ufeff" + HEADER + _row("9000000001") + "\n" + _row("9000000002", "Siswa Dua") \
+        + _row("9000000001", "Siswa Ganda") + _row("9000000003", tanggal_lahir="bukan-tanggal") + _row(existing)
+    response = await client.post("/alumni/bulk", files={"file": ("angkatan.csv", body.encode(), "text/csv")})
+    assert response.status_code == 200, response.text
+
+    result = response.json()
+    assert result["summary"] == {"total": 5, "inserted": 2, "duplicate": 2, "invalid": 1}
+    statuses = [(row["row"], row["nisn"], row["status"]) for row in result["rows"]]
+    # Baris kosong dilewati tapi nomor baris tetap mengikuti file
+    assert statuses == [(1, "9000000001", "inserted"), (3, "9000000002", "inserted"),
+                        (4, "9000000001", "duplicate"), (5, "9000000003", "invalid"), (6, existing, "duplicate")]
+    assert result["rows"][2]["errors"] == ["NISN muncul lebih dari sekali di file."]
+    assert result["rows"][4]["errors"] == ["NISN sudah terdaftar."]
+
+    imported = await conn.fetch("""
+        SELECT a.id_alumni::text, a.nama_siswa, t.is_filled FROM alumni a JOIN tracer t USING (id_alumni)
+        WHERE a.tahun_lulus = $1 ORDER BY a.nisn
+    """, cohort)
+    assert [(r["nama_siswa"], r["is_filled"]) for r in imported] == [("Siswa Impor", False), ("Siswa Dua", False)]
+    assert imported[0]["id_alumni"] == result["rows"][0]["id_alumni"]
+    await assert_statistik_consistent(conn)
+
+
+@requires_db
+async def test_jsonl_import_is_detected_from_file_name(client, conn, admin, cohort):
+    lines = [
+        json.dumps({"nisn": "9000000011", "nis": "11", "nik": "11", "nama_siswa": "Siswa JSON",
+                    "tanggal_lahir": "2005-03-04", "tahun_lulus": cohort}),
+        "{bukan json",
+    ]
+    response = await client.post("/alumni/bulk", files={"file": ("angkatan.jsonl", "\n".join(lines).encode(),
+                                                                 "application/octet-stream")})
+    assert response.status_code == 200, response.text
+    assert [row["status"] for row in response.json()["rows"]] == ["inserted", "invalid"]
+    assert await conn.fetchval("SELECT count(*) FROM alumni WHERE tahun_lulus = $1", cohort) == 1
+    await assert_statistik_consistent(conn)
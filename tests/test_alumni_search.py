@@ -0,0 +1,73 @@
+import pytest
+
+import alumni_search
+from conftest import requires_db
+
+pytestmark = [pytest.mark.anyio, requires_db]
+
+
+async def _all_pages(client, limit: int = 7, **params):
+    """Seluruh halaman hasil pencarian, beserta respons halaman pertama."""
+    pages, cursor, first = [], None, None
+    while True:
+        response = await client.get("/alumni/search", params={
+            "limit": limit, **params, **({"cursor": cursor} if cursor else {})
+        })
+        assert response.status_code == 200, response.text
+        page = response.json()
+        if first is None:
+            first = page
+        else:
+            # Total hanya dihitung di halaman pertama
+            assert page["total"] is None
+        assert len(page["data"]) <= limit
+        pages.extend(page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages, first
+
+
+def _ids(items) -> list:
+    return [item["personal_data"]["id_alumni"] for item in items]
+
+
+async def _expected_ids(conn, where: str, *args) -> list:
+    rows = await conn.fetch(f"""
+        SELECT a.id_alumni::text FROM alumni a LEFT JOIN tracer t USING (id_alumni) WHERE {where}
+        ORDER BY a.tahun_lulus DESC, a.nama_siswa, a.id_alumni
+    """, *args)
+    return [r[0] for r in rows]
+
+
+@pytest.fixture
+def prefix_only(monkeypatch):
+    """Pencarian seperti di database tanpa pg_trgm."""
+    monkeypatch.setattr(alumni_search, "_trigram", False)
+
+
+async def test_filters_page_through_every_match(client, conn, admin):
+    items, first = await _all_pages(client, tahun_lulus=2016, is_filled="true")
+    expected = await _expected_ids(conn, "a.tahun_lulus = 2016 AND t.is_filled")
+    assert _ids(items) == expected
+    assert (first["total"], first["total_is_estimate"]) == (len(expected), False)
+    assert len(set(_ids(items))) == len(items)
+
+
+async def test_prefix_search_without_trigram(client, conn, admin, prefix_only):
+    items, first = await _all_pages(client, q="SISWA 1")
+    expected = await _expected_ids(conn, "lower(a.nama_siswa) LIKE 'siswa 1%'")
+    assert _ids(items) == expected and first["total"] == len(expected)
+    # Karakter wildcard LIKE di query dicari apa adanya
+    assert (await _all_pages(client, q="%1"))[0] == []
+
+
+async def test_trigram_search_finds_substrings_and_typos(client, conn, admin):
+    if not await alumni_search.trigram_enabled(conn):
+        pytest.skip("pg_trgm tidak tersedia")
+    items, first = await _all_pages(client, q="swa 12")
+    assert set(await _expected_ids(conn, "a.nama_siswa ILIKE '%swa 12%'")) <= set(_ids(items))
+    assert first["total"] == len(items)
+
+    # Salah ketik tetap menemukan nama yang mirip
+    items, _ = await _all_pages(client, q="Siswaa 123")
+    assert "Siswa 123" in {item["personal_data"]["nama_siswa"] for item in items}
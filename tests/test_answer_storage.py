@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+import answer_storage
+from conftest import assert_statistik_consistent, requires_db, submission_payload
+
+pytestmark = pytest.mark.anyio
+
+# id jauh di atas jumlah pertanyaan dan di luar rentang smallint
+SPARSE_KUESIONER = 100_000
+BIG_JAWABAN = 40_000
+
+
+def test_encode_places_answers_by_position():
+    assert answer_storage.encode([(3, 7), (1, 2)]) == [2, None, 7]
+    assert answer_storage.encode([]) is None
+    assert answer_storage.decode([2, None, 7], 3) == 7
+    assert answer_storage.decode([2, None, 7], 4) is None
+    assert answer_storage.decode(None, 1) is None
+
+
+def test_encode_rejects_invalid_position_before_allocating():
+    with pytest.raises(ValueError):
+        answer_storage.encode([(0, 1), (10 ** 12, 1)])
+
+
+@pytest.fixture
+async def compact(conn):
+    """Mode compact selama satu test, dengan pertanyaan ber-id jarang dan jawaban ber-id besar."""
+    import statistik
+
+    await conn.execute("INSERT INTO kuesioner(id_kuesioner, pertanyaan) VALUES ($1, 'Pertanyaan jarang')",
+                       SPARSE_KUESIONER)
+    await conn.execute("INSERT INTO jawaban(id_jawaban, jawaban) VALUES ($1, 'Jawaban besar')", BIG_JAWABAN)
+    await answer_storage.migrate(conn)
+    await answer_storage.is_compact(conn, fresh=True)
+    try:
+        yield
+    finally:
+        await answer_storage.revert(conn)
+        await answer_storage.is_compact(conn, fresh=True)
+        async with conn.transaction():
+            await conn.execute("DELETE FROM detail_kuesioner WHERE id_kuesioner = $1", SPARSE_KUESIONER)
+            await conn.execute("DELETE FROM statistik_jawaban WHERE id_kuesioner = $1", SPARSE_KUESIONER)
+            await conn.execute("DELETE FROM kuesioner WHERE id_kuesioner = $1", SPARSE_KUESIONER)
+            await conn.execute("DELETE FROM jawaban WHERE id_jawaban = $1", BIG_JAWABAN)
+            await statistik._rebuild(conn)
+
+
+async def _tracer_detail(client, id_alumni):
+    response = await client.get("/tracer/all", params={"format": "ndjson"})
+    assert response.status_code == 200, response.text
+    for line in response.text.splitlines():
+        item = json.loads(line)
+        if item["personal_data"]["id_alumni"] == id_alumni:
+            return item
+    raise AssertionError(f"alumni {id_alumni} tidak ada di /tracer/all")
+
+
+@requires_db
+async def test_compact_mode_uses_dense_positions(app, client, conn, compact, unfilled_alumni):
+    import main
+
+    app.dependency_overrides[main.require_admin] = lambda: None
+    id_alumni = await unfilled_alumni()
+    payload = submission_payload(id_alumni, "KERJA", kuesioner={1: 2, SPARSE_KUESIONER: BIG_JAWABAN})
+    response = await client.post("/questionnaire/submit", data={"payload": json.dumps(payload)})
+    assert response.status_code == 200, response.text
+
+    posisi = await conn.fetchval("SELECT posisi_jawaban FROM kuesioner WHERE id_kuesioner = $1", SPARSE_KUESIONER)
+    # Posisi berikutnya dari sequence, bukan id-nya
+    assert posisi == await conn.fetchval("SELECT max(posisi_jawaban) FROM kuesioner") < 100
+    jawaban = await conn.fetchval("SELECT t.jawaban FROM tracer t WHERE t.id_alumni = $1", id_alumni)
+    assert len(jawaban) == posisi
+    assert answer_storage.decode(jawaban, posisi) == BIG_JAWABAN
+
+    rows = await conn.fetch("""
+        SELECT dk.id_kuesioner, dk.id_jawaban FROM detail_kuesioner dk JOIN tracer t USING (id_tracer)
+        WHERE t.id_alumni = $1 ORDER BY dk.id_kuesioner
+    """, id_alumni)
+    assert [tuple(r) for r in rows] == [(1, 2), (SPARSE_KUESIONER, BIG_JAWABAN)]
+
+    answers = {q["questionnaire"]: q["answer"] for q in (await _tracer_detail(client, id_alumni))["questionnaire_data"]}
+    assert answers["Pertanyaan kuesioner nomor 1"] == "Bagus"
+    assert answers["Pertanyaan jarang"] == "Jawaban besar"
+    assert answers["Pertanyaan kuesioner nomor 2"] is None
+    await assert_statistik_consistent(conn)
+
+    # Submit ulang hanya menggeser statistik jawaban yang berubah
+    payload["kuesioner"] = {1: 3, SPARSE_KUESIONER: BIG_JAWABAN}
+    response = await client.post("/questionnaire/submit", data={"payload": json.dumps(payload)})
+    assert response.status_code == 200, response.text
+    await assert_statistik_consistent(conn)
+
+
+@requires_db
+async def test_revert_restores_rows_for_sparse_ids(conn, compact, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    id_tracer = await conn.fetchval("SELECT id_tracer FROM tracer WHERE id_alumni = $1", id_alumni)
+    # Tulisan lewat view kompatibilitas diterjemahkan ke posisi
+    await conn.execute("INSERT INTO detail_kuesioner(id_tracer, id_kuesioner, id_jawaban) VALUES ($1, $2, $3)",
+                       id_tracer, SPARSE_KUESIONER, BIG_JAWABAN)
+    jawaban = await conn.fetchval("SELECT jawaban FROM tracer WHERE id_tracer = $1", id_tracer)
+    assert len(jawaban) == await conn.fetchval("SELECT posisi_jawaban FROM kuesioner WHERE id_kuesioner = $1",
+                                               SPARSE_KUESIONER)
+
+    await answer_storage.revert(conn)
+    await answer_storage.is_compact(conn, fresh=True)
+    rows = await conn.fetch("SELECT id_kuesioner, id_jawaban FROM detail_kuesioner WHERE id_tracer = $1", id_tracer)
+    assert [tuple(r) for r in rows] == [(SPARSE_KUESIONER, BIG_JAWABAN)]
@@ -0,0 +1,46 @@
+import pytest
+
+import auth
+from conftest import requires_db
+from settings import AuthSettings
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def configured():
+    auth.configure(AuthSettings(secret_key="test-jwt-secret", bcrypt_rounds=4))
+    try:
+        yield
+    finally:
+        auth.configure()
+
+
+async def test_hash_and_verify_password(configured):
+    hashed = await auth.hash_password("rahasia")
+    assert hashed.startswith("$2b$04$")
+    assert await auth.verify_password("rahasia", hashed) == (True, None)
+    assert await auth.verify_password("salah", hashed) == (False, None)
+
+
+async def test_plaintext_password_is_rehashed_once(configured):
+    valid, new_hash = await auth.verify_password("rahasia", "rahasia")
+    assert valid and new_hash.startswith("$2b$")
+    assert await auth.verify_password("rahasia", new_hash) == (True, None)
+    assert await auth.verify_password("salah", "rahasia") == (False, None)
+
+
+@requires_db
+async def test_login_hashes_plaintext_password_and_issues_tokens(client, conn):
+    from benchmark.seed import ADMIN_PASSWORD, ADMIN_USERNAME
+
+    for _ in range(2):
+        # Login pertama meng-hash ulang password plaintext; yang kedua memverifikasi hash itu
+        response = await client.post("/login", json={"email": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+        assert response.status_code == 200, response.text
+        stored = await conn.fetchval('SELECT password FROM "user" WHERE username = $1', ADMIN_USERNAME)
+        assert stored.startswith("$2b$")
+    assert auth.decode_token(response.json()["access_token"], auth.ACCESS_TOKEN)["sub"] == ADMIN_USERNAME
+
+    response = await client.post("/login", json={"email": ADMIN_USERNAME, "password": "salah"})
+    assert response.status_code == 401
@@ -0,0 +1,94 @@
+import asyncio
+import dataclasses
+
+import pytest
+
+from cache import JsonBody, ReferenceCache
+from conftest import requires_db
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_misses_load_once():
+    cache = ReferenceCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return JsonBody.from_data([1])
+
+    entries = await asyncio.gather(*(cache.get("status", loader) for _ in range(10)))
+    assert len(calls) == 1 and len({id(e) for e in entries}) == 1
+    assert (cache.hits, cache.misses) == (9, 1)
+
+
+async def test_result_loaded_during_invalidation_is_not_stored():
+    cache = ReferenceCache()
+
+    async def loader():
+        cache.invalidate("status")
+        return JsonBody.from_data([1])
+
+    await cache.get("status", loader)
+    assert cache.keys() == []
+
+
+@pytest.fixture
+async def extra_status(conn):
+    """Baris status tambahan yang dihapus lagi setelah test."""
+    try:
+        yield "UJI"
+    finally:
+        await conn.execute("DELETE FROM status WHERE kode_status = 'UJI'")
+
+
+@requires_db
+async def test_etag_304_and_admin_invalidation(client, conn, admin, extra_status):
+    first = await client.get("/referensi/status")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("public, max-age=")
+
+    for if_none_match in (etag, f"W/{etag}", f'"lain", {etag}'):
+        not_modified = await client.get("/referensi/status", headers={"If-None-Match": if_none_match})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b"" and not_modified.headers["etag"] == etag
+
+    # Perubahan tabel belum terlihat sampai cache diinvalidasi
+    await conn.execute("INSERT INTO status VALUES ($1, 'Status uji')", extra_status)
+    assert (await client.get("/referensi/status")).content == first.content
+
+    response = await client.post("/referensi/cache/invalidate", params={"key": "status"})
+    assert response.status_code == 200
+    changed = await client.get("/referensi/status", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert {"kode_status": extra_status, "status": "Status uji"} in changed.json()
+
+
+@requires_db
+async def test_notify_from_another_worker_invalidates(app_settings, conn, extra_status):
+    import httpx
+
+    import main
+
+    application = main.create_app(dataclasses.replace(app_settings, referensi_cache_listen=True))
+    async with application.router.lifespan_context(application), httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=application), base_url="http://api.test") as client:
+        # Listener mengosongkan cache saat tersambung, jadi tunggu LISTEN-nya aktif dulu
+        for _ in range(200):
+            if await conn.fetchval("SELECT count(*) FROM pg_stat_activity WHERE query LIKE 'LISTEN %'"):
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        await client.get("/referensi/status")
+        assert "status" in main.reference_cache.keys()
+
+        await conn.execute("INSERT INTO status VALUES ($1, 'Status uji')", extra_status)
+        await conn.execute("SELECT pg_notify($1, 'status')", app_settings.referensi_cache_channel)
+        for _ in range(200):
+            if "status" not in main.reference_cache.keys():
+                break
+            await asyncio.sleep(0.01)
+        assert "status" not in main.reference_cache.keys()
+        assert {"kode_status": extra_status, "status": "Status uji"} in (await client.get("/referensi/status")).json()
@@ -0,0 +1,60 @@
+import pytest
+
+import db
+import profiling
+from conftest import requires_db
+
+pytestmark = [pytest.mark.anyio, requires_db]
+
+
+@pytest.fixture
+async def pool(seeded, monkeypatch):
+    # Setiap koneksi dianggap basi, jadi health check SELECT 1 selalu berjalan
+    monkeypatch.setenv("DB_POOL_HEALTHCHECK_IDLE", "0.000001")
+    monkeypatch.setenv("DB_POOL_MIN_SIZE", "1")
+    await db.init_pool(seeded)
+    try:
+        yield db.get_pool()
+    finally:
+        await db.close_pool()
+
+
+@pytest.fixture
+def observed():
+    durations = []
+    db.set_query_observer(durations.append)
+    try:
+        yield durations
+    finally:
+        db.set_query_observer(None)
+
+
+async def test_only_caller_queries_are_observed(pool, observed):
+    for _ in range(3):
+        async with db.get_db() as conn:
+            assert await conn.fetchval("SELECT 1") == 1
+    # Health check sebelum dipakai dan reset saat dikembalikan ke pool tidak ikut terhitung
+    assert len(observed) == 3
+
+
+async def test_reset_inside_transaction_is_not_profiled(pool, observed):
+    profile = profiling.Profile("GET", "/test", sampled=False)
+    token = profiling.current.set(profile)
+    try:
+        async with db.get_db() as conn:
+            await conn.execute("CREATE TEMP TABLE IF NOT EXISTS t_reset (x int)")
+    finally:
+        profiling.current.reset(token)
+    assert [q["sql"] for q in profile.queries] == ["CREATE TEMP TABLE IF NOT EXISTS t_reset (x int)"]
+    assert len(observed) == 1
+
+
+async def test_slow_query_hook_ignores_internal_queries(pool):
+    seen = []
+    db.set_slow_query_hook(0.0, lambda sql, params, elapsed: seen.append(sql))
+    try:
+        async with db.get_db() as conn:
+            await conn.fetchval("SELECT $1::int", 7)
+    finally:
+        db.set_slow_query_hook(0.0, None)
+    assert seen == ["SELECT $1::int"]
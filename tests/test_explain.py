@@ -0,0 +1,15 @@
+import pytest
+
+import main
+from benchmark import explain
+from conftest import requires_db
+
+pytestmark = [pytest.mark.anyio, requires_db]
+
+
+async def test_hot_queries_have_no_sequential_scans(conn):
+    # Data test terlalu kecil untuk planner; tanpa seq scan, yang tersisa hanya
+    # seq scan yang tidak punya alternatif indeks
+    await conn.execute("SET enable_seqscan = off")
+    results = await explain.check(conn, main, min_rows=0)
+    assert [r for r in results if not r["ok"]] == []
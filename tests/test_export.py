@@ -0,0 +1,71 @@
+import codecs
+import csv
+import glob
+import io
+import re
+import tempfile
+import zipfile
+
+import pytest
+
+from conftest import requires_db
+
+pytestmark = [pytest.mark.anyio, requires_db]
+
+TAHUN_LULUS = 2017
+
+
+async def _expected_row(conn):
+    """Alumni pertama angkatan ``TAHUN_LULUS`` yang sudah mengisi, beserta jawabannya per pertanyaan."""
+    alumni = await conn.fetchrow("""
+        SELECT a.id_alumni::text, a.nama_siswa, s.status, t.id_tracer
+        FROM alumni a JOIN tracer t USING (id_alumni) JOIN status s USING (kode_status)
+        WHERE a.tahun_lulus = $1 AND t.is_filled
+        ORDER BY a.nama_siswa, a.id_alumni LIMIT 1
+    """, TAHUN_LULUS)
+    answers = dict(await conn.fetch("""
+        SELECT k.pertanyaan, j.jawaban FROM detail_kuesioner dk
+        JOIN kuesioner k USING (id_kuesioner) JOIN jawaban j USING (id_jawaban)
+        WHERE dk.id_tracer = $1
+    """, alumni["id_tracer"]))
+    return alumni, answers
+
+
+async def test_csv_export_has_one_row_per_alumni_and_one_column_per_question(client, conn, admin):
+    response = await client.get("/tracer/export", params={"format": "csv", "tahun_lulus": TAHUN_LULUS})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert f'filename="tracer-study-{TAHUN_LULUS}.csv"' in response.headers["content-disposition"]
+    assert response.content.startswith(codecs.BOM_UTF8)
+
+    rows = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert len(rows) == await conn.fetchval("SELECT count(*) FROM alumni WHERE tahun_lulus = $1", TAHUN_LULUS)
+    assert {row["tahun_lulus"] for row in rows} == {str(TAHUN_LULUS)}
+    questions = [r[0] for r in await conn.fetch("SELECT pertanyaan FROM kuesioner ORDER BY id_kuesioner")]
+    assert list(rows[0])[-len(questions):] == questions
+
+    alumni, answers = await _expected_row(conn)
+    row = next(r for r in rows if r["id_alumni"] == alumni["id_alumni"])
+    assert (row["nama_siswa"], row["status"], row["is_filled"]) == (alumni["nama_siswa"], alumni["status"], "t")
+    assert {q: row[q] for q in answers} == answers
+
+
+async def test_xlsx_export_writes_the_same_rows_and_removes_the_file(client, conn, admin):
+    before = set(glob.glob(f"{tempfile.gettempdir()}/tracer-export-*.xlsx"))
+    response = await client.get("/tracer/export", params={"format": "xlsx", "tahun_lulus": TAHUN_LULUS})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/vnd.openxmlformats")
+    assert set(glob.glob(f"{tempfile.gettempdir()}/tracer-export-*.xlsx")) == before
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as workbook:
+        sheet = workbook.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    total = await conn.fetchval("SELECT count(*) FROM alumni WHERE tahun_lulus = $1", TAHUN_LULUS)
+    # Baris header ditambah satu baris per alumni
+    assert len(re.findall(r"<row ", sheet)) == total + 1
+    alumni, answers = await _expected_row(conn)
+    assert alumni["id_alumni"] in sheet and alumni["nama_siswa"] in sheet
+    assert all(answer in sheet for answer in answers.values())
+
+
+async def test_export_rejects_unknown_format(client, admin):
+    assert (await client.get("/tracer/export", params={"format": "pdf"})).status_code == 422
@@ -0,0 +1,121 @@
+import base64
+import dataclasses
+import json
+import os
+import uuid
+
+import pytest
+
+from conftest import STORAGE_DIR, assert_statistik_consistent, requires_db, submission_payload
+
+pytestmark = [pytest.mark.anyio, requires_db]
+
+DELETE_TAHUN_LULUS = 2091
+PDF = b"%PDF-1.4\n" + b"x" * 1000
+
+
+@pytest.fixture
+def app_settings(app_settings):
+    # Batch kecil agar penghapusan massal berjalan lebih dari satu batch
+    return dataclasses.replace(app_settings, alumni_delete_batch_size=2)
+
+
+def _cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("path", ["/tracer/all", "/alumni/search"])
+@pytest.mark.parametrize("cursor", [_cursor([2020, "Nama", "bukan-uuid"]), _cursor([2020, "Nama"]), "%%%"])
+async def test_invalid_cursor_is_rejected(client, admin, path, cursor):
+    response = await client.get(path, params={"cursor": cursor, "limit": 5})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor tidak valid."
+
+
+async def test_tracer_all_pages_cover_the_stream(client, conn, admin):
+    streamed = (await client.get("/tracer/all")).json()
+    ndjson = await client.get("/tracer/all", params={"format": "ndjson"})
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == streamed
+    assert len(streamed) == await conn.fetchval("SELECT count(*) FROM alumni")
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 97, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/tracer/all", params=params)).json()
+        assert len(page["data"]) <= 97
+        pages.extend(page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == streamed
+    years = [item["personal_data"]["tahun_lulus"] for item in streamed]
+    assert years == sorted(years, reverse=True)
+
+    # Halaman NDJSON membawa cursor berikutnya di header
+    first_page = await client.get("/tracer/all", params={"limit": 5, "format": "ndjson"})
+    assert [json.loads(line) for line in first_page.text.splitlines()] == streamed[:5]
+    second = await client.get("/tracer/all", params={"limit": 5, "cursor": first_page.headers["x-next-cursor"]})
+    assert second.json()["data"] == streamed[5:10]
+
+
+@pytest.fixture
+async def cohort(client, conn, admin):
+    """Tiga alumni angkatan ``DELETE_TAHUN_LULUS``, dua di antaranya dengan bukti kuliah."""
+    import statistik
+
+    rows = "".join(f"90000001{i:02d},{i},{i},Siswa Hapus {i},2005-01-01,{DELETE_TAHUN_LULUS}\n" for i in range(3))
+    response = await client.post("/alumni/bulk", files={
+        "file": ("angkatan.csv", ("nisn,nis,nik,nama_siswa,tanggal_lahir,tahun_lulus\n" + rows).encode(), "text/csv"),
+    })
+    assert response.json()["summary"]["inserted"] == 3, response.text
+    ids = [row["id_alumni"] for row in response.json()["rows"]]
+    for id_alumni in ids[:2]:
+        response = await client.post("/questionnaire/submit",
+                                     data={"payload": json.dumps(submission_payload(id_alumni, "PEND"))},
+                                     files={"bukti_kuliah": ("b.pdf", PDF, "application/pdf")})
+        assert response.status_code == 200, response.text
+    try:
+        yield ids
+    finally:
+        async with conn.transaction():
+            await conn.execute("DELETE FROM alumni WHERE tahun_lulus = $1", DELETE_TAHUN_LULUS)
+            await statistik._rebuild(conn)
+
+
+def _bukti_exists(id_alumni: str) -> bool:
+    return os.path.exists(os.path.join(STORAGE_DIR, f"bukti-kuliah-{id_alumni}.pdf"))
+
+
+async def test_delete_cohort_in_batches_and_purge_files(client, conn, cohort):
+    assert all(_bukti_exists(id_alumni) for id_alumni in cohort[:2])
+
+    response = await client.delete("/alumni", params={"tahun_lulus": DELETE_TAHUN_LULUS})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["deleted"], result["batches"], result["files_queued"]) == (3, 2, 2)
+
+    assert await conn.fetchval("SELECT count(*) FROM alumni WHERE tahun_lulus = $1", DELETE_TAHUN_LULUS) == 0
+    assert await conn.fetchval("SELECT count(*) FROM tracer WHERE id_alumni = ANY($1::uuid[])", cohort) == 0
+    # File dihapus oleh background task setelah respons
+    assert not any(_bukti_exists(id_alumni) for id_alumni in cohort)
+    await assert_statistik_consistent(conn)
+
+
+async def test_delete_by_id_list_reports_missing_ids(client, conn, cohort):
+    missing = str(uuid.uuid4())
+    response = await client.request("DELETE", "/alumni", json={"id_alumni": [cohort[0], cohort[2], cohort[0], missing]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["deleted"], result["not_found"], result["files_queued"]) == (2, 1, 1)
+    assert not _bukti_exists(cohort[0]) and _bukti_exists(cohort[1])
+    remaining = await conn.fetch("SELECT id_alumni::text FROM alumni WHERE tahun_lulus = $1", DELETE_TAHUN_LULUS)
+    assert [r[0] for r in remaining] == [cohort[1]]
+    await assert_statistik_consistent(conn)
+
+
+async def test_delete_requires_exactly_one_selector(client, admin):
+    assert (await client.delete("/alumni")).status_code == 400
+    response = await client.request("DELETE", "/alumni", params={"tahun_lulus": DELETE_TAHUN_LULUS},
+                                    json={"id_alumni": [str(uuid.uuid4())]})
+    assert response.status_code == 400
@@ -0,0 +1,123 @@
+import asyncio
+import shutil
+
+import asyncpg
+import pytest
+
+import migrate
+import statistik
+from conftest import assert_statistik_consistent, requires_db
+
+pytestmark = pytest.mark.anyio
+
+TRANSACTIONAL = """
+CREATE TABLE migrate_test (id int PRIMARY KEY, nilai int);
+"""
+
+CONCURRENT = """-- migrate: no-transaction
+-- Indeks dibangun tanpa transaksi
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS migrate_test_nilai_idx ON migrate_test (nilai);
+
+-- migrate: if false
+CREATE INDEX CONCURRENTLY IF NOT EXISTS migrate_test_dilewati_idx ON migrate_test (nilai);
+"""
+
+
+def test_split_statements_keeps_dollar_quoted_bodies_and_conditions():
+    sql = """-- migrate: no-transaction
+-- komentar
+
+DO $$
+BEGIN
+    PERFORM 1;
+END
+$$;
+
+-- migrate: if EXISTS (SELECT 1)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS a_idx ON a (x);
+ANALYZE a;
+"""
+    statements = migrate.split_statements(sql)
+    assert [condition for condition, _ in statements] == [None, "EXISTS (SELECT 1)", None]
+    assert statements[0][1].startswith("DO $$") and statements[0][1].endswith("$$;")
+    assert statements[2][1] == "ANALYZE a;"
+
+
+@pytest.fixture
+async def scratch(conn):
+    """Menghapus jejak migrasi uji (versi 99xx) sebelum dan sesudah test."""
+    async def clean():
+        await conn.execute("DELETE FROM schema_migrations WHERE version LIKE '99%'")
+        await conn.execute("DROP TABLE IF EXISTS migrate_test")
+    await clean()
+    yield
+    await clean()
+
+
+@requires_db
+async def test_repo_migrations_are_applied_once_and_indexes_are_valid(conn):
+    assert await migrate.migrate(conn) == []
+    recorded = {row[0] for row in await conn.fetch("SELECT version FROM schema_migrations")}
+    assert {m.version for m in migrate.discover()} <= recorded
+    invalid = await conn.fetch("SELECT indexrelid::regclass::text FROM pg_index WHERE NOT indisvalid")
+    assert invalid == []
+
+
+@requires_db
+async def test_concurrent_workers_apply_each_migration_once(seeded, conn, scratch, tmp_path):
+    (tmp_path / "9901_tabel.sql").write_text(TRANSACTIONAL)
+    (tmp_path / "9902_indeks.sql").write_text(CONCURRENT)
+
+    async def worker():
+        worker_conn = await asyncpg.connect(seeded)
+        try:
+            return await migrate.migrate(worker_conn, str(tmp_path))
+        finally:
+            await worker_conn.close()
+
+    results = await asyncio.gather(worker(), worker(), worker())
+    assert sorted(v for applied in results for v in applied) == ["9901", "9902"]
+    assert await conn.fetchval("SELECT to_regclass('migrate_test_nilai_idx') IS NOT NULL")
+    assert await conn.fetchval("SELECT to_regclass('migrate_test_dilewati_idx') IS NULL")
+
+
+@requires_db
+async def test_invalid_index_left_by_failed_build_is_rebuilt(conn, scratch, tmp_path):
+    await conn.execute(TRANSACTIONAL)
+    await conn.execute("INSERT INTO migrate_test VALUES (1, 1), (2, 1)")
+    (tmp_path / "9903_unik.sql").write_text(
+        "-- migrate: no-transaction\nCREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS migrate_test_nilai_key ON migrate_test (nilai);\n")
+    with pytest.raises(asyncpg.UniqueViolationError):
+        await migrate.migrate(conn, str(tmp_path))
+    assert await conn.fetchval("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = 'migrate_test_nilai_key'::regclass")
+
+    await conn.execute("UPDATE migrate_test SET nilai = 2 WHERE id = 2")
+    assert await migrate.migrate(conn, str(tmp_path)) == ["9903"]
+    assert await conn.fetchval("SELECT indisvalid FROM pg_index WHERE indexrelid = 'migrate_test_nilai_key'::regclass")
+
+
+@requires_db
+async def test_duplicate_tracer_rows_keep_the_newest(conn, scratch, tmp_path):
+    shutil.copy(f"{migrate.MIGRATIONS_DIR}/0002_tracer_indexes.sql", tmp_path / "9904_tracer_indexes.sql")
+    id_alumni, old_tracer = await conn.fetchrow("""
+        SELECT id_alumni, id_tracer FROM tracer t
+        WHERE EXISTS (SELECT 1 FROM detail_kuesioner d WHERE d.id_tracer = t.id_tracer)
+        ORDER BY id_tracer LIMIT 1
+    """)
+    await conn.execute("DROP INDEX tracer_id_alumni_key")
+    new_tracer = await conn.fetchval("""
+        INSERT INTO tracer(id_alumni, kode_status, is_filled, fill_date)
+        VALUES ($1, 'KERJA', TRUE, CURRENT_DATE) RETURNING id_tracer
+    """, id_alumni)
+    await conn.execute("INSERT INTO detail_kuesioner(id_tracer, id_kuesioner, id_jawaban) VALUES ($1, 1, 2)", new_tracer)
+
+    assert await migrate.migrate(conn, str(tmp_path)) == ["9904"]
+
+    assert await conn.fetchval("SELECT array_agg(id_tracer) FROM tracer WHERE id_alumni = $1", id_alumni) == [new_tracer]
+    assert await conn.fetchval("SELECT COUNT(*) FROM detail_kuesioner WHERE id_tracer = $1", old_tracer) == 0
+    assert await conn.fetchval("SELECT indisvalid AND indisunique FROM pg_index WHERE indexrelid = 'tracer_id_alumni_key'::regclass")
+    # Snapshot statistik dihapus oleh migrasi dan dibangun ulang saat startup
+    assert await conn.fetchval("SELECT to_regclass('statistik_tahun') IS NULL")
+    await statistik.ensure_schema(conn)
+    await assert_statistik_consistent(conn)
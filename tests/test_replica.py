@@ -0,0 +1,57 @@
+import pytest
+from fastapi import HTTPException
+
+import db
+from conftest import TEST_READ_DSN, requires_replica
+
+pytestmark = [pytest.mark.anyio, requires_replica]
+
+IN_RECOVERY = "SELECT pg_is_in_recovery()"
+
+
+@pytest.fixture
+async def pools(seeded, monkeypatch):
+    # Lag diperiksa di setiap peminjaman
+    monkeypatch.setenv("DB_REPLICA_CHECK_INTERVAL", "0")
+    monkeypatch.setenv("DB_POOL_MIN_SIZE", "1")
+    await db.init_pool(seeded, [TEST_READ_DSN])
+    try:
+        yield db._replicas[0]
+    finally:
+        await db.close_pool()
+
+
+async def test_reads_go_to_the_replica_and_writes_to_the_primary(pools):
+    async with db.get_db(readonly=True) as conn:
+        assert await conn.fetchval(IN_RECOVERY) is True
+    async with db.get_db() as conn:
+        assert await conn.fetchval(IN_RECOVERY) is False
+    assert pools.reads == 1
+
+
+async def test_pinned_reads_stay_on_the_primary(pools):
+    db.pin_primary("alumni-x")
+    async with db.get_db(readonly=True, sticky="alumni-x") as conn:
+        assert await conn.fetchval(IN_RECOVERY) is False
+    async with db.get_db(readonly=True, sticky="alumni-y") as conn:
+        assert await conn.fetchval(IN_RECOVERY) is True
+
+
+async def test_lagging_replica_falls_back_to_the_primary(pools, monkeypatch):
+    monkeypatch.setattr(db, "_replica_max_lag", -1.0)
+    async with db.get_db(readonly=True) as conn:
+        assert await conn.fetchval(IN_RECOVERY) is False
+    assert pools.last_error.startswith("lag")
+    assert pools.pool.get_idle_size() == pools.pool.get_size()
+
+
+async def test_failed_lag_check_returns_the_replica_connection(pools, monkeypatch):
+    async def rejected(conn):
+        raise HTTPException(status_code=503)
+
+    monkeypatch.setattr(pools, "check_lag", rejected)
+    for _ in range(3):
+        with pytest.raises(HTTPException):
+            async with db.get_db(readonly=True):
+                pass
+    assert pools.pool.get_idle_size() == pools.pool.get_size()
@@ -0,0 +1,59 @@
+import dataclasses
+
+import pytest
+
+from settings import AdmissionSettings, AuthSettings, PoolSettings, ProfilingSettings, Settings, StorageSettings
+
+
+def _settings(**changes) -> Settings:
+    base = Settings(
+        database_url="postgresql://localhost/tracer",
+        auth=AuthSettings(secret_key="rahasia"),
+        storage=StorageSettings(backend="local", local_signing_key="kunci"),
+    )
+    return dataclasses.replace(base, **changes)
+
+
+def test_require_rejects_missing_shared_keys():
+    _settings().require()
+    with pytest.raises(RuntimeError, match="JWT_SECRET_KEY"):
+        _settings(auth=AuthSettings()).require()
+    with pytest.raises(RuntimeError, match="STORAGE_LOCAL_SIGNING_KEY"):
+        _settings(storage=StorageSettings(backend="local")).require()
+    # Backend Supabase tidak memakai kunci URL upload lokal
+    _settings(storage=StorageSettings(backend="supabase")).require()
+
+
+def test_from_env_reads_module_settings(monkeypatch):
+    monkeypatch.setenv("DB_POOL_MAX_SIZE", "7")
+    monkeypatch.setenv("ADMISSION_ADMIN_CONCURRENCY", "3")
+    monkeypatch.setenv("STORAGE_QUEUE_TIMEOUT", "2.5")
+    monkeypatch.setenv("PROFILE_KEEP", "9")
+    settings = Settings.from_env(env_file=False)
+    assert settings.pool.max_size == 7
+    assert settings.admission.limits["admin"][0] == 3
+    assert settings.storage.queue_timeout == 2.5
+    assert settings.profiling.keep == 9
+
+
+def test_create_app_applies_settings_to_every_module(tmp_path):
+    import admission
+    import auth
+    import main
+    import profiling
+
+    settings = _settings(
+        auth=AuthSettings(secret_key="rahasia-app", access_token_expire_minutes=1),
+        admission=AdmissionSettings(limits={"public": (3, 1.0, 4, 2.0)}),
+        storage=StorageSettings(backend="local", local_dir=str(tmp_path), local_signing_key="kunci-app",
+                                max_concurrency=1),
+        profiling=ProfilingSettings(keep=5),
+        pool=PoolSettings(max_size=3),
+    )
+    app = main.create_app(settings)
+    assert app.state.settings is settings
+    assert auth.get_settings().secret_key == "rahasia-app"
+    assert auth.get_settings().access_ttl == 60
+    assert [(l.name, l.concurrency) for l in admission.limiters()] == [("public", 3)]
+    assert main.storage.root == str(tmp_path)
+    assert profiling._recent.maxlen == 5
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from conftest import requires_db
+from slow_queries import SlowQueryLog, _is_read_only
+
+pytestmark = pytest.mark.anyio
+
+
+def test_only_reads_are_read_only():
+    assert _is_read_only("SELECT * FROM alumni WHERE nisn = $1")
+    assert _is_read_only("  with x AS (SELECT 1) SELECT * FROM x")
+    assert not _is_read_only("UPDATE tracer SET is_filled = TRUE WHERE id_alumni = $1")
+    assert not _is_read_only("WITH d AS (DELETE FROM tracer RETURNING id_tracer) SELECT COUNT(*) FROM d")
+    assert not _is_read_only("SELECT id_tracer FROM tracer WHERE id_alumni = $1 FOR UPDATE")
+    assert not _is_read_only("INSERT INTO submission_applied VALUES ($1)")
+
+
+@requires_db
+async def test_writes_are_explained_without_running(seeded):
+    log = SlowQueryLog(seeded, threshold=0.0, explain_interval=0.0)
+    log.start()
+    try:
+        log.observe("SELECT COUNT(*) FROM alumni WHERE tahun_lulus = $1", (2020,), 2.0)
+        log.observe("UPDATE tracer SET fill_date = CURRENT_DATE WHERE id_alumni = $1::uuid",
+                    ("00000000-0000-0000-0000-000000000000",), 2.0)
+        for _ in range(100):
+            if not any(entry["plan"] is None and entry["plan_error"] is None for entry in log.entries()):
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await log.stop()
+
+    by_sql = {entry["sql"].split()[0]: entry for entry in log.entries()}
+    assert by_sql["SELECT"]["plan_analyzed"] is True and "actual time" in by_sql["SELECT"]["plan"]
+    assert by_sql["UPDATE"]["plan_error"] is None
+    assert by_sql["UPDATE"]["plan_analyzed"] is False and "actual time" not in by_sql["UPDATE"]["plan"]
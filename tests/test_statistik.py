@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from conftest import requires_db, submission_payload
+
+pytestmark = [pytest.mark.anyio, requires_db]
+
+MEASURES = "count,responden,melanjutkan"
+
+
+async def _cube(client, **params) -> dict:
+    response = await client.get("/statistik/cube", params={"measures": MEASURES, **params})
+    assert response.status_code == 200, response.text
+    return {tuple(group["group"]): group["rows"] for group in response.json()["data"]}
+
+
+async def _snapshot(conn, tahun_dari=None, tahun_sampai=None) -> dict:
+    rows = await conn.fetch("""
+        SELECT tahun_lulus, jumlah_siswa, total_responden, jumlah_melanjutkan FROM statistik_tahun
+        WHERE jumlah_siswa > 0
+          AND ($1::int IS NULL OR tahun_lulus >= $1::int) AND ($2::int IS NULL OR tahun_lulus <= $2::int)
+    """, tahun_dari, tahun_sampai)
+    return {r["tahun_lulus"]: (r["jumlah_siswa"], r["total_responden"], r["jumlah_melanjutkan"]) for r in rows}
+
+
+def _measures(row) -> tuple:
+    return row["count"], row["responden"], row["melanjutkan"]
+
+
+async def test_cube_totals_match_the_snapshot(client, conn):
+    groups = await _cube(client, dims="tahun_lulus,status")
+    assert set(groups) == {("tahun_lulus", "status"), ("tahun_lulus",), ("status",), ()}
+
+    snapshot = await _snapshot(conn)
+    assert {row["tahun_lulus"]: _measures(row) for row in groups[("tahun_lulus",)]} == snapshot
+    [total] = groups[()]
+    assert _measures(total) == tuple(sum(values) for values in zip(*snapshot.values()))
+
+    # Setiap rollup adalah jumlah dari grup yang lebih rinci
+    for status_row in groups[("status",)]:
+        detail = [r for r in groups[("tahun_lulus", "status")] if r["status"] == status_row["status"]]
+        assert _measures(status_row) == tuple(sum(values) for values in zip(*map(_measures, detail)))
+
+
+async def test_cube_year_filter_and_detail_dimensions(client, conn):
+    groups = await _cube(client, dims="tahun_lulus,perguruan_tinggi", tahun_dari=2016, tahun_sampai=2018)
+    snapshot = await _snapshot(conn, 2016, 2018)
+    assert {row["tahun_lulus"]: _measures(row) for row in groups[("tahun_lulus",)]} == snapshot
+    # Alumni tanpa detail pendidikan masuk grup perguruan_tinggi NULL, jadi totalnya tetap utuh
+    assert sum(row["count"] for row in groups[("perguruan_tinggi",)]) == sum(v[0] for v in snapshot.values())
+
+
+async def test_cube_cache_is_invalidated_by_submit(client, conn, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    tahun = await conn.fetchval("SELECT tahun_lulus FROM alumni WHERE id_alumni = $1", id_alumni)
+    before = {row["tahun_lulus"]: _measures(row) for row in (await _cube(client))[("tahun_lulus",)]}
+
+    response = await client.post("/questionnaire/submit",
+                                 data={"payload": json.dumps(submission_payload(id_alumni, "KERJA"))})
+    assert response.status_code == 200, response.text
+    after = {row["tahun_lulus"]: _measures(row) for row in (await _cube(client))[("tahun_lulus",)]}
+    count, responden, melanjutkan = before[tahun]
+    assert after[tahun] == (count, responden + 1, melanjutkan)
+
+
+@pytest.mark.parametrize("params", [
+    {"dims": "tahun_lulus,warna"},
+    {"measures": "rata_rata"},
+    {"dims": "tahun_lulus,status,perguruan_tinggi,program_studi,sumber_biaya"},
+])
+async def test_cube_rejects_invalid_parameters(client, params):
+    assert (await client.get("/statistik/cube", params=params)).status_code == 400
@@ -0,0 +1,131 @@
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from storage import LocalStorage, ObjectTooLarge, StorageError, bukti_kuliah_path, inspect_upload, iter_upload
+
+pytestmark = pytest.mark.anyio
+
+PDF = b"%PDF-1.4\n" + b"x" * 600_000
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+@pytest.fixture
+def local(tmp_path):
+    return LocalStorage(str(tmp_path), signing_key="kunci")
+
+
+async def test_upload_streams_chunks_and_reports_created(local, tmp_path):
+    assert await local.upload("a.pdf", _chunks(b"%PDF-", b"1"), "application/pdf") is True
+    assert await local.upload("a.pdf", _chunks(b"%PDF-2"), "application/pdf") is False
+    assert (tmp_path / "a.pdf").read_bytes() == b"%PDF-2"
+
+
+async def test_write_stream_rejects_oversized_body_without_touching_old_object(local, tmp_path):
+    await local.upload("a.pdf", _chunks(b"%PDF-lama"), "application/pdf")
+    with pytest.raises(ObjectTooLarge):
+        await local.write_stream("a.pdf", _chunks(b"x" * 10, b"x" * 10), max_bytes=15)
+    assert (tmp_path / "a.pdf").read_bytes() == b"%PDF-lama"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pdf"]
+
+
+async def test_path_outside_root_is_rejected(local):
+    with pytest.raises(Exception):
+        await local.upload("../luar.pdf", _chunks(b"x"), "application/pdf")
+
+
+async def test_inspect_upload_hashes_in_chunks_and_rewinds():
+    upload = UploadFile(io.BytesIO(PDF), filename="b.pdf")
+    size, digest = await inspect_upload(upload, max_bytes=len(PDF))
+    assert size == len(PDF)
+    streamed = b"".join([chunk async for chunk in iter_upload(upload)])
+    assert streamed == PDF
+
+    import hashlib
+    assert digest == hashlib.sha256(PDF).digest()
+
+
+async def test_inspect_upload_rejects_over_limit():
+    upload = UploadFile(io.BytesIO(PDF), filename="b.pdf")
+    with pytest.raises(HTTPException) as error:
+        await inspect_upload(upload, max_bytes=len(PDF) - 1)
+    assert error.value.status_code == 413
+
+
+def test_bukti_kuliah_path():
+    assert bukti_kuliah_path("abc") == "bukti-kuliah-abc.pdf"
+
+
+class _FakeSupabase:
+    """Server Supabase Storage minimal: GET objek dengan header Range, seperti API aslinya."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.requests = []
+
+    def __call__(self, request):
+        import httpx
+
+        self.requests.append(request)
+        key = request.url.path.removeprefix("/storage/v1/object/tracer-study/")
+        if key not in self.objects:
+            return httpx.Response(400, json={"statusCode": "404", "error": "not_found", "message": "Object not found"})
+        body = self.objects[key]
+        if body is None:
+            return httpx.Response(500, json={"statusCode": "500", "error": "internal", "message": "Gagal"})
+        start, end = (int(x) for x in request.headers["range"].removeprefix("bytes=").split("-"))
+        if start >= len(body):
+            return httpx.Response(416, json={"statusCode": "416", "error": "InvalidRange", "message": "Invalid range"})
+        return httpx.Response(206, content=body[start:end + 1],
+                              headers={"Content-Range": f"bytes {start}-{min(end, len(body) - 1)}/{len(body)}"})
+
+
+@pytest.fixture
+def supabase():
+    import types
+
+    import httpx
+    from storage3 import SyncStorageClient
+
+    from storage import SupabaseStorage
+
+    server = _FakeSupabase({})
+    client = SyncStorageClient("http://supabase.test/storage/v1/", {"apikey": "kunci"},
+                               http_client=httpx.Client(transport=httpx.MockTransport(server)))
+    backend = SupabaseStorage(lambda: types.SimpleNamespace(storage=client), "tracer-study", "bukti-kuliah")
+    return backend, server
+
+
+async def test_supabase_stat_reads_size_and_type_from_content(supabase):
+    backend, server = supabase
+    server.objects.update({
+        "bukti-kuliah/pdf.pdf": PDF,
+        # Diupload lewat URL bertanda tangan dengan Content-Type application/pdf
+        "bukti-kuliah/palsu.pdf": b"<html>" + b"x" * 100,
+        "bukti-kuliah/kosong.pdf": b"",
+    })
+    assert await backend.stat("pdf.pdf") == (len(PDF), "application/pdf")
+    assert await backend.stat("palsu.pdf") == (106, "application/octet-stream")
+    assert await backend.stat("kosong.pdf") == (0, "application/octet-stream")
+    assert await backend.stat("tidak-ada.pdf") is None
+    # Hanya lima byte pertama yang diminta, lewat endpoint objek yang terautentikasi
+    assert {(r.method, r.headers["range"], r.headers["apikey"]) for r in server.requests} == {("GET", "bytes=0-4", "kunci")}
+    assert server.requests[0].url.path == "/storage/v1/object/tracer-study/bukti-kuliah/pdf.pdf"
+
+
+async def test_supabase_stat_raises_on_storage_errors(supabase):
+    backend, server = supabase
+    server.objects["bukti-kuliah/rusak.pdf"] = None  # _FakeSupabase menjawab 500
+    with pytest.raises(StorageError):
+        await backend.stat("rusak.pdf")
+
+
+async def test_local_stat_reads_type_from_content(local):
+    await local.upload("palsu.pdf", _chunks(b"<html>"), "application/pdf")
+    assert await local.stat("palsu.pdf") == (6, "application/octet-stream")
+    assert await local.stat("tidak-ada.pdf") is None
@@ -0,0 +1,178 @@
+import json
+import os
+
+import pytest
+
+from conftest import STORAGE_DIR, assert_statistik_consistent, requires_db, submission_payload
+
+pytestmark = [pytest.mark.anyio, requires_db]
+
+PDF = b"%PDF-1.4\n" + b"x" * 300_000
+
+
+async def _submit(client, payload, files=None, headers=None):
+    return await client.post("/questionnaire/submit", data={"payload": json.dumps(payload)},
+                             files=files, headers=headers or {})
+
+
+async def test_multipart_bukti_kuliah_is_streamed_to_storage(client, conn, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    response = await _submit(client, submission_payload(id_alumni, "PEND"),
+                             files={"bukti_kuliah": ("b.pdf", PDF, "application/pdf")})
+    assert response.status_code == 200, response.text
+    with open(os.path.join(STORAGE_DIR, f"bukti-kuliah-{id_alumni}.pdf"), "rb") as f:
+        assert f.read() == PDF
+    stored = await conn.fetchval("""
+        SELECT d.bukti_kuliah FROM detail_pendidikan_tinggi d JOIN tracer t USING (id_tracer)
+        WHERE t.id_alumni = $1
+    """, id_alumni)
+    assert stored == response.json()["bukti_kuliah"]
+
+
+async def test_oversized_bukti_kuliah_is_rejected(client, app_settings, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    too_big = b"%PDF-" + b"x" * app_settings.bukti_kuliah_max_bytes
+    response = await _submit(client, submission_payload(id_alumni, "PEND"),
+                             files={"bukti_kuliah": ("b.pdf", too_big, "application/pdf")})
+    assert response.status_code == 413
+    assert not os.path.exists(os.path.join(STORAGE_DIR, f"bukti-kuliah-{id_alumni}.pdf"))
+
+
+async def test_retry_with_same_idempotency_key_is_replayed(client, conn, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    payload = submission_payload(id_alumni, "KERJA", answer=2)
+    first = await _submit(client, payload, headers={"Idempotency-Key": "k1"})
+    again = await _submit(client, payload, headers={"Idempotency-Key": "k1"})
+    assert first.status_code == again.status_code == 200
+    assert again.headers.get("idempotent-replayed") == "true"
+
+    conflict = await _submit(client, submission_payload(id_alumni, "KERJA", answer=3), headers={"Idempotency-Key": "k1"})
+    assert conflict.status_code == 422
+
+
+def _legacy_data(id_alumni: str, status: str = "Bekerja", answer: str = "Bagus") -> dict:
+    return {
+        "id_alumni": id_alumni, "alamat_email": "lama@contoh.id", "no_telepon": "0813",
+        "status": status, "perguruan_tinggi": "Universitas 1", "program_studi": "Program Studi 1",
+        "sumber_biaya": "Orang Tua", "tahun_masuk": 2021,
+        "jawaban_kuesioner": {"Pertanyaan kuesioner nomor 1": answer, "Pertanyaan kuesioner nomor 2": "Cukup"},
+    }
+
+
+async def test_legacy_submit_updates_the_single_tracer_row(client, conn, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    for status, answer in (("Melanjutkan Pendidikan", "Bagus"), ("Bekerja", "Sangat Bagus")):
+        response = await client.post("/tracer/submit", data={"data": json.dumps(_legacy_data(id_alumni, status, answer))},
+                                     files={"bukti_kuliah": ("b.pdf", PDF, "application/pdf")})
+        assert response.status_code == 200, response.text
+
+    tracers = await conn.fetch("SELECT id_tracer, kode_status, is_filled FROM tracer WHERE id_alumni = $1", id_alumni)
+    assert [(t["kode_status"], t["is_filled"]) for t in tracers] == [("KERJA", True)]
+    answers = await conn.fetch("""
+        SELECT id_kuesioner, id_jawaban FROM detail_kuesioner WHERE id_tracer = $1 ORDER BY id_kuesioner
+    """, tracers[0]["id_tracer"])
+    assert [tuple(a) for a in answers] == [(1, 1), (2, 3)]
+    assert await conn.fetchval("SELECT COUNT(*) FROM detail_pendidikan_tinggi WHERE id_tracer = $1",
+                               tracers[0]["id_tracer"]) == 1
+    await assert_statistik_consistent(conn)
+
+
+async def test_resubmit_after_legacy_submit_is_not_replayed(client, conn, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    payload = submission_payload(id_alumni, "KERJA", answer=2)
+    assert (await _submit(client, payload)).status_code == 200
+    response = await client.post("/tracer/submit", data={"data": json.dumps(_legacy_data(id_alumni, "Bekerja"))},
+                                 files={"bukti_kuliah": ("b.pdf", PDF, "application/pdf")})
+    assert response.status_code == 200, response.text
+
+    again = await _submit(client, payload)
+    assert again.status_code == 200, again.text
+    assert again.headers.get("idempotent-replayed") is None
+    answers = await conn.fetch("""
+        SELECT dk.id_kuesioner, dk.id_jawaban FROM detail_kuesioner dk JOIN tracer t USING (id_tracer)
+        WHERE t.id_alumni = $1 ORDER BY dk.id_kuesioner
+    """, id_alumni)
+    assert [tuple(a) for a in answers] == [(1, 2), (2, 2), (3, 2)]
+    await assert_statistik_consistent(conn)
+
+
+async def test_legacy_submit_for_unknown_alumni_keeps_no_file(client):
+    id_alumni = "00000000-0000-0000-0000-000000000000"
+    response = await client.post("/tracer/submit", data={"data": json.dumps(_legacy_data(id_alumni))},
+                                 files={"bukti_kuliah": ("b.pdf", PDF, "application/pdf")})
+    assert response.status_code == 404
+    assert not os.path.exists(os.path.join(STORAGE_DIR, f"bukti-kuliah-{id_alumni}.pdf"))
+
+
+async def test_leaving_pend_removes_detail_pendidikan_and_bukti_kuliah(client, conn, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    response = await _submit(client, submission_payload(id_alumni, "PEND"),
+                             files={"bukti_kuliah": ("b.pdf", PDF, "application/pdf")})
+    assert response.status_code == 200, response.text
+    path = os.path.join(STORAGE_DIR, f"bukti-kuliah-{id_alumni}.pdf")
+    assert os.path.exists(path)
+
+    response = await _submit(client, submission_payload(id_alumni, "KERJA"))
+    assert response.status_code == 200, response.text
+    assert await conn.fetchval("""
+        SELECT COUNT(*) FROM detail_pendidikan_tinggi d JOIN tracer t USING (id_tracer) WHERE t.id_alumni = $1
+    """, id_alumni) == 0
+    assert not os.path.exists(path)
+    await assert_statistik_consistent(conn)
+
+
+@pytest.fixture
+async def storage_client(app):
+    import httpx
+
+    import main
+    import storage_server
+
+    transport = httpx.ASGITransport(app=storage_server.create_app(main.storage))
+    async with httpx.AsyncClient(transport=transport) as http:
+        yield http
+
+
+async def _upload_url(client, id_alumni):
+    response = await client.post("/questionnaire/upload-url", json={"id_alumni": id_alumni})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_direct_upload_through_signed_url(client, conn, storage_client, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    signed = await _upload_url(client, id_alumni)
+    put = await storage_client.request(signed["method"], signed["upload_url"], headers=signed["headers"], content=PDF)
+    assert put.status_code == 200, put.text
+
+    response = await _submit(client, submission_payload(id_alumni, "PEND", bukti_kuliah_key=signed["object_key"]))
+    assert response.status_code == 200, response.text
+    assert await conn.fetchval("""
+        SELECT d.bukti_kuliah FROM detail_pendidikan_tinggi d JOIN tracer t USING (id_tracer)
+        WHERE t.id_alumni = $1
+    """, id_alumni) == response.json()["bukti_kuliah"]
+
+
+async def test_signed_upload_enforces_signature_type_and_size(client, app_settings, storage_client, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    signed = await _upload_url(client, id_alumni)
+    url, headers = signed["upload_url"], signed["headers"]
+
+    tampered = await storage_client.put(url.replace("max_bytes=", "max_bytes=9"), headers=headers, content=PDF)
+    assert tampered.status_code == 403
+    wrong_type = await storage_client.put(url, headers={"Content-Type": "text/html"}, content=PDF)
+    assert wrong_type.status_code == 415
+    too_big = await storage_client.put(url, headers=headers, content=PDF + b"x" * app_settings.bukti_kuliah_max_bytes)
+    assert too_big.status_code == 413
+    assert not os.path.exists(os.path.join(STORAGE_DIR, signed["object_key"]))
+
+
+async def test_direct_upload_that_is_not_a_pdf_is_rejected_at_submit(client, storage_client, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    signed = await _upload_url(client, id_alumni)
+    # Content-Type yang dideklarasikan benar, isinya bukan PDF
+    put = await storage_client.put(signed["upload_url"], headers=signed["headers"], content=b"<html></html>")
+    assert put.status_code == 200, put.text
+
+    response = await _submit(client, submission_payload(id_alumni, "PEND", bukti_kuliah_key=signed["object_key"]))
+    assert response.status_code == 415
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+import db
+import submission_queue as queue_module
+from conftest import requires_db, submission_payload
+from models import SubmissionPayload
+from submission_queue import DONE, SubmissionQueue
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def pool(seeded):
+    await db.init_pool(seeded)
+    try:
+        yield db.get_pool()
+    finally:
+        await db.close_pool()
+
+
+@pytest.fixture
+async def queue(pool, tmp_path):
+    discarded = []
+
+    async def discard(paths):
+        discarded.extend(paths)
+
+    submission_queue = SubmissionQueue(str(tmp_path / "journal.sqlite3"), discard_files=discard)
+    submission_queue.discarded = discarded
+    await submission_queue.start()
+    # Worker dihentikan; test menjalankan batch sendiri lewat _drain_once
+    submission_queue._stopping = True
+    await submission_queue._task
+    try:
+        yield submission_queue
+    finally:
+        await submission_queue.stop()
+
+
+@requires_db
+async def test_leaving_pend_removes_detail_pendidikan_and_queues_bukti_kuliah(queue, conn, unfilled_alumni):
+    id_alumni = await unfilled_alumni()
+    path = f"bukti-kuliah-{id_alumni}.pdf"
+    pend = await queue.enqueue(SubmissionPayload(**submission_payload(id_alumni, "PEND")),
+                               f"http://storage.test/{path}", path, True)
+    assert await queue._drain_once() == 1
+    kerja = await queue.enqueue(SubmissionPayload(**submission_payload(id_alumni, "KERJA")))
+    assert await queue._drain_once() == 1
+
+    assert [(await queue.status(i))["status"] for i in (pend, kerja)] == [DONE, DONE]
+    assert await conn.fetchval("""
+        SELECT COUNT(*) FROM detail_pendidikan_tinggi d JOIN tracer t USING (id_tracer) WHERE t.id_alumni = $1
+    """, id_alumni) == 0
+    assert queue.discarded == [path]
+
+
+async def test_enqueue_during_drain_is_not_lost(tmp_path, monkeypatch):
+    monkeypatch.setattr(queue_module, "POLL_INTERVAL", 5.0)
+    submission_queue = SubmissionQueue(str(tmp_path / "journal.sqlite3"))
+    drains = []
+
+    async def drain_once():
+        drains.append(time.monotonic())
+        if len(drains) == 1:
+            # Submisi baru masuk setelah klaim kosong, sebelum drain selesai
+            submission_queue._wakeup.set()
+        return 0
+
+    monkeypatch.setattr(submission_queue, "_drain_once", drain_once)
+    await submission_queue.start()
+    try:
+        await asyncio.sleep(0.2)
+    finally:
+        await submission_queue.stop()
+    assert len(drains) >= 2 and drains[1] - drains[0] < 0.2
+
+
+async def test_stop_lets_the_running_batch_finish(tmp_path, monkeypatch):
+    monkeypatch.setattr(queue_module, "STOP_TIMEOUT", 0.05)
+    submission_queue = SubmissionQueue(str(tmp_path / "journal.sqlite3"))
+    started, finished = asyncio.Event(), []
+
+    async def drain_once():
+        started.set()
+        await asyncio.sleep(0.3)
+        finished.append(True)
+        return 1
+
+    monkeypatch.setattr(submission_queue, "_drain_once", drain_once)
+    await submission_queue.start()
+    await started.wait()
+    await submission_queue.stop()
+    assert finished == [True]
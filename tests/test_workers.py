@@ -0,0 +1,88 @@
+"""Beberapa worker hypercorn harus memakai kunci token yang sama."""
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from benchmark.seed import ADMIN_PASSWORD, ADMIN_USERNAME
+from conftest import ROOT, requires_db
+
+pytestmark = requires_db
+
+STARTUP_TIMEOUT = 30.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(workers: int, **env):
+    port = _free_port()
+    environment = dict(os.environ, DB_MIGRATE_ON_STARTUP="0", STARTUP_WARMUP="0", SLOW_QUERY_MS="0",
+                       PASSWORD_BCRYPT_ROUNDS="4", **env)
+    environment = {k: v for k, v in environment.items() if v is not None}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "hypercorn", "main:app", "--bind", f"127.0.0.1:{port}", "--workers", str(workers)],
+        cwd=ROOT, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+def _wait_ready(process, base_url) -> bool:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if httpx.get(base_url + "/health/ready", timeout=1.0).status_code == 200:
+                return True
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise AssertionError("hypercorn tidak siap")
+
+
+def _stop(process) -> str:
+    if process.poll() is None:
+        process.terminate()
+    try:
+        _, stderr = process.communicate(timeout=STARTUP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        _, stderr = process.communicate()
+    return stderr
+
+
+def test_workers_refuse_to_start_without_jwt_secret_key(seeded):
+    process, base_url = _start(2, JWT_SECRET_KEY=None)
+    try:
+        assert not _wait_ready(process, base_url)
+    finally:
+        stderr = _stop(process)
+    assert "JWT_SECRET_KEY belum diisi" in stderr
+
+
+def test_token_from_one_worker_is_accepted_by_another(seeded):
+    # Dua server terpisah: pasti dua proses berbeda, tanpa bergantung pada
+    # pembagian koneksi antar worker di satu socket
+    servers = [_start(workers, JWT_SECRET_KEY="kunci-bersama") for workers in (2, 1)]
+    try:
+        for process, base_url in servers:
+            assert _wait_ready(process, base_url)
+        (_, issuer), (_, verifier) = servers
+        login = httpx.post(issuer + "/login", json={"email": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+        assert login.status_code == 200, login.text
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        # Koneksi baru setiap request, sehingga kedua worker issuer ikut melayani
+        for base_url in [verifier] + [issuer] * 10:
+            response = httpx.get(base_url + "/alumni/search", params={"q": "Siswa", "limit": 1}, headers=headers)
+            assert response.status_code == 200, response.text
+    finally:
+        for process, _ in servers:
+            _stop(process)